@@ -0,0 +1,84 @@
+"""Show saga throughput as a function of the booking tables capacity.
+
+The load test runs in the simulator against tables with the given
+provisioned read and write capacity units and against on-demand tables.
+Throttled requests fail the Lambda functions, so that bookings get
+cancelled and cancellations are retried by the state machine.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/capacity.py --sagas 5000 --rate 20 --capacity 1 5 25 100
+"""
+import argparse
+import json
+import logging
+
+from common import SAGA_DIR
+
+from simulator.loadtest import LoadTest, SimulatorBackend, generate_trips
+
+
+def run(args, capacity):
+    """Run the load test and return it with the number of throttles."""
+    throughput = None
+    if capacity is not None:
+        throughput = {
+            "ReadCapacityUnits": capacity,
+            "WriteCapacityUnits": capacity,
+        }
+    backend = SimulatorBackend(
+        {},
+        args.task_latency,
+        args.seed,
+        provisioned_throughput=throughput,
+    )
+    logging.getLogger().setLevel(logging.ERROR)
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    load_test = LoadTest(backend, args.rate, args.concurrency, args.seed)
+    load_test.run(generate_trips(template, args.sagas))
+    return load_test, sum(backend.simulator.dynamodb.throttled.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sagas", type=int, default=2000)
+    parser.add_argument(
+        "--rate", type=float, default=20.0, help="arrival rate per second"
+    )
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        nargs="+",
+        default=[1, 2, 5, 10, 25, 50],
+        help="capacity units of the tables",
+    )
+    parser.add_argument(
+        "--task-latency",
+        type=float,
+        default=0.02,
+        help="overhead of a Lambda invocation in seconds",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'Sagas':<12}{args.sagas:>10}")
+    print(f"{'Rate':<12}{args.rate:>10.1f}")
+    print(
+        f"{'Capacity':<12}{'Sagas/s':>10}{'Booked/s':>10}{'Booked':>9}"
+        f"{'p99 (s)':>10}{'Throttles':>11}"
+    )
+    for capacity in [*args.capacity, None]:
+        load_test, throttles = run(args, capacity)
+        report = load_test.report()
+        booked = report["outcomes"]["TripBooked"]
+        print(
+            f"{capacity or 'on-demand':<12}{report['throughput']:>10.1f}"
+            f"{booked['count'] / load_test.makespan:>10.1f}"
+            f"{booked['ratio']:>9.1%}"
+            f"{report['latency_ms']['p99'] / 1e3:>10.1f}{throttles:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Compare tail latency of a booking function with various client settings.
+
+The ``book-hotel`` handler writes to a local stub of DynamoDB, which
+throttles the given share of the requests and stalls a few others for longer
+than the timeout of the functions. Retries of the client happen within the
+invocation, so with botocore defaults the invocations exceeding the one
+second timeout of the functions show up in the tail, while the functions
+configured by :func:`booking.client` fail fast and leave the retries to the
+state machine.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/client_retries.py --calls 1000 --throttle-rate 0.1 0.3
+"""
+import argparse
+import concurrent.futures
+import http.server
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+
+import boto3
+from botocore.config import Config
+
+from common import SAGA_DIR, load_handler
+
+from booking import client, client_config
+
+
+# Timeout of the functions in seconds.
+FUNCTION_TIMEOUT = 1.0
+
+# Client configurations by name, ``None`` stands for botocore defaults.
+CONFIGS = {
+    "botocore": None,
+    "standard": {
+        "connect_timeout": 60,
+        "read_timeout": 60,
+        "max_attempts": 3,
+    },
+    "tuned-2": {"max_attempts": 2},
+    "tuned": {},
+}
+
+
+class StubDynamoDB:
+    """Local stub of DynamoDB accepting every write.
+
+    Requests are throttled with ``throttle_rate`` and stalled for
+    ``stall_seconds`` with ``stall_rate`` before being answered.
+    """
+
+    def __init__(self, throttle_rate, stall_rate, stall_seconds, seed=None):
+        self.throttle_rate = throttle_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def respond(self):
+        """Return status code and body of the response to a request."""
+        with self._lock:
+            self.requests += 1
+            draw = self._random.random()
+        if draw < self.throttle_rate:
+            return 400, {
+                "__type": "com.amazonaws.dynamodb.v20120810#"
+                "ProvisionedThroughputExceededException",
+                "message": "The level of configured provisioned throughput "
+                "for the table was exceeded.",
+            }
+        if draw < self.throttle_rate + self.stall_rate:
+            time.sleep(self.stall_seconds)
+        return 200, {}
+
+    def serve(self):
+        """Start serving the stub in a thread and return the server."""
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                status, response = stub.respond()
+                payload = json.dumps(response).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header(
+                        "Content-Type", "application/x-amz-json-1.0"
+                    )
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except OSError:
+                    # The client gave up waiting for the response.
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(http.server.ThreadingHTTPServer):
+            # Concurrent connections mustn't wait for the connect timeout.
+            request_queue_size = 128
+
+            def handle_error(self, request, client_address):
+                pass
+
+        server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def create_client(name, endpoint_url, pool_size):
+    """Return DynamoDB client of the named configuration."""
+    options = CONFIGS[name]
+    if options is None:
+        return boto3.client(
+            "dynamodb",
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=pool_size),
+        )
+    return client(
+        "dynamodb",
+        {**options, "max_pool_connections": pool_size},
+        endpoint_url=endpoint_url,
+    )
+
+
+def run(args, name, throttle_rate):
+    """Invoke the handler and return latencies and outcomes of the calls."""
+    stub = StubDynamoDB(
+        throttle_rate, args.stall_rate, args.stall_seconds, args.seed
+    )
+    server = stub.serve()
+    endpoint_url = f"http://127.0.0.1:{server.server_address[1]}"
+    module = load_handler("book-hotel")
+    module.service.dynamodb = create_client(
+        name, endpoint_url, args.concurrency
+    )
+    event = json.loads((SAGA_DIR / "sample-input.json").read_text())
+
+    def invoke(_):
+        start = time.perf_counter()
+        try:
+            module.lambda_handler(dict(event, trip_id=str(uuid.uuid4())), None)
+        except Exception:
+            failed = True
+        else:
+            failed = False
+        return time.perf_counter() - start, failed
+
+    with concurrent.futures.ThreadPoolExecutor(args.concurrency) as executor:
+        results = list(executor.map(invoke, range(args.calls)))
+    server.shutdown()
+    server.server_close()
+    return results, stub.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--throttle-rate", type=float, nargs="+", default=[0.1, 0.3, 0.5]
+    )
+    parser.add_argument("--stall-rate", type=float, default=0.01)
+    parser.add_argument("--stall-seconds", type=float, default=2.0)
+    parser.add_argument(
+        "--config", choices=CONFIGS, nargs="+", default=list(CONFIGS)
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # The stub accepts any credentials.
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "stub")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "stub")
+
+    print(f"{'Calls':<12}{args.calls:>10}")
+    print(f"{'Stall rate':<12}{args.stall_rate:>10.1%}")
+    for name in args.config:
+        options = CONFIGS[name]
+        if options is not None:
+            config = client_config(options)
+            print(
+                f"{name}: timeouts {config.connect_timeout}/"
+                f"{config.read_timeout} s, {config.retries}"
+            )
+    print(
+        f"{'Throttled':<11}{'Config':<10}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+        f"{'Max (ms)':>10}{'Attempts':>10}{'Failed':>8}{'Timed out':>11}"
+    )
+    for throttle_rate in args.throttle_rate:
+        for name in args.config:
+            results, requests = run(args, name, throttle_rate)
+            latencies = sorted(latency for latency, _ in results)
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            failed = sum(
+                failed
+                for latency, failed in results
+                if latency <= FUNCTION_TIMEOUT
+            )
+            timed_out = sum(
+                latency > FUNCTION_TIMEOUT for latency in latencies
+            )
+            print(
+                f"{throttle_rate:<11.0%}{name:<10}"
+                f"{statistics.median(latencies) * 1e3:>10.1f}"
+                f"{p99 * 1e3:>10.1f}{latencies[-1] * 1e3:>10.1f}"
+                f"{requests / args.calls:>10.2f}"
+                f"{failed / args.calls:>8.1%}"
+                f"{timed_out / args.calls:>11.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
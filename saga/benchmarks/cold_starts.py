@@ -0,0 +1,99 @@
+"""Measure cold and warm latency of the deployed saga Lambdas.
+
+Each function is invoked in bursts of concurrent requests, so that new
+execution environments are started whenever the burst exceeds the warm ones.
+Invocations are told apart by the ``Init Duration`` reported in their logs,
+which provisioned environments don't report.
+
+Run from the ``saga`` directory with the function (alias) ARNs::
+
+   python benchmarks/cold_starts.py --bursts 5 --concurrency 20 \
+     $(pulumi -C infra stack output functions --json | jq -r '.[]')
+"""
+import argparse
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import json
+import re
+import statistics
+import time
+import uuid
+
+import boto3
+
+from common import SAGA_DIR
+
+
+_INIT_DURATION = re.compile(r"Init Duration: ([\d.]+) ms")
+
+
+def invoke(client, function, event):
+    """Invoke the function and return round trip and init time in ms."""
+    start = time.perf_counter()
+    response = client.invoke(
+        FunctionName=function, Payload=json.dumps(event), LogType="Tail"
+    )
+    round_trip = (time.perf_counter() - start) * 1e3
+    response["Payload"].read()
+    log = base64.b64decode(response["LogResult"]).decode()
+    match = _INIT_DURATION.search(log)
+    return round_trip, float(match.group(1)) if match else None
+
+
+def measure(client, function, template, bursts, concurrency, pause):
+    """Return invocations of the function split to cold and warm ones."""
+    cold, warm = [], []
+    with ThreadPoolExecutor(concurrency) as executor:
+        for _ in range(bursts):
+            events = [
+                dict(template, trip_id=str(uuid.uuid4()))
+                for _ in range(concurrency)
+            ]
+            for result in executor.map(
+                lambda event: invoke(client, function, event), events
+            ):
+                (warm if result[1] is None else cold).append(result)
+            time.sleep(pause)
+    return cold, warm
+
+
+def median(values):
+    return statistics.median(values) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("functions", nargs="+", metavar="FUNCTION")
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--pause", type=float, default=1.0, help="seconds between bursts"
+    )
+    args = parser.parse_args()
+
+    client = boto3.client("lambda")
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    print(
+        f"{'Function':<48}{'Cold':>6}{'Init (ms)':>11}{'Cold (ms)':>11}"
+        f"{'Warm':>6}{'Warm (ms)':>11}"
+    )
+    for function in args.functions:
+        cold, warm = measure(
+            client,
+            function,
+            template,
+            args.bursts,
+            args.concurrency,
+            args.pause,
+        )
+        name = function.split(":function:")[-1]
+        print(
+            f"{name:<48}{len(cold):>6}"
+            f"{median([init for _, init in cold]):>11.1f}"
+            f"{median([rt for rt, _ in cold]):>11.1f}"
+            f"{len(warm):>6}{median([rt for rt, _ in warm]):>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
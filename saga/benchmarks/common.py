@@ -0,0 +1,19 @@
+import pathlib
+import sys
+import time
+
+# Make the simulator package importable when running the scripts directly.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from simulator import SAGA_DIR, load_handler  # noqa: E402
+
+
+__all__ = ["SAGA_DIR", "load_handler", "measure"]
+
+
+def measure(func, iterations):
+    """Return CPU time per call of ``func`` in microseconds."""
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - start) / iterations * 1e6
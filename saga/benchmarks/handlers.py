@@ -0,0 +1,95 @@
+"""Measure cold start import time and warm latency of the saga Lambdas.
+
+Cold start is measured by importing each handler in a fresh interpreter,
+warm latency by invoking the handler with DynamoDB responses stubbed out so
+that everything but the network round trip is included.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/handlers.py
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from botocore.stub import Stubber
+
+from common import SAGA_DIR, load_handler
+
+
+HANDLERS = [
+    "book-hotel",
+    "book-flight",
+    "book-car",
+    "cancel-hotel",
+    "cancel-flight",
+    "cancel-car",
+]
+
+
+def cold_start(name, repeat):
+    """Return median import time of the handler in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, __file__, "--import-only", name],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        times.append(float(output))
+    return statistics.median(times)
+
+
+def warm_latency(name, event, iterations):
+    """Return median latency of the warm handler in microseconds."""
+    module = load_handler(name)
+    stubber = Stubber(module.service.dynamodb)
+    if name.startswith("book-"):
+        operation, response = "put_item", {}
+    else:
+        operation = "update_item"
+        response = {
+            "Attributes": {
+                "trip_id": {"S": event["trip_id"]},
+                "status": {"S": "cancelled"},
+                "date_booked": {"S": "2022-01-29T08:00:00.000"},
+                "date_cancelled": {"S": "2022-01-29T08:00:01.000"},
+            }
+        }
+    times = []
+    with stubber:
+        for _ in range(iterations):
+            stubber.add_response(operation, response)
+            start = time.perf_counter()
+            module.lambda_handler(event, None)
+            times.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--import-only", metavar="HANDLER")
+    args = parser.parse_args()
+
+    if args.import_only:
+        start = time.perf_counter()
+        load_handler(args.import_only)
+        print((time.perf_counter() - start) * 1e3)
+        return
+
+    event = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    print(f"{'Handler':<16}{'Cold import (ms)':>18}{'Warm (us)':>12}")
+    for name in HANDLERS:
+        cold = cold_start(name, args.repeat)
+        warm = warm_latency(name, event, args.iterations)
+        print(f"{name:<16}{cold:>18.1f}{warm:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
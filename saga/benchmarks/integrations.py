@@ -0,0 +1,99 @@
+"""Compare the saga invoking Lambda functions and using DynamoDB directly.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/integrations.py --sagas 10000 --fail-rate 0.1
+
+Functions fail at a rate of 10 % by default, ``--fail-rate 0`` measures the
+happy path only.
+
+Latencies of Lambda invocations and DynamoDB requests made by Step Functions
+are assumptions given by the arguments, only the time spent in the handlers
+and the in-memory DynamoDB stand-in is measured.
+"""
+import argparse
+import json
+import uuid
+
+from common import SAGA_DIR
+
+from simulator import SagaSimulator
+from simulator.histogram import Histogram
+from simulator.saga import (
+    add_fail_rate_arguments,
+    chaos_from_args,
+    fail_rates_from_args,
+)
+
+
+def run(integration, args, task_latency):
+    """Run the sagas and return latency histogram (ms) and counts per saga."""
+    simulator = SagaSimulator(
+        fail_rates_from_args(args),
+        task_latency,
+        args.seed,
+        transition_latency=args.transition_latency,
+        integration=integration,
+        chaos=chaos_from_args(args),
+    )
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    latency = Histogram()
+    transitions = 0
+    for _ in range(args.sagas):
+        execution = simulator.run(dict(template, trip_id=str(uuid.uuid4())))
+        latency.record(execution.duration * 1e3)
+        transitions += execution.transitions
+    return (
+        latency,
+        transitions / args.sagas,
+        sum(simulator.lambdas.calls.values()) / args.sagas,
+        sum(simulator.dynamodb.calls.values()) / args.sagas,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sagas", type=int, default=10000)
+    # Failures exercise the compensation, which the integrations differ in.
+    add_fail_rate_arguments(parser, fail_rate=0.1)
+    parser.add_argument(
+        "--invoke-latency",
+        type=float,
+        default=0.02,
+        help="overhead of a warm Lambda invocation in seconds",
+    )
+    parser.add_argument(
+        "--dynamodb-latency",
+        type=float,
+        default=0.008,
+        help="latency of a DynamoDB service integration task in seconds",
+    )
+    parser.add_argument(
+        "--transition-latency",
+        type=float,
+        default=0.0,
+        help="latency of a state transition in seconds",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {
+        "lambda": run("lambda", args, args.invoke_latency),
+        "dynamodb": run("dynamodb", args, args.dynamodb_latency),
+    }
+
+    print(f"{'Sagas':<10}{args.sagas:>12}")
+    print(
+        f"{'Mode':<10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'Transitions':>13}"
+        f"{'Invokes':>10}{'DynamoDB':>10}"
+    )
+    for mode, (latency, transitions, invokes, requests) in results.items():
+        print(
+            f"{mode:<10}{latency.percentile(50):>12.1f}"
+            f"{latency.percentile(99):>12.1f}{transitions:>13.2f}"
+            f"{invokes:>10.2f}{requests:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
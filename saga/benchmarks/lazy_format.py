@@ -0,0 +1,62 @@
+"""Compare eager and lazy pretty formatting of debug log messages.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/lazy_format.py --passengers 200
+"""
+import argparse
+import json
+import logging
+
+from common import SAGA_DIR, measure
+
+from booking import LazyFormat, pformat
+
+
+def make_event(passengers):
+    """Build a large trip payload based on the sample input."""
+    event = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    event["passengers"] = [
+        {
+            "name": f"Passenger {i}",
+            "email": f"passenger{i}@example.com",
+            "seat": f"{i // 6 + 1}{'ABCDEF'[i % 6]}",
+            "notes": "Vegetarian meal, extra legroom, window seat" * 4,
+        }
+        for i in range(passengers)
+    ]
+    return event
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--passengers", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    event = make_event(args.passengers)
+    item = dict(event, status="booked")
+    result = {"status": "booked", "date_booked": "2022-01-29T08:00:00.000"}
+
+    def eager():
+        logger.debug("Input data:\n%s", pformat(event))
+        logger.debug("Item data:\n%s", pformat(item))
+        logger.debug("Result:\n%s", pformat(result))
+
+    def lazy():
+        logger.debug("Input data:\n%s", LazyFormat(event))
+        logger.debug("Item data:\n%s", LazyFormat(item))
+        logger.debug("Result:\n%s", LazyFormat(result))
+
+    print(f"Payload size: {len(json.dumps(event))} bytes")
+    before = measure(eager, args.iterations)
+    after = measure(lazy, args.iterations)
+    print(f"Eager formatting: {before:10.2f} us/invocation")
+    print(f"Lazy formatting:  {after:10.2f} us/invocation")
+    print(f"Speedup:          {before / after:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
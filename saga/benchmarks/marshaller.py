@@ -0,0 +1,61 @@
+"""Compare generic and schema aware DynamoDB marshalling of booking items.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/marshaller.py --items 10000
+"""
+import argparse
+import time
+import uuid
+
+from common import load_handler
+
+from booking import Marshaller
+from booking.serialization import deserialize, serialize
+
+
+def make_items(schema, count):
+    """Build booking items with all the attributes of the schema filled."""
+    return [
+        {name: f"{name}-{uuid.uuid4()}" for name in schema.attributes}
+        for _ in range(count)
+    ]
+
+
+def timed(func, items):
+    """Apply ``func`` to all items and return results and elapsed seconds."""
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    args = parser.parse_args()
+
+    schema = load_handler("book-flight").service.schema
+    marshaller = Marshaller(schema.attributes)
+    items = make_items(schema, args.items)
+
+    generic, generic_ser = timed(serialize, items)
+    fast, fast_ser = timed(marshaller.serialize, items)
+    assert generic == fast
+    _, generic_de = timed(deserialize, generic)
+    restored, fast_de = timed(marshaller.deserialize, fast)
+    assert restored == items
+
+    print(f"{'Items':<14}{args.items:>12}")
+    print(f"{'':<14}{'Generic (ms)':>14}{'Schema (ms)':>14}{'Speedup':>10}")
+    for label, before, after in [
+        ("serialize", generic_ser, fast_ser),
+        ("deserialize", generic_de, fast_de),
+    ]:
+        print(
+            f"{label:<14}{before * 1e3:>14.1f}{after * 1e3:>14.1f}"
+            f"{before / after:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare state payloads of the saga with and without trimming.
+
+Trips are padded to the given size to model large trip payloads. Every
+saga fails a booking, so that the trip is compensated and the errors of the
+failed bookings are carried along.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/payload.py --sagas 2000 --trip-kb 1 64 200 250
+"""
+import argparse
+import collections
+import json
+import time
+import uuid
+
+from common import SAGA_DIR
+
+from simulator import SagaSimulator
+
+
+def run(args, trip_kb, trim_payloads):
+    """Run the sagas and return outcomes, payload sizes and CPU time."""
+    simulator = SagaSimulator(
+        {"book-car": 1.0},
+        seed=args.seed,
+        definition_options={"trim_payloads": trim_payloads},
+    )
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    template["notes"] = "x" * (trip_kb * 1024)
+    outcomes = collections.Counter()
+    max_payload_size = 0
+    payload_bytes = 0
+    start = time.process_time()
+    for _ in range(args.sagas):
+        execution = simulator.run(dict(template, trip_id=str(uuid.uuid4())))
+        outcomes[execution.error or execution.final_state] += 1
+        max_payload_size = max(max_payload_size, execution.max_payload_size)
+        payload_bytes += execution.payload_bytes
+    cpu = (time.process_time() - start) / args.sagas
+    return outcomes, max_payload_size, payload_bytes / args.sagas, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sagas", type=int, default=1000)
+    parser.add_argument(
+        "--trip-kb",
+        type=int,
+        nargs="+",
+        default=[1, 64, 200, 250],
+        help="sizes of the trips in KiB",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'Sagas':<14}{args.sagas:>10}")
+    print(
+        f"{'Trip (KiB)':<12}{'Trimmed':>9}{'Max (KiB)':>11}"
+        f"{'Per saga (KiB)':>16}{'CPU (ms)':>10}{'Too large':>11}"
+    )
+    for trip_kb in args.trip_kb:
+        for trim_payloads in (False, True):
+            outcomes, max_size, per_saga, cpu = run(
+                args, trip_kb, trim_payloads
+            )
+            print(
+                f"{trip_kb:<12}{'yes' if trim_payloads else 'no':>9}"
+                f"{max_size / 1024:>11.1f}{per_saga / 1024:>16.1f}"
+                f"{cpu * 1e3:>10.2f}"
+                f"{outcomes['States.DataLimitExceeded']:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare backward and forward recovery of the saga.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/recovery.py --sagas 10000 --fail-rate 0.1
+
+With backward recovery, a failed booking cancels the whole trip. Forward
+recovery retries the failed bookings first and compensates only if they fail
+again. Latency of Lambda invocations is an assumption given by the argument.
+Functions fail at a rate of 10 % by default.
+"""
+import argparse
+import collections
+import json
+import uuid
+
+from common import SAGA_DIR
+
+from definition import RECOVERY_MODES
+from simulator import SagaSimulator
+from simulator.histogram import Histogram
+from simulator.saga import (
+    add_fail_rate_arguments,
+    chaos_from_args,
+    fail_rates_from_args,
+)
+
+
+def run(recovery, args):
+    """Run the sagas and return outcomes, latency (ms) and counts per saga."""
+    simulator = SagaSimulator(
+        fail_rates_from_args(args),
+        args.invoke_latency,
+        args.seed,
+        definition_options={"recovery": recovery},
+        chaos=chaos_from_args(args),
+    )
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    outcomes = collections.Counter()
+    latency = Histogram()
+    transitions = 0
+    for _ in range(args.sagas):
+        execution = simulator.run(dict(template, trip_id=str(uuid.uuid4())))
+        outcomes[execution.final_state] += 1
+        latency.record(execution.duration * 1e3)
+        transitions += execution.transitions
+    return (
+        outcomes,
+        latency,
+        transitions / args.sagas,
+        sum(simulator.lambdas.calls.values()) / args.sagas,
+        sum(simulator.dynamodb.calls.values()) / args.sagas,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sagas", type=int, default=10000)
+    # Without failures, the recovery modes don't differ.
+    add_fail_rate_arguments(parser, fail_rate=0.1)
+    parser.add_argument(
+        "--invoke-latency",
+        type=float,
+        default=0.02,
+        help="overhead of a warm Lambda invocation in seconds",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'Sagas':<10}{args.sagas:>12}")
+    print(
+        f"{'Recovery':<10}{'Booked':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}"
+        f"{'Transitions':>13}{'Invokes':>10}{'DynamoDB':>10}"
+    )
+    for recovery in RECOVERY_MODES:
+        outcomes, latency, transitions, invokes, requests = run(recovery, args)
+        print(
+            f"{recovery:<10}{outcomes['TripBooked'] / args.sagas:>12.1%}"
+            f"{latency.percentile(50):>12.1f}"
+            f"{latency.percentile(99):>12.1f}{transitions:>13.2f}"
+            f"{invokes:>10.2f}{requests:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
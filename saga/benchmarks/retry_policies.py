@@ -0,0 +1,115 @@
+"""Compare retry policies of the saga under throttling.
+
+Sagas arrive in a burst against booking tables with little provisioned
+capacity, so that many of them get throttled in the same second. Without
+jitter they retry in lockstep and get throttled again, with full jitter
+the retries spread over the backoff interval.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/retry_policies.py --sagas 500 --rate 1000 --capacity 25
+"""
+import argparse
+import json
+import logging
+
+from common import SAGA_DIR
+
+from definition import BOOK_RETRY, CANCEL_RETRY, retry
+from simulator.loadtest import LoadTest, SimulatorBackend, generate_trips
+
+
+# Retry policies by name as step options.
+POLICIES = {
+    # Policy used before the retries became configurable.
+    "fixed": {
+        "book_retry": [retry(["lambda"], max_attempts=5, backoff_rate=2)],
+        "cancel_retry": [
+            retry(["States.ALL"], max_attempts=100, backoff_rate=2)
+        ],
+    },
+    "capped": {
+        "book_retry": [
+            retry(
+                ["throttling"],
+                max_attempts=6,
+                backoff_rate=2,
+                max_delay_seconds=20,
+            ),
+            retry(["lambda"], max_attempts=5, backoff_rate=2),
+        ],
+        "cancel_retry": [
+            retry(
+                ["States.ALL"],
+                max_attempts=100,
+                backoff_rate=2,
+                max_delay_seconds=60,
+            )
+        ],
+    },
+    "jitter": {"book_retry": BOOK_RETRY, "cancel_retry": CANCEL_RETRY},
+}
+
+
+def run(args, policy):
+    """Run the load test and return it with the number of throttles."""
+    backend = SimulatorBackend(
+        {},
+        args.task_latency,
+        args.seed,
+        provisioned_throughput={
+            "ReadCapacityUnits": args.capacity,
+            "WriteCapacityUnits": args.capacity,
+        },
+        step_options=POLICIES[policy],
+    )
+    logging.getLogger().setLevel(logging.ERROR)
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    load_test = LoadTest(backend, args.rate, args.concurrency, args.seed)
+    load_test.run(generate_trips(template, args.sagas))
+    return load_test, sum(backend.simulator.dynamodb.throttled.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sagas", type=int, default=500)
+    parser.add_argument(
+        "--rate", type=float, default=1000.0, help="arrival rate per second"
+    )
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument(
+        "--capacity", type=int, default=25, help="capacity units of the tables"
+    )
+    parser.add_argument(
+        "--policy", choices=POLICIES, nargs="+", default=list(POLICIES)
+    )
+    parser.add_argument(
+        "--task-latency",
+        type=float,
+        default=0.02,
+        help="overhead of a Lambda invocation in seconds",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'Sagas':<12}{args.sagas:>10}")
+    print(f"{'Rate':<12}{args.rate:>10.1f}")
+    print(f"{'Capacity':<12}{args.capacity:>10}")
+    print(
+        f"{'Policy':<12}{'Booked':>9}{'p50 (s)':>10}"
+        f"{'p99 (s)':>10}{'Calls':>8}{'Throttles':>11}"
+    )
+    for policy in args.policy:
+        load_test, throttles = run(args, policy)
+        report = load_test.report()
+        print(
+            f"{policy:<12}{report['outcomes']['TripBooked']['ratio']:>9.1%}"
+            f"{report['latency_ms']['p50'] / 1e3:>10.1f}"
+            f"{report['latency_ms']['p99'] / 1e3:>10.1f}"
+            f"{report['dynamodb_calls_per_saga']['mean']:>8.1f}"
+            f"{throttles:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
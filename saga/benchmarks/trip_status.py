@@ -0,0 +1,92 @@
+"""Measure the trip status reads served by the cache of a warm container.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/trip_status.py --trips 1000 --polls 100000 --rate 500
+
+Customers poll statuses of the trips booked by the saga at the given rate
+(per second). For each cache TTL the hit ratio and DynamoDB requests per poll
+are reported, a TTL of zero disables the cache. A poll missing the cache
+reads the bookings of all the services in a single eventually consistent
+request.
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+
+from common import SAGA_DIR
+
+from simulator import SagaSimulator
+from simulator.saga import (
+    add_fail_rate_arguments,
+    chaos_from_args,
+    fail_rates_from_args,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trips", type=int, default=1000)
+    parser.add_argument("--polls", type=int, default=100000)
+    parser.add_argument(
+        "--rate", type=float, default=500.0, help="polls per second"
+    )
+    parser.add_argument(
+        "--ttl",
+        type=float,
+        action="append",
+        help="cache TTL in seconds (repeatable)",
+    )
+    parser.add_argument("--single-table", action="store_true")
+    add_fail_rate_arguments(parser)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    simulator = SagaSimulator(
+        fail_rates_from_args(args),
+        seed=args.seed,
+        single_table=args.single_table,
+        chaos=chaos_from_args(args),
+    )
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    trip_ids = []
+    for _ in range(args.trips):
+        trip = dict(template, trip_id=str(uuid.uuid4()))
+        simulator.run(trip)
+        trip_ids.append(trip["trip_id"])
+
+    cache = simulator.modules["get-trip"].service.cache
+    clock = [0.0]
+    cache.clock = lambda: clock[0]
+
+    print(f"{'Polls':<12}{args.polls:>12}")
+    print(
+        f"{'TTL (s)':<12}{'Hit ratio':>12}{'Requests':>12}"
+        f"{'Mean (us)':>12}"
+    )
+    for ttl in args.ttl or (0.0, 1.0, 5.0, 30.0):
+        cache.clear()
+        cache.ttl = ttl
+        cache.hits = cache.misses = 0
+        simulator.dynamodb.calls.clear()
+        rng = random.Random(args.seed)
+        clock[0] = 0.0
+        elapsed = 0.0
+        for _ in range(args.polls):
+            clock[0] += rng.expovariate(args.rate)
+            trip_id = rng.choice(trip_ids)
+            start = time.perf_counter()
+            simulator.trip_status(trip_id)
+            elapsed += time.perf_counter() - start
+        requests = sum(simulator.dynamodb.calls.values())
+        print(
+            f"{ttl:<12.1f}{cache.hits / args.polls:>12.3f}"
+            f"{requests / args.polls:>12.3f}"
+            f"{elapsed / args.polls * 1e6:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
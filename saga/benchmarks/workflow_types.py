@@ -0,0 +1,97 @@
+"""Compare latency and cost of the saga as Standard and Express workflow.
+
+Run from the ``saga`` directory::
+
+   python benchmarks/workflow_types.py --sagas 10000 --fail-rate 0.1
+
+Latencies of state transitions and task invocations are assumptions given
+by the arguments, only the time spent in the handlers is measured.
+"""
+import argparse
+import json
+import uuid
+
+from common import SAGA_DIR
+
+from definition import EXPRESS_CANCEL_RETRY
+from simulator import SagaSimulator
+from simulator.histogram import Histogram
+from simulator.pricing import COSTS
+from simulator.saga import (
+    add_fail_rate_arguments,
+    chaos_from_args,
+    fail_rates_from_args,
+)
+
+
+def run(workflow_type, args, transition_latency, step_options=None):
+    """Run the sagas and return latency histogram (ms) and total cost."""
+    simulator = SagaSimulator(
+        fail_rates_from_args(args),
+        args.task_latency,
+        args.seed,
+        transition_latency=transition_latency,
+        step_options=step_options,
+        chaos=chaos_from_args(args),
+    )
+    cost = COSTS[workflow_type]
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    latency = Histogram()
+    total = 0.0
+    for _ in range(args.sagas):
+        execution = simulator.run(dict(template, trip_id=str(uuid.uuid4())))
+        latency.record(execution.duration * 1e3)
+        total += cost(execution)
+    return latency, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sagas", type=int, default=10000)
+    add_fail_rate_arguments(parser)
+    parser.add_argument(
+        "--task-latency",
+        type=float,
+        default=0.02,
+        help="overhead of a Lambda invocation in seconds",
+    )
+    parser.add_argument(
+        "--standard-transition-latency",
+        type=float,
+        default=0.02,
+        help="latency of a Standard workflow state transition in seconds",
+    )
+    parser.add_argument(
+        "--express-transition-latency",
+        type=float,
+        default=0.002,
+        help="latency of an Express workflow state transition in seconds",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {
+        "STANDARD": run("STANDARD", args, args.standard_transition_latency),
+        "EXPRESS": run(
+            "EXPRESS",
+            args,
+            args.express_transition_latency,
+            {"cancel_retry": EXPRESS_CANCEL_RETRY},
+        ),
+    }
+
+    print(f"{'Sagas':<10}{args.sagas:>12}")
+    print(
+        f"{'Type':<10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'max (ms)':>12}"
+        f"{'$ per 1M':>12}"
+    )
+    for workflow_type, (latency, cost) in results.items():
+        print(
+            f"{workflow_type:<10}{latency.percentile(50):>12.0f}"
+            f"{latency.percentile(99):>12.0f}{latency.max:>12.0f}"
+            f"{cost / args.sagas * 1e6:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from .executions import ExecutionResult, InputTooLargeError, SagaClient
+from .status import TripStatusClient, TripStatusError
+
+
+__all__ = [
+    "ExecutionResult",
+    "InputTooLargeError",
+    "SagaClient",
+    "TripStatusClient",
+    "TripStatusError",
+]
@@ -0,0 +1,91 @@
+"""Book trips from a JSONL file by the bulk state machine.
+
+Run from the ``saga`` directory::
+
+   python -m client.bulk trips.jsonl \
+     --state-machine-arn $(pulumi -C infra stack output bulk_state_machine) \
+     --bucket $(pulumi -C infra stack output trips_bucket) --wait
+
+The trips are uploaded to the bucket as a JSON array manifest named after
+its content and an execution of the same name is started, so that booking
+the same file again doesn't start another run. Trip IDs are injected the
+same way as by :mod:`client.submit`.
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+from .submit import read_trips
+
+
+__all__ = ["BulkClient"]
+
+
+class BulkClient:
+    """Client starting bulk booking of the trips from S3 manifests."""
+
+    def __init__(self, state_machine_arn, bucket, sfn=None, s3=None):
+        self.state_machine_arn = state_machine_arn
+        self.bucket = bucket
+        self.sfn = sfn or boto3.client("stepfunctions")
+        self.s3 = s3 or boto3.client("s3")
+
+    def start(self, trips):
+        """Upload the trips and start booking them, return execution ARN."""
+        body = json.dumps(list(trips), separators=(",", ":")).encode()
+        name = hashlib.sha256(body).hexdigest()[:32]
+        key = f"manifests/{name}.json"
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
+        try:
+            response = self.sfn.start_execution(
+                stateMachineArn=self.state_machine_arn,
+                name=name,
+                input=json.dumps({"bucket": self.bucket, "key": key}),
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ExecutionAlreadyExists":
+                raise
+            arn = self.state_machine_arn.replace(
+                ":stateMachine:", ":execution:"
+            )
+            return f"{arn}:{name}"
+        return response["executionArn"]
+
+    def wait(self, execution_arn, interval=5.0):
+        """Wait for the execution to finish and return its description."""
+        while True:
+            response = self.sfn.describe_execution(executionArn=execution_arn)
+            if response["status"] != "RUNNING":
+                return response
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "input", type=argparse.FileType("r"), help="JSONL file with trips"
+    )
+    parser.add_argument("--state-machine-arn", required=True)
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument(
+        "--wait", action="store_true", help="wait for the counts of trips"
+    )
+    args = parser.parse_args()
+
+    client = BulkClient(args.state_machine_arn, args.bucket)
+    execution_arn = client.start(read_trips(args.input))
+    print(execution_arn)
+    if args.wait:
+        response = client.wait(execution_arn)
+        if response["status"] != "SUCCEEDED":
+            sys.exit(f"{response['status']}: {response.get('error')}")
+        print(response["output"])
+
+
+if __name__ == "__main__":
+    main()
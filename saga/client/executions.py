@@ -0,0 +1,90 @@
+import json
+
+import boto3
+
+
+__all__ = [
+    "MAX_INPUT_SIZE",
+    "InputTooLargeError",
+    "ExecutionResult",
+    "SagaClient",
+]
+
+# Maximum size of the execution input in bytes.
+MAX_INPUT_SIZE = 256 * 1024
+
+
+class InputTooLargeError(ValueError):
+    """Execution input exceeds the payload size limit."""
+
+
+def serialize_input(trip):
+    """Return trip serialized as execution input checking its size."""
+    input = json.dumps(trip, separators=(",", ":"))
+    size = len(input.encode())
+    if size > MAX_INPUT_SIZE:
+        raise InputTooLargeError(
+            f"Input of {size} bytes exceeds the limit of {MAX_INPUT_SIZE}"
+        )
+    return input
+
+
+class ExecutionResult:
+    """Result of an execution run synchronously."""
+
+    def __init__(self, response):
+        self.execution_arn = response["executionArn"]
+        self.status = response["status"]
+        self.output = (
+            json.loads(response["output"]) if "output" in response else None
+        )
+        self.error = response.get("error")
+        self.cause = response.get("cause")
+        self.duration = (
+            response["stopDate"] - response["startDate"]
+        ).total_seconds()
+        billing = response.get("billingDetails", {})
+        self.billed_duration_ms = billing.get("billedDurationInMilliseconds")
+        self.billed_memory_mb = billing.get("billedMemoryUsedInMB")
+
+    @property
+    def succeeded(self):
+        return self.status == "SUCCEEDED"
+
+    def __repr__(self):
+        return f"<ExecutionResult {self.execution_arn} {self.status}>"
+
+
+class SagaClient:
+    """Client starting executions of the saga state machine.
+
+    Executions are named by trip ID unless a name is given, which makes
+    starting a Standard workflow execution for the same trip idempotent.
+    Trips too large to be passed between the states are rejected by
+    :class:`InputTooLargeError` before any request is sent.
+    """
+
+    def __init__(self, state_machine_arn, client=None):
+        self.state_machine_arn = state_machine_arn
+        self.sfn = client or boto3.client("stepfunctions")
+
+    def start(self, trip, name=None):
+        """Start execution for the trip and return its ARN."""
+        response = self.sfn.start_execution(
+            stateMachineArn=self.state_machine_arn,
+            name=name or trip["trip_id"],
+            input=serialize_input(trip),
+        )
+        return response["executionArn"]
+
+    def run(self, trip, name=None):
+        """Run execution for the trip synchronously and return its result.
+
+        Only available for Express workflows.
+        """
+        response = self.sfn.start_sync_execution(
+            stateMachineArn=self.state_machine_arn,
+            name=name or trip["trip_id"],
+            input=serialize_input(trip),
+        )
+        return ExecutionResult(response)
@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+__all__ = ["AdaptiveRateLimiter"]
+
+
+class AdaptiveRateLimiter:
+    """Rate limiter adapting to throttling of the requests.
+
+    Requests are spaced evenly at the current rate (per second), which grows
+    by ``increase`` per second of successful requests up to ``max_rate`` and
+    is cut by ``decrease`` factor when a request gets throttled, down to
+    ``min_rate``. Throttling of the requests sent before the rate was cut
+    doesn't cut it again within ``cooldown`` seconds. Safe to share between
+    threads.
+    """
+
+    def __init__(
+        self,
+        rate,
+        max_rate=None,
+        min_rate=1.0,
+        increase=1.0,
+        decrease=0.5,
+        cooldown=1.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.rate = rate
+        self.max_rate = max_rate or float("inf")
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._decreased = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next request can be sent."""
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._next)
+            self._next = start + 1.0 / self.rate
+        if start > now:
+            self.sleep(start - now)
+
+    def success(self):
+        """Record a successful request."""
+        with self._lock:
+            self.rate = min(
+                self.max_rate, self.rate + self.increase / self.rate
+            )
+
+    def throttled(self):
+        """Record a throttled request."""
+        with self._lock:
+            now = self.clock()
+            if (
+                self._decreased is not None
+                and now - self._decreased < self.cooldown
+            ):
+                return
+            self._decreased = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            # Requests already scheduled at the previous rate move back.
+            self._next = max(self._next, now + 1.0 / self.rate)
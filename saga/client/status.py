@@ -0,0 +1,31 @@
+import json
+
+import boto3
+
+
+__all__ = ["TripStatusError", "TripStatusClient"]
+
+
+class TripStatusError(Exception):
+    """Reading the trip status failed."""
+
+
+class TripStatusClient:
+    """Client reading statuses of the trips from the get-trip function."""
+
+    def __init__(self, function_name, client=None):
+        self.function_name = function_name
+        self.lambda_ = client or boto3.client("lambda")
+
+    def get(self, trip_id):
+        """Return status of the trip and its bookings."""
+        response = self.lambda_.invoke(
+            FunctionName=self.function_name,
+            Payload=json.dumps({"trip_id": trip_id}),
+        )
+        payload = json.loads(response["Payload"].read())
+        if "FunctionError" in response:
+            raise TripStatusError(
+                f"{payload.get('errorType')}: {payload.get('errorMessage')}"
+            )
+        return payload
@@ -0,0 +1,133 @@
+"""Serve a local stub of the Step Functions API starting executions.
+
+Run from the ``saga`` directory::
+
+   python -m client.stub --port 8083 --rate 200
+
+Only ``StartExecution`` is implemented. Executions are kept in memory by name,
+so that starting one with the same name and input returns the existing
+execution while a different input fails with ``ExecutionAlreadyExists``.
+Requests above the rate (per second) fail with ``ThrottlingException``.
+Point the submission tool to it with ``--endpoint-url`` and any credentials.
+"""
+import argparse
+import http.server
+import json
+import threading
+import time
+
+
+__all__ = ["StubStepFunctions", "create_server", "serve"]
+
+
+class StubStepFunctions:
+    """In-memory state of the stub service."""
+
+    def __init__(self, rate=None, clock=time.monotonic):
+        self.rate = rate
+        self.clock = clock
+        self.executions = {}
+        self.requests = 0
+        self.throttled = 0
+        self._second = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _throttle(self):
+        """Return whether the request exceeds the rate of its second."""
+        second = int(self.clock())
+        if second != self._second:
+            self._second, self._count = second, 0
+        self._count += 1
+        return self.rate is not None and self._count > self.rate
+
+    def start_execution(self, request):
+        """Return status code and body of the response to the request."""
+        with self._lock:
+            self.requests += 1
+            if self._throttle():
+                self.throttled += 1
+                return 400, {
+                    "__type": "ThrottlingException",
+                    "message": "Rate exceeded",
+                }
+            name = request["name"]
+            arn = request["stateMachineArn"].replace(
+                ":stateMachine:", ":execution:"
+            )
+            execution = self.executions.get(name)
+            if execution is None:
+                execution = self.executions[name] = {
+                    "executionArn": f"{arn}:{name}",
+                    "startDate": time.time(),
+                    "input": request.get("input", "{}"),
+                }
+            elif execution["input"] != request.get("input", "{}"):
+                return 400, {
+                    "__type": "ExecutionAlreadyExists",
+                    "message": f"Execution Already Exists: '{name}'",
+                }
+            return 200, {
+                "executionArn": execution["executionArn"],
+                "startDate": execution["startDate"],
+            }
+
+
+def create_server(stub, port=8083):
+    """Return HTTP server of the stub listening on the port."""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            target = self.headers.get("X-Amz-Target", "")
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if target == "AWSStepFunctions.StartExecution":
+                status, response = stub.start_execution(json.loads(body))
+            else:
+                status, response = 400, {
+                    "__type": "UnknownOperationException",
+                    "message": f"Unsupported operation {target}",
+                }
+            payload = json.dumps(response).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/x-amz-json-1.0")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+
+
+def serve(port=8083, rate=None):
+    """Serve the stub on the port until interrupted."""
+    stub = StubStepFunctions(rate)
+    server = create_server(stub, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(
+            json.dumps(
+                {
+                    "requests": stub.requests,
+                    "throttled": stub.throttled,
+                    "executions": len(stub.executions),
+                }
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8083)
+    parser.add_argument("--rate", type=int, help="requests per second")
+    args = parser.parse_args()
+    serve(args.port, args.rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Submit trips from a JSONL file to the saga state machine in bulk.
+
+Run from the ``saga`` directory::
+
+   python -m client.submit trips.jsonl \
+     --state-machine-arn $(pulumi -C infra stack output state_machine) \
+     --concurrency 32 --rate 50 --max-rate 500 --output results.jsonl
+
+Trips without ``trip_id`` get one derived from their line number and content,
+so that every run over the same file names the executions the same. The
+execution name serves as the idempotency key: a Standard workflow doesn't
+start a second execution of the same name, so re-running the submission
+doesn't book any trip twice.
+"""
+import argparse
+import collections
+import concurrent.futures
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from .executions import InputTooLargeError, SagaClient
+from .ratelimit import AdaptiveRateLimiter
+
+
+__all__ = ["SubmitResult", "BulkSubmitter", "read_trips"]
+
+logger = logging.getLogger(__name__)
+
+# Namespace of the trip IDs derived from the trips.
+TRIP_NAMESPACE = uuid.UUID("5a6a8b3e-7d0c-4f53-9a43-7c1c5f0e2b6d")
+
+# Error codes of throttled requests.
+THROTTLING_ERRORS = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+}
+
+
+def read_trips(lines):
+    """Parse trips from JSONL lines, injecting missing trip IDs.
+
+    Blank lines are skipped. Trip IDs are derived from the line number and
+    the canonical JSON of the trip.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        trip = json.loads(line)
+        if "trip_id" not in trip:
+            canonical = json.dumps(trip, sort_keys=True, separators=(",", ":"))
+            trip["trip_id"] = str(
+                uuid.uuid5(TRIP_NAMESPACE, f"{number}:{canonical}")
+            )
+        yield trip
+
+
+class SubmitResult:
+    """Outcome of submitting a single trip."""
+
+    __slots__ = ("trip_id", "status", "execution_arn", "error", "attempts")
+
+    def __init__(
+        self, trip_id, status, execution_arn=None, error=None, attempts=1
+    ):
+        self.trip_id = trip_id
+        self.status = status
+        self.execution_arn = execution_arn
+        self.error = error
+        self.attempts = attempts
+
+    def to_dict(self):
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if getattr(self, name) is not None
+        }
+
+
+class BulkSubmitter:
+    """Start executions of the saga for a stream of trips concurrently.
+
+    At most ``concurrency`` requests are in flight and their rate is limited
+    by ``limiter`` adapting to throttling. Throttled requests are retried up
+    to ``max_attempts`` times in total, as are requests failing to connect
+    or get a response, which is safe because the execution name makes
+    starting it idempotent. Executions which already exist are reported as
+    ``duplicate`` instead of failing.
+    """
+
+    def __init__(self, saga, concurrency=32, limiter=None, max_attempts=8):
+        self.saga = saga
+        self.concurrency = concurrency
+        self.limiter = limiter or AdaptiveRateLimiter(concurrency)
+        self.max_attempts = max_attempts
+        self.statuses = collections.Counter()
+        self.throttled = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _submit(self, trip):
+        trip_id = trip["trip_id"]
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                execution_arn = self.saga.start(trip)
+            except InputTooLargeError:
+                return SubmitResult(
+                    trip_id, "failed", error="InputTooLarge", attempts=attempt
+                )
+            except ClientError as e:
+                code = e.response["Error"]["Code"]
+                if code == "ExecutionAlreadyExists":
+                    self.limiter.success()
+                    return SubmitResult(trip_id, "duplicate", attempts=attempt)
+                if code in THROTTLING_ERRORS:
+                    self.limiter.throttled()
+                    with self._lock:
+                        self.throttled += 1
+                    error = code
+                    continue
+                return SubmitResult(
+                    trip_id, "failed", error=code, attempts=attempt
+                )
+            except BotoCoreError as e:
+                # The request may have started the execution before the
+                # response got lost, starting it again returns the same one.
+                logger.debug("Retrying trip ID %s after %r", trip_id, e)
+                self.limiter.throttled()
+                with self._lock:
+                    self.errors += 1
+                error = type(e).__name__
+                continue
+            self.limiter.success()
+            return SubmitResult(
+                trip_id, "started", execution_arn, attempts=attempt
+            )
+        return SubmitResult(
+            trip_id, "failed", error=error, attempts=self.max_attempts
+        )
+
+    def submit(self, trips):
+        """Submit the trips and yield the results as they complete.
+
+        Trips are consumed lazily, keeping only a bounded number of them
+        queued.
+        """
+        with concurrent.futures.ThreadPoolExecutor(
+            self.concurrency
+        ) as executor:
+            pending = set()
+            for trip in trips:
+                if len(pending) >= 2 * self.concurrency:
+                    done, pending = concurrent.futures.wait(
+                        pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED,
+                    )
+                    yield from self._results(done)
+                pending.add(executor.submit(self._submit, trip))
+            yield from self._results(concurrent.futures.as_completed(pending))
+
+    def _results(self, futures):
+        for future in futures:
+            result = future.result()
+            self.statuses[result.status] += 1
+            yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "input", type=argparse.FileType("r"), help="JSONL file with trips"
+    )
+    parser.add_argument("--state-machine-arn", required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--rate", type=float, default=50.0, help="initial requests per second"
+    )
+    parser.add_argument("--max-rate", type=float)
+    parser.add_argument(
+        "--rate-increase",
+        type=float,
+        default=10.0,
+        help="rate growth per second without throttling",
+    )
+    parser.add_argument("--max-attempts", type=int, default=8)
+    parser.add_argument(
+        "--endpoint-url", help="Step Functions endpoint, e.g. the stub"
+    )
+    parser.add_argument(
+        "--output",
+        type=argparse.FileType("w"),
+        help="JSONL file to write results of the trips to",
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+
+    # Pool as many connections as there are requests in flight and leave
+    # retries of throttled requests to the submitter.
+    client = boto3.client(
+        "stepfunctions",
+        endpoint_url=args.endpoint_url,
+        config=Config(
+            max_pool_connections=args.concurrency,
+            retries={"mode": "standard", "total_max_attempts": 1},
+        ),
+    )
+    submitter = BulkSubmitter(
+        SagaClient(args.state_machine_arn, client),
+        args.concurrency,
+        AdaptiveRateLimiter(
+            args.rate, args.max_rate, increase=args.rate_increase
+        ),
+        args.max_attempts,
+    )
+
+    start = time.perf_counter()
+    for result in submitter.submit(read_trips(args.input)):
+        if args.output:
+            args.output.write(json.dumps(result.to_dict()) + "\n")
+        if result.status == "failed":
+            logger.warning(
+                "Failed to start execution for trip ID %s: %s",
+                result.trip_id,
+                result.error,
+            )
+    elapsed = time.perf_counter() - start
+
+    submitted = sum(submitter.statuses.values())
+    summary = {
+        "trips": submitted,
+        **{
+            status: submitter.statuses[status]
+            for status in ("started", "duplicate", "failed")
+        },
+        "throttled_requests": submitter.throttled,
+        "failed_requests": submitter.errors,
+        "final_rate": submitter.limiter.rate,
+        "seconds": elapsed,
+        "trips_per_second": submitted / elapsed if elapsed else 0.0,
+    }
+    print(json.dumps(summary, indent=2))
+    return 1 if submitter.statuses["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
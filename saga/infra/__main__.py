@@ -4,22 +4,127 @@ import pulumi
 import pulumi_aws as aws
 from pulumi_aws_tags import register_auto_tags
 
+from autoscaling import table_autoscaling
+from bulk_service import BulkService, BulkServiceArgs
 from car_service import CarService, CarServiceArgs
+from definition import (
+    EXPRESS_CANCEL_RETRY,
+    SERVICES,
+    dynamodb_saga_step,
+    retry_from_config,
+    saga_definition,
+    saga_step,
+)
 from flight_service import FlightService, FlightServiceArgs
 from hotel_service import HotelService, HotelServiceArgs
+from trip_service import TripService, TripServiceArgs
+from trip_status_service import TripStatusService, TripStatusServiceArgs
 
 
 config = pulumi.Config()
+state_machine_type = config.get("state_machine_type") or "STANDARD"
+express = state_machine_type == "EXPRESS"
+integration = config.get("integration") or "lambda"
+single_table = config.get("table_design") == "single"
+metrics_namespace = config.get("metrics_namespace")
+client_config = config.get_object("client")
+tracing = config.get_bool("tracing") or False
+recovery = config.get("recovery") or "backward"
+bulk = config.get_bool("bulk") or False
+batch_queues = config.get_bool("batch_queues") or False
 
 # Automatically inject tags to created AWS resources.
 register_auto_tags(
     {"user:Project": pulumi.get_project(), "user:Stack": pulumi.get_stack()}
 )
 
+# Create a Lambda layer with the core shared by all booking services.
+booking_layer = aws.lambda_.LayerVersion(
+    "sfn-demo-saga-booking-layer",
+    layer_name="sfn-demo-saga-booking",
+    code=pulumi.FileArchive("../layers/booking"),
+    compatible_runtimes=["python3.8"],
+)
+
+# Create a table shared by all the services in the single-table design,
+# on-demand unless configured otherwise.
+bookings_table = None
+if single_table:
+    billing_mode = config.get("bookings_billing_mode") or "PAY_PER_REQUEST"
+    provisioned = billing_mode == "PROVISIONED"
+    capacity = {
+        "Read": config.get_int("bookings_read_capacity") or 1,
+        "Write": config.get_int("bookings_write_capacity") or 1,
+    }
+    autoscaled = {}
+    for dimension in capacity:
+        max_capacity = config.get_int(
+            f"bookings_max_{dimension.lower()}_capacity"
+        )
+        if provisioned and max_capacity:
+            autoscaled[dimension] = max_capacity
+    bookings_table = aws.dynamodb.Table(
+        "sfn-demo-saga-bookings",
+        attributes=[
+            aws.dynamodb.TableAttributeArgs(name="trip_id", type="S"),
+            aws.dynamodb.TableAttributeArgs(name="service", type="S"),
+        ],
+        billing_mode=billing_mode,
+        hash_key="trip_id",
+        range_key="service",
+        read_capacity=capacity["Read"] if provisioned else None,
+        write_capacity=capacity["Write"] if provisioned else None,
+        opts=pulumi.ResourceOptions(
+            # Capacity of autoscaled tables is managed by the policies.
+            ignore_changes=[
+                f"{dimension.lower()}_capacity" for dimension in autoscaled
+            ],
+        ),
+    )
+    for dimension, max_capacity in autoscaled.items():
+        table_autoscaling(
+            "sfn-demo-saga-bookings",
+            bookings_table,
+            dimension,
+            capacity[dimension],
+            max_capacity,
+            config.get_float("bookings_target_utilization") or 70.0,
+        )
+
 # Create a hotel booking service.
 service_args = {
     "book_hotel_fail_rate": config.get_float("book_hotel_fail_rate"),
     "cancel_hotel_fail_rate": config.get_float("cancel_hotel_fail_rate"),
+    "book_hotel_chaos": config.get_object("book_hotel_chaos"),
+    "cancel_hotel_chaos": config.get_object("cancel_hotel_chaos"),
+    "layers": [booking_layer.arn],
+    "alias": config.get("lambda_alias"),
+    "book_hotel_memory_size": config.get_int("book_hotel_memory_size"),
+    "book_hotel_reserved_concurrency": config.get_int(
+        "book_hotel_reserved_concurrency"
+    ),
+    "book_hotel_provisioned_concurrency": config.get_int(
+        "book_hotel_provisioned_concurrency"
+    ),
+    "cancel_hotel_memory_size": config.get_int("cancel_hotel_memory_size"),
+    "cancel_hotel_reserved_concurrency": config.get_int(
+        "cancel_hotel_reserved_concurrency"
+    ),
+    "cancel_hotel_provisioned_concurrency": config.get_int(
+        "cancel_hotel_provisioned_concurrency"
+    ),
+    "batch_queue": batch_queues,
+    "batch_size": config.get_int("batch_size"),
+    "billing_mode": config.get("hotel_billing_mode"),
+    "read_capacity": config.get_int("hotel_read_capacity"),
+    "write_capacity": config.get_int("hotel_write_capacity"),
+    "max_read_capacity": config.get_int("hotel_max_read_capacity"),
+    "max_write_capacity": config.get_int("hotel_max_write_capacity"),
+    "target_utilization": config.get_float("hotel_target_utilization"),
+    "bookings_table": bookings_table,
+    "metrics_namespace": metrics_namespace,
+    "client_config": client_config,
+    "tracing": tracing,
 }
 service_args = {k: v for k, v in service_args.items() if v is not None}
 hotel_service = HotelService(
@@ -30,6 +135,36 @@ hotel_service = HotelService(
 service_args = {
     "book_flight_fail_rate": config.get_float("book_flight_fail_rate"),
     "cancel_flight_fail_rate": config.get_float("cancel_flight_fail_rate"),
+    "book_flight_chaos": config.get_object("book_flight_chaos"),
+    "cancel_flight_chaos": config.get_object("cancel_flight_chaos"),
+    "layers": [booking_layer.arn],
+    "alias": config.get("lambda_alias"),
+    "book_flight_memory_size": config.get_int("book_flight_memory_size"),
+    "book_flight_reserved_concurrency": config.get_int(
+        "book_flight_reserved_concurrency"
+    ),
+    "book_flight_provisioned_concurrency": config.get_int(
+        "book_flight_provisioned_concurrency"
+    ),
+    "cancel_flight_memory_size": config.get_int("cancel_flight_memory_size"),
+    "cancel_flight_reserved_concurrency": config.get_int(
+        "cancel_flight_reserved_concurrency"
+    ),
+    "cancel_flight_provisioned_concurrency": config.get_int(
+        "cancel_flight_provisioned_concurrency"
+    ),
+    "batch_queue": batch_queues,
+    "batch_size": config.get_int("batch_size"),
+    "billing_mode": config.get("flight_billing_mode"),
+    "read_capacity": config.get_int("flight_read_capacity"),
+    "write_capacity": config.get_int("flight_write_capacity"),
+    "max_read_capacity": config.get_int("flight_max_read_capacity"),
+    "max_write_capacity": config.get_int("flight_max_write_capacity"),
+    "target_utilization": config.get_float("flight_target_utilization"),
+    "bookings_table": bookings_table,
+    "metrics_namespace": metrics_namespace,
+    "client_config": client_config,
+    "tracing": tracing,
 }
 service_args = {k: v for k, v in service_args.items() if v is not None}
 flight_service = FlightService(
@@ -40,12 +175,89 @@ flight_service = FlightService(
 service_args = {
     "book_car_fail_rate": config.get_float("book_car_fail_rate"),
     "cancel_car_fail_rate": config.get_float("cancel_car_fail_rate"),
+    "book_car_chaos": config.get_object("book_car_chaos"),
+    "cancel_car_chaos": config.get_object("cancel_car_chaos"),
+    "layers": [booking_layer.arn],
+    "alias": config.get("lambda_alias"),
+    "book_car_memory_size": config.get_int("book_car_memory_size"),
+    "book_car_reserved_concurrency": config.get_int(
+        "book_car_reserved_concurrency"
+    ),
+    "book_car_provisioned_concurrency": config.get_int(
+        "book_car_provisioned_concurrency"
+    ),
+    "cancel_car_memory_size": config.get_int("cancel_car_memory_size"),
+    "cancel_car_reserved_concurrency": config.get_int(
+        "cancel_car_reserved_concurrency"
+    ),
+    "cancel_car_provisioned_concurrency": config.get_int(
+        "cancel_car_provisioned_concurrency"
+    ),
+    "batch_queue": batch_queues,
+    "batch_size": config.get_int("batch_size"),
+    "billing_mode": config.get("car_billing_mode"),
+    "read_capacity": config.get_int("car_read_capacity"),
+    "write_capacity": config.get_int("car_write_capacity"),
+    "max_read_capacity": config.get_int("car_max_read_capacity"),
+    "max_write_capacity": config.get_int("car_max_write_capacity"),
+    "target_utilization": config.get_float("car_target_utilization"),
+    "bookings_table": bookings_table,
+    "metrics_namespace": metrics_namespace,
+    "client_config": client_config,
+    "tracing": tracing,
 }
 service_args = {k: v for k, v in service_args.items() if v is not None}
 car_service = CarService(
     "sfn-demo-saga-car-service", CarServiceArgs(**service_args)
 )
 
+# Create a service booking whole trips in the single-table design.
+if single_table:
+    trip_service = TripService(
+        "sfn-demo-saga-trip-service",
+        TripServiceArgs(
+            bookings_table,
+            book_trip_fail_rate=config.get_float("book_trip_fail_rate") or 0.0,
+            book_trip_chaos=config.get_object("book_trip_chaos"),
+            layers=[booking_layer.arn],
+            alias=config.get("lambda_alias") or "live",
+            metrics_namespace=metrics_namespace,
+            client_config=client_config,
+            tracing=tracing,
+        ),
+    )
+
+# The trip is booked by the trip service in a single transaction unless the
+# state machine writes to the tables directly.
+book_trip_lambdas = {}
+if single_table and integration == "lambda":
+    book_trip_lambdas["book_trip_lambda"] = trip_service.book_trip_alias.arn
+
+# Create a service reading statuses of the trips.
+status_args = {
+    "table_design": config.get("table_design"),
+    "layers": [booking_layer.arn],
+    "alias": config.get("lambda_alias"),
+    "memory_size": config.get_int("get_trip_memory_size"),
+    "cache_ttl": config.get_float("trip_cache_ttl"),
+    "cache_size": config.get_int("trip_cache_size"),
+    "metrics_namespace": metrics_namespace,
+    "client_config": client_config,
+    "tracing": tracing,
+}
+status_args = {k: v for k, v in status_args.items() if v is not None}
+trip_status_service = TripStatusService(
+    "sfn-demo-saga-trip-status-service",
+    TripStatusServiceArgs(
+        {
+            "hotel": hotel_service.bookings_table,
+            "flight": flight_service.bookings_table,
+            "car": car_service.bookings_table,
+        },
+        **status_args,
+    ),
+)
+
 # Create a role for state machine.
 state_machine_role = aws.iam.Role(
     "sfn-demo-saga-state-machine-role",
@@ -65,16 +277,70 @@ state_machine_role = aws.iam.Role(
     ),
 )
 
+# Create a log group for Express workflow executions and allow the state
+# machine to deliver logs to it.
+log_delivery_statements = []
+logging_configuration = None
+if express:
+    state_machine_log_group = aws.cloudwatch.LogGroup(
+        "sfn-demo-saga-state-machine",
+        name="/aws/vendedlogs/states/sfn-demo-saga-state-machine",
+        retention_in_days=7,
+    )
+    logging_configuration = aws.sfn.StateMachineLoggingConfigurationArgs(
+        log_destination=state_machine_log_group.arn.apply(
+            lambda arn: f"{arn}:*"
+        ),
+        include_execution_data=True,
+        level=config.get("state_machine_log_level") or "ERROR",
+    )
+    log_delivery_statements.append(
+        {
+            "Effect": "Allow",
+            "Action": [
+                "logs:CreateLogDelivery",
+                "logs:GetLogDelivery",
+                "logs:UpdateLogDelivery",
+                "logs:DeleteLogDelivery",
+                "logs:ListLogDeliveries",
+                "logs:PutResourcePolicy",
+                "logs:DescribeResourcePolicies",
+                "logs:DescribeLogGroups",
+            ],
+            "Resource": "*",
+        }
+    )
+
+# Allow the state machine to send traces to X-Ray.
+tracing_statements = []
+if tracing:
+    tracing_statements.append(
+        {
+            "Effect": "Allow",
+            "Action": [
+                "xray:PutTraceSegments",
+                "xray:PutTelemetryRecords",
+                "xray:GetSamplingRules",
+                "xray:GetSamplingTargets",
+            ],
+            "Resource": "*",
+        }
+    )
+
 state_machine_role_policy = aws.iam.RolePolicy(
     "sfn-demo-saga-state-machine-role-policy",
     role=state_machine_role.id,
     policy=pulumi.Output.all(
-        book_hotel_lambda=hotel_service.book_hotel_lambda.arn,
-        cancel_hotel_lambda=hotel_service.cancel_hotel_lambda.arn,
-        book_flight_lambda=flight_service.book_flight_lambda.arn,
-        cancel_flight_lambda=flight_service.cancel_flight_lambda.arn,
-        book_car_lambda=car_service.book_car_lambda.arn,
-        cancel_car_lambda=car_service.cancel_car_lambda.arn,
+        book_hotel_lambda=hotel_service.book_hotel_alias.arn,
+        cancel_hotel_lambda=hotel_service.cancel_hotel_alias.arn,
+        book_flight_lambda=flight_service.book_flight_alias.arn,
+        cancel_flight_lambda=flight_service.cancel_flight_alias.arn,
+        book_car_lambda=car_service.book_car_alias.arn,
+        cancel_car_lambda=car_service.cancel_car_alias.arn,
+        hotel_table=hotel_service.bookings_table.arn,
+        flight_table=flight_service.bookings_table.arn,
+        car_table=car_service.bookings_table.arn,
+        **book_trip_lambdas,
     ).apply(
         lambda args: json.dumps(
             {
@@ -90,287 +356,159 @@ state_machine_role_policy = aws.iam.RolePolicy(
                             args["cancel_flight_lambda"],
                             args["book_car_lambda"],
                             args["cancel_car_lambda"],
+                            *(
+                                [args["book_trip_lambda"]]
+                                if "book_trip_lambda" in args
+                                else []
+                            ),
+                        ],
+                    },
+                    {
+                        "Effect": "Allow",
+                        "Action": [
+                            "dynamodb:GetItem",
+                            "dynamodb:PutItem",
+                            "dynamodb:UpdateItem",
+                        ],
+                        "Resource": [
+                            args["hotel_table"],
+                            args["flight_table"],
+                            args["car_table"],
                         ],
-                    }
+                    },
+                    *log_delivery_statements,
+                    *tracing_statements,
                 ],
             }
         )
     ),
 )
 
+
+def fail_rate(function):
+    """Return configured fail rate of the function."""
+    return config.get_float(f"{function}_fail_rate") or 0.0
+
+
+def retry_policy(name):
+    """Return configured ``Retry`` field or ``None`` for the default."""
+    retriers = config.get_object(name)
+    return None if retriers is None else retry_from_config(retriers)
+
+
+def saga_steps(args):
+    """Return steps of the saga using the configured integration."""
+    book_retry = retry_policy("book_retry")
+    cancel_retry = retry_policy("cancel_retry")
+    recover_retry = retry_policy("recover_retry")
+    if cancel_retry is None and express:
+        cancel_retry = EXPRESS_CANCEL_RETRY
+    if integration == "dynamodb":
+        return [
+            dynamodb_saga_step(
+                name,
+                table=args[f"{name}_table"],
+                payload_fields=fields,
+                book_fail_rate=fail_rate(f"book_{name}"),
+                cancel_fail_rate=fail_rate(f"cancel_{name}"),
+                book_retry=book_retry,
+                cancel_retry=cancel_retry,
+                recover_retry=recover_retry,
+                single_table=single_table,
+            )
+            for name, fields in SERVICES.items()
+        ]
+    return [
+        saga_step(
+            name,
+            book=args[f"book_{name}_lambda"],
+            cancel=args[f"cancel_{name}_lambda"],
+            payload_fields=fields,
+            book_retry=book_retry,
+            cancel_retry=cancel_retry,
+            recover_retry=recover_retry,
+        )
+        for name, fields in SERVICES.items()
+    ]
+
+
 # Create the state machine.
 state_machine = aws.sfn.StateMachine(
     "sfn-demo-saga-state-machine",
     role_arn=state_machine_role.arn,
+    type=state_machine_type,
+    logging_configuration=logging_configuration,
+    tracing_configuration=aws.sfn.StateMachineTracingConfigurationArgs(
+        enabled=tracing
+    ),
     definition=pulumi.Output.all(
-        book_hotel_lambda=hotel_service.book_hotel_lambda.name,
-        cancel_hotel_lambda=hotel_service.cancel_hotel_lambda.name,
-        book_flight_lambda=flight_service.book_flight_lambda.name,
-        cancel_flight_lambda=flight_service.cancel_flight_lambda.name,
-        book_car_lambda=car_service.book_car_lambda.name,
-        cancel_car_lambda=car_service.cancel_car_lambda.name,
+        book_hotel_lambda=hotel_service.book_hotel_alias.arn,
+        cancel_hotel_lambda=hotel_service.cancel_hotel_alias.arn,
+        book_flight_lambda=flight_service.book_flight_alias.arn,
+        cancel_flight_lambda=flight_service.cancel_flight_alias.arn,
+        book_car_lambda=car_service.book_car_alias.arn,
+        cancel_car_lambda=car_service.cancel_car_alias.arn,
+        hotel_table=hotel_service.bookings_table.name,
+        flight_table=flight_service.bookings_table.name,
+        car_table=car_service.bookings_table.name,
+        **book_trip_lambdas,
     ).apply(
         lambda args: json.dumps(
-            {
-                "Comment": "Saga pattern demo using AWS Step Functions",
-                "StartAt": "BookTrip",
-                "States": {
-                    "BookTrip": {
-                        "Type": "Parallel",
-                        "Branches": [
-                            {
-                                "StartAt": "BookHotel",
-                                "States": {
-                                    "BookHotel": {
-                                        "Type": "Task",
-                                        "Resource": "arn:aws:states:::lambda:invoke",  # noqa: E501
-                                        "Parameters": {
-                                            "FunctionName": args[
-                                                "book_hotel_lambda"
-                                            ],
-                                            "Payload": {
-                                                "trip_id.$": "$.trip_id",
-                                                "hotel.$": "$.hotel",
-                                                "check_in.$": "$.check_in",
-                                                "check_out.$": "$.check_out",
-                                            },
-                                        },
-                                        "ResultSelector": {
-                                            "result.$": "$.Payload"
-                                        },
-                                        "ResultPath": "$",
-                                        "Retry": [
-                                            {
-                                                "ErrorEquals": [
-                                                    "Lambda.ServiceException",
-                                                    "Lambda.AWSLambdaException",  # noqa: E501
-                                                    "Lambda.SdkClientException",  # noqa: E501
-                                                ],
-                                                "IntervalSeconds": 1,
-                                                "MaxAttempts": 5,
-                                                "BackoffRate": 2,
-                                            }
-                                        ],
-                                        "End": True,
-                                    }
-                                },
-                            },
-                            {
-                                "StartAt": "BookFlight",
-                                "States": {
-                                    "BookFlight": {
-                                        "Type": "Task",
-                                        "Resource": "arn:aws:states:::lambda:invoke",  # noqa: E501
-                                        "Parameters": {
-                                            "FunctionName": args[
-                                                "book_flight_lambda"
-                                            ],
-                                            "Payload": {
-                                                "trip_id.$": "$.trip_id",
-                                                "depart.$": "$.depart",
-                                                "depart_at.$": "$.depart_at",
-                                                "arrive.$": "$.arrive",
-                                                "arrive_at.$": "$.arrive_at",
-                                            },
-                                        },
-                                        "ResultSelector": {
-                                            "result.$": "$.Payload"
-                                        },
-                                        "ResultPath": "$",
-                                        "Retry": [
-                                            {
-                                                "ErrorEquals": [
-                                                    "Lambda.ServiceException",
-                                                    "Lambda.AWSLambdaException",  # noqa: E501
-                                                    "Lambda.SdkClientException",  # noqa: E501
-                                                ],
-                                                "IntervalSeconds": 1,
-                                                "MaxAttempts": 5,
-                                                "BackoffRate": 2,
-                                            }
-                                        ],
-                                        "End": True,
-                                    }
-                                },
-                            },
-                            {
-                                "StartAt": "BookCar",
-                                "States": {
-                                    "BookCar": {
-                                        "Type": "Task",
-                                        "Resource": "arn:aws:states:::lambda:invoke",  # noqa: E501
-                                        "Parameters": {
-                                            "FunctionName": args[
-                                                "book_car_lambda"
-                                            ],
-                                            "Payload": {
-                                                "trip_id.$": "$.trip_id",
-                                                "rental.$": "$.rental",
-                                                "rental_from.$": "$.rental_from",  # noqa: E501
-                                                "rental_to.$": "$.rental_to",
-                                            },
-                                        },
-                                        "ResultSelector": {
-                                            "result.$": "$.Payload"
-                                        },
-                                        "ResultPath": "$",
-                                        "Retry": [
-                                            {
-                                                "ErrorEquals": [
-                                                    "Lambda.ServiceException",
-                                                    "Lambda.AWSLambdaException",  # noqa: E501
-                                                    "Lambda.SdkClientException",  # noqa: E501
-                                                ],
-                                                "IntervalSeconds": 1,
-                                                "MaxAttempts": 5,
-                                                "BackoffRate": 2,
-                                            }
-                                        ],
-                                        "End": True,
-                                    }
-                                },
-                            },
-                        ],
-                        "ResultSelector": {
-                            "book_hotel.$": "$[0].result",
-                            "book_flight.$": "$[1].result",
-                            "book_car.$": "$[2].result",
-                        },
-                        "ResultPath": "$.results.book_trip",
-                        "Next": "TripBooked",
-                        "Catch": [
-                            {
-                                "ErrorEquals": ["States.ALL"],
-                                "ResultPath": "$.errors.book_trip",
-                                "Next": "CancelTrip",
-                            }
-                        ],
-                    },
-                    "CancelTrip": {
-                        "Type": "Parallel",
-                        "Branches": [
-                            {
-                                "StartAt": "CancelHotel",
-                                "States": {
-                                    "CancelHotel": {
-                                        "Type": "Task",
-                                        "Resource": "arn:aws:states:::lambda:invoke",  # noqa: E501
-                                        "Parameters": {
-                                            "FunctionName": args[
-                                                "cancel_hotel_lambda"
-                                            ],
-                                            "Payload": {
-                                                "trip_id.$": "$.trip_id"
-                                            },
-                                        },
-                                        "ResultSelector": {
-                                            "result.$": "$.Payload"
-                                        },
-                                        "ResultPath": "$",
-                                        "Retry": [
-                                            {
-                                                "ErrorEquals": ["States.ALL"],
-                                                "IntervalSeconds": 1,
-                                                "MaxAttempts": 100,
-                                                "BackoffRate": 2,
-                                            }
-                                        ],
-                                        "End": True,
-                                    }
-                                },
-                            },
-                            {
-                                "StartAt": "CancelFlight",
-                                "States": {
-                                    "CancelFlight": {
-                                        "Type": "Task",
-                                        "Resource": "arn:aws:states:::lambda:invoke",  # noqa: E501
-                                        "Parameters": {
-                                            "FunctionName": args[
-                                                "cancel_flight_lambda"
-                                            ],
-                                            "Payload": {
-                                                "trip_id.$": "$.trip_id"
-                                            },
-                                        },
-                                        "ResultSelector": {
-                                            "result.$": "$.Payload"
-                                        },
-                                        "ResultPath": "$",
-                                        "Retry": [
-                                            {
-                                                "ErrorEquals": ["States.ALL"],
-                                                "IntervalSeconds": 1,
-                                                "MaxAttempts": 100,
-                                                "BackoffRate": 2,
-                                            }
-                                        ],
-                                        "End": True,
-                                    }
-                                },
-                            },
-                            {
-                                "StartAt": "CancelCar",
-                                "States": {
-                                    "CancelCar": {
-                                        "Type": "Task",
-                                        "Resource": "arn:aws:states:::lambda:invoke",  # noqa: E501
-                                        "Parameters": {
-                                            "FunctionName": args[
-                                                "cancel_car_lambda"
-                                            ],
-                                            "Payload": {
-                                                "trip_id.$": "$.trip_id"
-                                            },
-                                        },
-                                        "ResultSelector": {
-                                            "result.$": "$.Payload"
-                                        },
-                                        "ResultPath": "$",
-                                        "Retry": [
-                                            {
-                                                "ErrorEquals": ["States.ALL"],
-                                                "IntervalSeconds": 1,
-                                                "MaxAttempts": 100,
-                                                "BackoffRate": 2,
-                                            }
-                                        ],
-                                        "End": True,
-                                    }
-                                },
-                            },
-                        ],
-                        "ResultSelector": {
-                            "cancel_hotel.$": "$[0].result",
-                            "cancel_flight.$": "$[1].result",
-                            "cancel_car.$": "$[2].result",
-                        },
-                        "ResultPath": "$.results.cancel_trip",
-                        "Next": "TripCancelled",
-                        "Catch": [
-                            {
-                                "ErrorEquals": ["States.ALL"],
-                                "ResultPath": "$.errors.cancel_trip",
-                                "Next": "TripCancelFailed",
-                            }
-                        ],
-                    },
-                    "TripBooked": {"Type": "Succeed"},
-                    "TripCancelled": {
-                        "Type": "Fail",
-                        "Error": "TripCancelledError",
-                        "Cause": "Trip cancelled due to error",
-                    },
-                    "TripCancelFailed": {
-                        "Type": "Fail",
-                        "Error": "TripCancelFailedError",
-                        "Cause": "Trip cancellation failed due to error",
-                    },
-                },
-            }
+            saga_definition(
+                saga_steps(args),
+                recovery=recovery,
+                book_trip=args.get("book_trip_lambda"),
+            )
         )
     ),
 )
 
+# Create a state machine booking trips from S3 manifests in bulk.
+if bulk:
+    bulk_args = {
+        "max_concurrency": config.get_int("bulk_max_concurrency"),
+        "tolerated_failure_percentage": config.get_float(
+            "bulk_tolerated_failure_percentage"
+        ),
+        "metrics_namespace": metrics_namespace,
+        "client_config": client_config,
+        "tracing": tracing,
+    }
+    bulk_args = {k: v for k, v in bulk_args.items() if v is not None}
+    bulk_service = BulkService(
+        "sfn-demo-saga-bulk",
+        BulkServiceArgs(state_machine, [booking_layer.arn], **bulk_args),
+    )
+
 # Export stack outputs.
 pulumi.export("state_machine", state_machine.id)
+pulumi.export("state_machine_type", state_machine_type)
+pulumi.export("integration", integration)
+pulumi.export("recovery", recovery)
+if single_table:
+    pulumi.export("bookings_table", bookings_table.name)
+    pulumi.export("book_trip_function", trip_service.book_trip_alias.arn)
+pulumi.export("get_trip_function", trip_status_service.get_trip_alias.arn)
+if batch_queues:
+    pulumi.export(
+        "booking_queues",
+        {
+            "hotel": hotel_service.book_hotel_queue.url,
+            "flight": flight_service.book_flight_queue.url,
+            "car": car_service.book_car_queue.url,
+        },
+    )
+if bulk:
+    pulumi.export("bulk_state_machine", bulk_service.state_machine.id)
+    pulumi.export("trips_bucket", bulk_service.trips_bucket.bucket)
+pulumi.export(
+    "functions",
+    [
+        hotel_service.book_hotel_alias.arn,
+        hotel_service.cancel_hotel_alias.arn,
+        flight_service.book_flight_alias.arn,
+        flight_service.cancel_flight_alias.arn,
+        car_service.book_car_alias.arn,
+        car_service.cancel_car_alias.arn,
+    ],
+)
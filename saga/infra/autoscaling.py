@@ -0,0 +1,48 @@
+from typing import Optional
+
+import pulumi
+import pulumi_aws as aws
+
+
+__all__ = ["table_autoscaling"]
+
+
+def table_autoscaling(
+    name: str,
+    table: aws.dynamodb.Table,
+    dimension: str,
+    min_capacity: int,
+    max_capacity: int,
+    target_utilization: float,
+    opts: Optional[pulumi.ResourceOptions] = None,
+) -> aws.appautoscaling.Policy:
+    """Scale ``Read`` or ``Write`` capacity of the table with its utilization.
+
+    The capacity is kept between the limits so that the consumed capacity is
+    around the target utilization percentage.
+    """
+    target = aws.appautoscaling.Target(
+        f"{name}-{dimension.lower()}-target",
+        min_capacity=min_capacity,
+        max_capacity=max_capacity,
+        resource_id=table.name.apply(lambda name: f"table/{name}"),
+        scalable_dimension=f"dynamodb:table:{dimension}CapacityUnits",
+        service_namespace="dynamodb",
+        opts=opts,
+    )
+    return aws.appautoscaling.Policy(
+        f"{name}-{dimension.lower()}-policy",
+        policy_type="TargetTrackingScaling",
+        resource_id=target.resource_id,
+        scalable_dimension=target.scalable_dimension,
+        service_namespace=target.service_namespace,
+        target_tracking_scaling_policy_configuration={
+            "predefined_metric_specification": {
+                "predefined_metric_type": (
+                    f"DynamoDB{dimension}CapacityUtilization"
+                ),
+            },
+            "target_value": target_utilization,
+        },
+        opts=opts,
+    )
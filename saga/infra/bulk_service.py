@@ -0,0 +1,308 @@
+import json
+from typing import Any, Mapping, Optional, Sequence
+
+import pulumi
+import pulumi_aws as aws
+
+from definition import bulk_definition
+
+
+__all__ = ["BulkServiceArgs", "BulkService"]
+
+
+class BulkServiceArgs:
+    def __init__(
+        self,
+        state_machine: aws.sfn.StateMachine,
+        layers: Optional[Sequence[pulumi.Input[str]]] = None,
+        max_concurrency: int = 100,
+        tolerated_failure_percentage: float = 5.0,
+        metrics_namespace: Optional[str] = None,
+        client_config: Optional[Mapping[str, Any]] = None,
+        tracing: bool = False,
+    ):
+        self.state_machine = state_machine
+        self.layers = layers
+        self.max_concurrency = max_concurrency
+        self.tolerated_failure_percentage = tolerated_failure_percentage
+        self.metrics_namespace = metrics_namespace
+        self.client_config = client_config
+        self.tracing = tracing
+
+
+class BulkService(pulumi.ComponentResource):
+    def __init__(
+        self,
+        name: str,
+        args: BulkServiceArgs,
+        opts: Optional[pulumi.ResourceOptions] = None,
+    ):
+        super().__init__("sfn-demo-saga:BulkService", name, {}, opts)
+
+        # Bucket the trip manifests are uploaded to.
+        self.trips_bucket = aws.s3.BucketV2(
+            f"{name}-trips",
+            force_destroy=True,
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        aws.s3.BucketPublicAccessBlock(
+            f"{name}-trips",
+            bucket=self.trips_bucket.id,
+            block_public_acls=True,
+            block_public_policy=True,
+            ignore_public_acls=True,
+            restrict_public_buckets=True,
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        # Functions emit metrics in Embedded Metric Format to the namespace.
+        metrics_environment = {}
+        if args.metrics_namespace:
+            metrics_environment["METRICS_NAMESPACE"] = args.metrics_namespace
+
+        # Functions create AWS clients with the timeouts and retries.
+        client_environment = {}
+        if args.client_config:
+            client_environment["CLIENT_CONFIG"] = json.dumps(
+                args.client_config
+            )
+
+        lambda_role = aws.iam.Role(
+            f"{name}-lambda-role",
+            assume_role_policy=json.dumps(
+                {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Action": "sts:AssumeRole",
+                            "Principal": {"Service": "lambda.amazonaws.com"},
+                            "Effect": "Allow",
+                            "Sid": "",
+                        }
+                    ],
+                }
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        lambda_role_policy = aws.iam.RolePolicy(
+            f"{name}-lambda-role-policy",
+            role=lambda_role.id,
+            policy=self.trips_bucket.arn.apply(
+                lambda bucket: json.dumps(
+                    {
+                        "Version": "2012-10-17",
+                        "Statement": [
+                            {
+                                "Effect": "Allow",
+                                "Action": [
+                                    "logs:CreateLogGroup",
+                                    "logs:CreateLogStream",
+                                    "logs:PutLogEvents",
+                                ],
+                                "Resource": "arn:aws:logs:*:*:*",
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Action": ["s3:GetObject"],
+                                "Resource": f"{bucket}/results/*",
+                            },
+                        ],
+                    }
+                )
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        # Allow the function to send traces to X-Ray.
+        role_policies = [lambda_role_policy]
+        if args.tracing:
+            role_policies.append(
+                aws.iam.RolePolicyAttachment(
+                    f"{name}-lambda-role-xray",
+                    role=lambda_role.name,
+                    policy_arn=(
+                        "arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess"
+                    ),
+                    opts=pulumi.ResourceOptions(parent=self),
+                )
+            )
+
+        # Function counting the trips from the results of the map run, which
+        # may take a while for large runs.
+        self.count_trips_lambda = aws.lambda_.Function(
+            f"{name}-count-trips",
+            runtime="python3.8",
+            code=pulumi.AssetArchive(
+                {".": pulumi.FileArchive("../lambdas/count-trips")}
+            ),
+            handler="lambda_function.lambda_handler",
+            layers=args.layers,
+            timeout=60,
+            memory_size=512,
+            role=lambda_role.arn,
+            tracing_config=aws.lambda_.FunctionTracingConfigArgs(
+                mode="Active" if args.tracing else "PassThrough"
+            ),
+            environment=aws.lambda_.FunctionEnvironmentArgs(
+                variables={**metrics_environment, **client_environment}
+            ),
+            opts=pulumi.ResourceOptions(parent=self, depends_on=role_policies),
+        )
+
+        aws.cloudwatch.LogGroup(
+            f"{name}-count-trips",
+            name=self.count_trips_lambda.name.apply(
+                lambda name: f"/aws/lambda/{name}"
+            ),
+            retention_in_days=7,
+            opts=pulumi.ResourceOptions(
+                parent=self, depends_on=[self.count_trips_lambda]
+            ),
+        )
+
+        state_machine_role = aws.iam.Role(
+            f"{name}-state-machine-role",
+            assume_role_policy=json.dumps(
+                {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Effect": "Allow",
+                            "Principal": {
+                                "Service": (
+                                    f"states.{aws.config.region}.amazonaws.com"
+                                )
+                            },
+                            "Action": "sts:AssumeRole",
+                        }
+                    ],
+                }
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        # The name is known up front, so that the state machine may be
+        # allowed to start child executions of its own map runs.
+        state_machine_name = f"{name}-{pulumi.get_stack()}"
+        identity = aws.get_caller_identity()
+        prefix = f"arn:aws:states:{aws.config.region}:{identity.account_id}"
+        tracing_statements = []
+        if args.tracing:
+            tracing_statements.append(
+                {
+                    "Effect": "Allow",
+                    "Action": [
+                        "xray:PutTraceSegments",
+                        "xray:PutTelemetryRecords",
+                        "xray:GetSamplingRules",
+                        "xray:GetSamplingTargets",
+                    ],
+                    "Resource": "*",
+                }
+            )
+
+        state_machine_role_policy = aws.iam.RolePolicy(
+            f"{name}-state-machine-role-policy",
+            role=state_machine_role.id,
+            policy=pulumi.Output.all(
+                saga=args.state_machine.arn,
+                saga_name=args.state_machine.name,
+                bucket=self.trips_bucket.arn,
+                count_trips=self.count_trips_lambda.arn,
+            ).apply(
+                lambda outputs: json.dumps(
+                    {
+                        "Version": "2012-10-17",
+                        "Statement": [
+                            {
+                                "Effect": "Allow",
+                                "Action": ["states:StartExecution"],
+                                "Resource": [
+                                    outputs["saga"],
+                                    f"{prefix}:stateMachine:"
+                                    f"{state_machine_name}",
+                                ],
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Action": [
+                                    "states:DescribeExecution",
+                                    "states:StopExecution",
+                                ],
+                                "Resource": [
+                                    f"{prefix}:execution:"
+                                    f"{outputs['saga_name']}:*",
+                                    f"{prefix}:execution:"
+                                    f"{state_machine_name}/*",
+                                ],
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Action": [
+                                    "events:PutTargets",
+                                    "events:PutRule",
+                                    "events:DescribeRule",
+                                ],
+                                "Resource": (
+                                    f"arn:aws:events:{aws.config.region}:"
+                                    f"{identity.account_id}:rule/"
+                                    "StepFunctionsGetEventsForStepFunctions"
+                                    "ExecutionRule"
+                                ),
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Action": ["s3:GetObject"],
+                                "Resource": f"{outputs['bucket']}/*",
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Action": [
+                                    "s3:PutObject",
+                                    "s3:ListMultipartUploadParts",
+                                    "s3:AbortMultipartUpload",
+                                ],
+                                "Resource": f"{outputs['bucket']}/results/*",
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Action": ["lambda:InvokeFunction"],
+                                "Resource": outputs["count_trips"],
+                            },
+                            *tracing_statements,
+                        ],
+                    }
+                )
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        self.state_machine = aws.sfn.StateMachine(
+            f"{name}-state-machine",
+            name=state_machine_name,
+            role_arn=state_machine_role.arn,
+            type="STANDARD",
+            tracing_configuration=aws.sfn.StateMachineTracingConfigurationArgs(
+                enabled=args.tracing
+            ),
+            definition=pulumi.Output.all(
+                saga=args.state_machine.arn,
+                count_trips=self.count_trips_lambda.arn,
+            ).apply(
+                lambda outputs: json.dumps(
+                    bulk_definition(
+                        outputs["saga"],
+                        outputs["count_trips"],
+                        args.max_concurrency,
+                        args.tolerated_failure_percentage,
+                    )
+                )
+            ),
+            opts=pulumi.ResourceOptions(
+                parent=self, depends_on=[state_machine_role_policy]
+            ),
+        )
+
+        self.register_outputs({})
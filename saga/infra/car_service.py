@@ -1,21 +1,85 @@
 import json
-from typing import Optional
+from typing import Any, Mapping, Optional, Sequence
 
 import pulumi
 import pulumi_aws as aws
 
+from autoscaling import table_autoscaling
+from function import batch_queue, check_concurrency, function_alias
+
 
 __all__ = ["CarServiceArgs", "CarService"]
 
+# Timeout of the function booking trips in batches in seconds.
+BATCH_TIMEOUT = 30
+
 
 class CarServiceArgs:
     def __init__(
         self,
         book_car_fail_rate: float = 0.0,
         cancel_car_fail_rate: float = 0.0,
+        book_car_chaos: Optional[Mapping[str, Any]] = None,
+        cancel_car_chaos: Optional[Mapping[str, Any]] = None,
+        layers: Optional[Sequence[pulumi.Input[str]]] = None,
+        alias: str = "live",
+        book_car_memory_size: int = 128,
+        cancel_car_memory_size: int = 128,
+        book_car_reserved_concurrency: Optional[int] = None,
+        cancel_car_reserved_concurrency: Optional[int] = None,
+        book_car_provisioned_concurrency: Optional[int] = None,
+        cancel_car_provisioned_concurrency: Optional[int] = None,
+        batch_queue: bool = False,
+        batch_size: int = 10,
+        billing_mode: str = "PROVISIONED",
+        read_capacity: int = 1,
+        write_capacity: int = 1,
+        max_read_capacity: Optional[int] = None,
+        max_write_capacity: Optional[int] = None,
+        target_utilization: float = 70.0,
+        bookings_table: Optional[aws.dynamodb.Table] = None,
+        metrics_namespace: Optional[str] = None,
+        client_config: Optional[Mapping[str, Any]] = None,
+        tracing: bool = False,
     ):
         self.book_car_fail_rate = book_car_fail_rate
         self.cancel_car_fail_rate = cancel_car_fail_rate
+        self.book_car_chaos = book_car_chaos
+        self.cancel_car_chaos = cancel_car_chaos
+        self.layers = layers
+        self.alias = alias
+        self.book_car_memory_size = book_car_memory_size
+        self.cancel_car_memory_size = cancel_car_memory_size
+        self.book_car_reserved_concurrency = book_car_reserved_concurrency
+        self.cancel_car_reserved_concurrency = cancel_car_reserved_concurrency
+        self.book_car_provisioned_concurrency = (
+            book_car_provisioned_concurrency
+        )
+        self.cancel_car_provisioned_concurrency = (
+            cancel_car_provisioned_concurrency
+        )
+        self.batch_queue = batch_queue
+        self.batch_size = batch_size
+        self.billing_mode = billing_mode
+        self.read_capacity = read_capacity
+        self.write_capacity = write_capacity
+        self.max_read_capacity = max_read_capacity
+        self.max_write_capacity = max_write_capacity
+        self.target_utilization = target_utilization
+        self.bookings_table = bookings_table
+        self.metrics_namespace = metrics_namespace
+        self.client_config = client_config
+        self.tracing = tracing
+        check_concurrency(
+            "book-car",
+            book_car_reserved_concurrency,
+            book_car_provisioned_concurrency,
+        )
+        check_concurrency(
+            "cancel-car",
+            cancel_car_reserved_concurrency,
+            cancel_car_provisioned_concurrency,
+        )
 
 
 class CarService(pulumi.ComponentResource):
@@ -27,17 +91,28 @@ class CarService(pulumi.ComponentResource):
     ):
         super().__init__("sfn-demo-saga:CarService", name, {}, opts)
 
-        bookings_table = aws.dynamodb.Table(
-            f"{name}-bookings",
-            attributes=[
-                aws.dynamodb.TableAttributeArgs(name="trip_id", type="S"),
-            ],
-            billing_mode="PROVISIONED",
-            hash_key="trip_id",
-            read_capacity=1,
-            write_capacity=1,
-            opts=pulumi.ResourceOptions(parent=self),
-        )
+        if args.bookings_table is not None:
+            # Bookings of all the services share a single table.
+            self.bookings_table = args.bookings_table
+            table_environment = {
+                "BOOKINGS_TABLE": self.bookings_table.id,
+                "BOOKINGS_SERVICE": "car",
+            }
+        else:
+            self.bookings_table = self._create_bookings_table(name, args)
+            table_environment = {"BOOKINGS_TABLE": self.bookings_table.id}
+
+        # Functions emit metrics in Embedded Metric Format to the namespace.
+        metrics_environment = {}
+        if args.metrics_namespace:
+            metrics_environment["METRICS_NAMESPACE"] = args.metrics_namespace
+
+        # Functions create AWS clients with the timeouts and retries.
+        client_environment = {}
+        if args.client_config:
+            client_environment["CLIENT_CONFIG"] = json.dumps(
+                args.client_config
+            )
 
         lambda_role = aws.iam.Role(
             f"{name}-lambda-role",
@@ -60,7 +135,7 @@ class CarService(pulumi.ComponentResource):
         lambda_role_policy = aws.iam.RolePolicy(
             f"{name}-lambda-role-policy",
             role=lambda_role.id,
-            policy=bookings_table.arn.apply(
+            policy=self.bookings_table.arn.apply(
                 lambda bookings_table: json.dumps(
                     {
                         "Version": "2012-10-17",
@@ -90,6 +165,42 @@ class CarService(pulumi.ComponentResource):
             opts=pulumi.ResourceOptions(parent=self),
         )
 
+        # Allow the functions to send traces to X-Ray.
+        role_policies = [lambda_role_policy]
+        if args.tracing:
+            role_policies.append(
+                aws.iam.RolePolicyAttachment(
+                    f"{name}-lambda-role-xray",
+                    role=lambda_role.name,
+                    policy_arn=(
+                        "arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess"
+                    ),
+                    opts=pulumi.ResourceOptions(parent=self),
+                )
+            )
+
+        # Allow the batch function to receive messages from the queue.
+        if args.batch_queue:
+            role_policies.append(
+                aws.iam.RolePolicyAttachment(
+                    f"{name}-lambda-role-sqs",
+                    role=lambda_role.name,
+                    policy_arn=(
+                        "arn:aws:iam::aws:policy/service-role/"
+                        "AWSLambdaSQSQueueExecutionRole"
+                    ),
+                    opts=pulumi.ResourceOptions(parent=self),
+                )
+            )
+
+        book_car_environment = {
+            **table_environment,
+            **metrics_environment,
+            **client_environment,
+            "FAIL_RATE": str(args.book_car_fail_rate),
+            "CHAOS": json.dumps(args.book_car_chaos or {}),
+        }
+
         self.book_car_lambda = aws.lambda_.Function(
             f"{name}-book-car",
             runtime="python3.8",
@@ -97,18 +208,21 @@ class CarService(pulumi.ComponentResource):
                 {".": pulumi.FileArchive("../lambdas/book-car")}
             ),
             handler="lambda_function.lambda_handler",
+            layers=args.layers,
+            memory_size=args.book_car_memory_size,
             timeout=1,
+            reserved_concurrent_executions=(
+                args.book_car_reserved_concurrency
+            ),
             role=lambda_role.arn,
             publish=True,
-            environment=aws.lambda_.FunctionEnvironmentArgs(
-                variables={
-                    "BOOKINGS_TABLE": bookings_table.id,
-                    "FAIL_RATE": str(args.book_car_fail_rate),
-                }
+            tracing_config=aws.lambda_.FunctionTracingConfigArgs(
+                mode="Active" if args.tracing else "PassThrough"
             ),
-            opts=pulumi.ResourceOptions(
-                parent=self, depends_on=[lambda_role_policy]
+            environment=aws.lambda_.FunctionEnvironmentArgs(
+                variables=book_car_environment
             ),
+            opts=pulumi.ResourceOptions(parent=self, depends_on=role_policies),
         )
 
         aws.cloudwatch.LogGroup(
@@ -122,6 +236,65 @@ class CarService(pulumi.ComponentResource):
             ),
         )
 
+        self.book_car_alias = function_alias(
+            f"{name}-book-car",
+            self.book_car_lambda,
+            args.alias,
+            args.book_car_provisioned_concurrency,
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        # Trips sent to the queue are booked in batches, see README.
+        if args.batch_queue:
+            self.book_car_batch_lambda = aws.lambda_.Function(
+                f"{name}-book-car-batch",
+                runtime="python3.8",
+                code=pulumi.AssetArchive(
+                    {".": pulumi.FileArchive("../lambdas/book-car")}
+                ),
+                handler="lambda_function.batch_handler",
+                layers=args.layers,
+                memory_size=args.book_car_memory_size,
+                timeout=BATCH_TIMEOUT,
+                role=lambda_role.arn,
+                publish=True,
+                tracing_config=aws.lambda_.FunctionTracingConfigArgs(
+                    mode="Active" if args.tracing else "PassThrough"
+                ),
+                environment=aws.lambda_.FunctionEnvironmentArgs(
+                    variables=book_car_environment
+                ),
+                opts=pulumi.ResourceOptions(
+                    parent=self, depends_on=role_policies
+                ),
+            )
+
+            aws.cloudwatch.LogGroup(
+                f"{name}-book-car-batch",
+                name=self.book_car_batch_lambda.name.apply(
+                    lambda name: f"/aws/lambda/{name}"
+                ),
+                retention_in_days=7,
+                opts=pulumi.ResourceOptions(
+                    parent=self, depends_on=[self.book_car_batch_lambda]
+                ),
+            )
+
+            self.book_car_batch_alias = function_alias(
+                f"{name}-book-car-batch",
+                self.book_car_batch_lambda,
+                args.alias,
+                opts=pulumi.ResourceOptions(parent=self),
+            )
+
+            self.book_car_queue = batch_queue(
+                f"{name}-book-car",
+                self.book_car_batch_alias,
+                BATCH_TIMEOUT,
+                args.batch_size,
+                opts=pulumi.ResourceOptions(parent=self),
+            )
+
         self.cancel_car_lambda = aws.lambda_.Function(
             f"{name}-cancel-car",
             runtime="python3.8",
@@ -129,18 +302,27 @@ class CarService(pulumi.ComponentResource):
                 {".": pulumi.FileArchive("../lambdas/cancel-car")}
             ),
             handler="lambda_function.lambda_handler",
+            layers=args.layers,
+            memory_size=args.cancel_car_memory_size,
             timeout=1,
+            reserved_concurrent_executions=(
+                args.cancel_car_reserved_concurrency
+            ),
             role=lambda_role.arn,
             publish=True,
+            tracing_config=aws.lambda_.FunctionTracingConfigArgs(
+                mode="Active" if args.tracing else "PassThrough"
+            ),
             environment=aws.lambda_.FunctionEnvironmentArgs(
                 variables={
-                    "BOOKINGS_TABLE": bookings_table.id,
+                    **table_environment,
+                    **metrics_environment,
+                    **client_environment,
                     "FAIL_RATE": str(args.cancel_car_fail_rate),
+                    "CHAOS": json.dumps(args.cancel_car_chaos or {}),
                 }
             ),
-            opts=pulumi.ResourceOptions(
-                parent=self, depends_on=[lambda_role_policy]
-            ),
+            opts=pulumi.ResourceOptions(parent=self, depends_on=role_policies),
         )
 
         aws.cloudwatch.LogGroup(
@@ -154,4 +336,54 @@ class CarService(pulumi.ComponentResource):
             ),
         )
 
+        self.cancel_car_alias = function_alias(
+            f"{name}-cancel-car",
+            self.cancel_car_lambda,
+            args.alias,
+            args.cancel_car_provisioned_concurrency,
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
         self.register_outputs({})
+
+    def _create_bookings_table(
+        self, name: str, args: CarServiceArgs
+    ) -> aws.dynamodb.Table:
+        """Create table of the service bookings with configured capacity."""
+        provisioned = args.billing_mode == "PROVISIONED"
+        autoscaled = {}
+        if provisioned and args.max_read_capacity:
+            autoscaled["Read"] = args.max_read_capacity
+        if provisioned and args.max_write_capacity:
+            autoscaled["Write"] = args.max_write_capacity
+
+        bookings_table = aws.dynamodb.Table(
+            f"{name}-bookings",
+            attributes=[
+                aws.dynamodb.TableAttributeArgs(name="trip_id", type="S"),
+            ],
+            billing_mode=args.billing_mode,
+            hash_key="trip_id",
+            read_capacity=args.read_capacity if provisioned else None,
+            write_capacity=args.write_capacity if provisioned else None,
+            opts=pulumi.ResourceOptions(
+                parent=self,
+                # Capacity of autoscaled tables is managed by the policies.
+                ignore_changes=[
+                    f"{dimension.lower()}_capacity" for dimension in autoscaled
+                ],
+            ),
+        )
+
+        for dimension, max_capacity in autoscaled.items():
+            table_autoscaling(
+                f"{name}-bookings",
+                bookings_table,
+                dimension,
+                getattr(args, f"{dimension.lower()}_capacity"),
+                max_capacity,
+                args.target_utilization,
+                opts=pulumi.ResourceOptions(parent=self),
+            )
+
+        return bookings_table
@@ -0,0 +1,1476 @@
+"""Builder of the saga state machine definition.
+
+Run the module to validate the definition offline and print it with
+placeholder function names::
+
+   python definition.py
+"""
+import json
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+
+__all__ = [
+    "SERVICES",
+    "BOOK_RETRY",
+    "CANCEL_RETRY",
+    "EXPRESS_CANCEL_RETRY",
+    "RECOVER_RETRY",
+    "START_EXECUTION_RETRY",
+    "DESCRIBE_EXECUTION_RETRY",
+    "COUNT_TRIPS_RETRY",
+    "RECOVERY_MODES",
+    "DYNAMODB_BOOK_RETRY",
+    "ERROR_CLASSES",
+    "BOOK_FAILED_ERRORS",
+    "THROTTLING_RETRY",
+    "DefinitionError",
+    "SagaStep",
+    "DynamoDBSagaStep",
+    "retry",
+    "retry_from_config",
+    "select_fields",
+    "saga_step",
+    "dynamodb_saga_step",
+    "saga_definition",
+    "bulk_definition",
+    "validate_definition",
+]
+
+# Services taking part in the saga and the trip fields they store.
+SERVICES = {
+    "hotel": ["hotel", "check_in", "check_out"],
+    "flight": ["depart", "depart_at", "arrive", "arrive_at"],
+    "car": ["rental", "rental_from", "rental_to"],
+}
+
+LAMBDA_INVOKE = "arn:aws:states:::lambda:invoke"
+DYNAMODB = "arn:aws:states:::dynamodb"
+START_EXECUTION_SYNC = "arn:aws:states:::states:startExecution.sync:2"
+DESCRIBE_EXECUTION = "arn:aws:states:::aws-sdk:sfn:describeExecution"
+S3_GET_OBJECT = "arn:aws:states:::s3:getObject"
+S3_PUT_OBJECT = "arn:aws:states:::s3:putObject"
+
+CONDITIONAL_CHECK_FAILED = "DynamoDB.ConditionalCheckFailedException"
+
+
+# Errors of the classes retried by different policies. Lambda functions fail
+# with the name of the exception, DynamoDB integrations prefix the error code.
+ERROR_CLASSES = {
+    "lambda": [
+        "Lambda.ServiceException",
+        "Lambda.AWSLambdaException",
+        "Lambda.SdkClientException",
+    ],
+    "throttling": [
+        "Lambda.TooManyRequestsException",
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "ThrottlingException",
+        "DynamoDB.ProvisionedThroughputExceededException",
+        "DynamoDB.RequestLimitExceededException",
+    ],
+    "dynamodb": [
+        "DynamoDB.InternalServerErrorException",
+        "DynamoDB.AmazonDynamoDBException",
+    ],
+}
+
+
+# Errors of bookings known to have failed before anything was written: the
+# booking has been cancelled already, a fault was injected or the request was
+# throttled. Any other error, e.g. a timeout or a lost response, may follow
+# the write and the booking has to be compensated.
+BOOK_FAILED_ERRORS = [
+    "BookingCancelledError",
+    "InjectedFaultError",
+    *ERROR_CLASSES["throttling"],
+]
+
+
+def retry(
+    errors: Sequence[str],
+    interval_seconds: int = 1,
+    max_attempts: int = 3,
+    backoff_rate: float = 2.0,
+    max_delay_seconds: Optional[int] = None,
+    jitter_strategy: Optional[str] = None,
+) -> dict:
+    """Return retrier of a ``Retry`` field.
+
+    Errors may be given by name or as a name of an error class in
+    :data:`ERROR_CLASSES` which is expanded to the errors of the class.
+    """
+    retrier = {
+        "ErrorEquals": [
+            error
+            for name in errors
+            for error in ERROR_CLASSES.get(name, [name])
+        ],
+        "IntervalSeconds": interval_seconds,
+        "MaxAttempts": max_attempts,
+        "BackoffRate": backoff_rate,
+    }
+    if max_delay_seconds is not None:
+        retrier["MaxDelaySeconds"] = max_delay_seconds
+    if jitter_strategy is not None:
+        retrier["JitterStrategy"] = jitter_strategy
+    return retrier
+
+
+def _max_attempts(retriers: Sequence[Mapping[str, Any]], error: str) -> int:
+    """Return number of retries of the error by the first matching retrier."""
+    for retrier in retriers:
+        if {error, "States.ALL"} & set(retrier["ErrorEquals"]):
+            return retrier.get("MaxAttempts", 3)
+    return 0
+
+
+def retry_from_config(retriers: Sequence[Mapping[str, Any]]) -> List[dict]:
+    """Return ``Retry`` field from configuration, e.g.::
+
+    [{"errors": ["BookingCancelledError"], "max_attempts": 0},
+     {"errors": ["throttling"], "interval_seconds": 2, "max_attempts": 10,
+      "max_delay_seconds": 60, "jitter_strategy": "FULL"}]
+
+    Each retrier takes the arguments of :func:`retry`.
+    """
+    return [retry(**retrier) for retrier in retriers]
+
+
+# Throttled requests are spread out by full jitter so that sagas throttled at
+# the same time don't retry in lockstep, and the delay is capped.
+THROTTLING_RETRY = retry(
+    ["throttling"],
+    interval_seconds=1,
+    max_attempts=6,
+    backoff_rate=2,
+    max_delay_seconds=20,
+    jitter_strategy="FULL",
+)
+
+# Booking is retried only on transient Lambda service errors and throttling.
+# Cancelled bookings are never retried, the retrier documents that in case a
+# catch-all retrier is appended.
+BOOK_RETRY = [
+    retry(["BookingCancelledError"], max_attempts=0),
+    THROTTLING_RETRY,
+    retry(
+        ["lambda"],
+        max_attempts=5,
+        backoff_rate=2,
+        max_delay_seconds=20,
+        jitter_strategy="FULL",
+    ),
+]
+
+# Direct DynamoDB writes are retried only on throttling and server errors.
+DYNAMODB_BOOK_RETRY = [
+    THROTTLING_RETRY,
+    retry(
+        ["dynamodb"],
+        max_attempts=5,
+        backoff_rate=2,
+        max_delay_seconds=20,
+        jitter_strategy="FULL",
+    ),
+]
+
+# Compensation should be retried until it succeeds, for the purpose of the
+# demo the number of attempts is high but finite. The delay is capped so that
+# the attempts keep coming at a steady pace.
+CANCEL_RETRY = [
+    retry(
+        ["States.ALL"],
+        max_attempts=100,
+        backoff_rate=2,
+        max_delay_seconds=60,
+        jitter_strategy="FULL",
+    )
+]
+
+# Express workflows run for at most five minutes, so compensation is retried
+# only as many times as fits in.
+EXPRESS_CANCEL_RETRY = [
+    retry(
+        ["States.ALL"],
+        max_attempts=6,
+        backoff_rate=2,
+        max_delay_seconds=30,
+        jitter_strategy="FULL",
+    )
+]
+
+# Failed bookings are retried once more before compensating the trip in the
+# forward recovery, except for those which have been cancelled.
+RECOVER_RETRY = [
+    retry(["BookingCancelledError"], max_attempts=0),
+    retry(
+        ["States.ALL"],
+        max_attempts=3,
+        backoff_rate=2,
+        max_delay_seconds=20,
+        jitter_strategy="FULL",
+    ),
+]
+
+# Child saga executions are retried if they can't be started.
+START_EXECUTION_RETRY = [
+    retry(
+        [
+            "StepFunctions.ExecutionLimitExceededException",
+            "StepFunctions.AWSStepFunctionsException",
+            "StepFunctions.SdkClientException",
+        ],
+        max_attempts=5,
+        backoff_rate=2,
+        max_delay_seconds=20,
+        jitter_strategy="FULL",
+    )
+]
+
+# Existing child saga executions are described again if they can't be.
+DESCRIBE_EXECUTION_RETRY = [
+    retry(
+        ["Sfn.ThrottlingException", "Sfn.SfnException"],
+        max_attempts=5,
+        backoff_rate=2,
+        max_delay_seconds=20,
+        jitter_strategy="FULL",
+    )
+]
+
+# Trips booked in bulk are counted again if the function fails transiently.
+COUNT_TRIPS_RETRY = [
+    retry(
+        ["lambda", "throttling"],
+        max_attempts=5,
+        backoff_rate=2,
+        max_delay_seconds=20,
+        jitter_strategy="FULL",
+    )
+]
+
+# Recovery strategies of the saga.
+RECOVERY_MODES = ("backward", "forward")
+
+# Jitter strategies of retriers.
+JITTER_STRATEGIES = ("FULL", "NONE")
+
+
+# Fields of the errors kept in the state payload.
+ERROR_FIELDS = ["Error"]
+
+
+def select_fields(fields: Sequence[str], path: str = "$") -> dict:
+    """Return template selecting the fields of the object at the path."""
+    return {f"{field}.$": f"{path}.{field}" for field in fields}
+
+
+class DefinitionError(Exception):
+    """State machine definition is not valid."""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("Invalid definition:\n" + "\n".join(problems))
+        self.problems = problems
+
+
+class SagaStep:
+    """Step of the saga booking a part of the trip.
+
+    The step consists of a task invoking the booking Lambda function with the
+    payload fields picked from the trip and a task invoking the cancelling
+    Lambda function compensating the booking.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        book: str,
+        cancel: str,
+        payload_fields: Sequence[str],
+        book_retry: Optional[List[dict]] = None,
+        cancel_retry: Optional[List[dict]] = None,
+        recover_retry: Optional[List[dict]] = None,
+    ):
+        self.name = name
+        self.book = book
+        self.cancel = cancel
+        self.payload_fields = list(payload_fields)
+        self.book_retry = BOOK_RETRY if book_retry is None else book_retry
+        self.cancel_retry = (
+            CANCEL_RETRY if cancel_retry is None else cancel_retry
+        )
+        self.recover_retry = (
+            RECOVER_RETRY if recover_retry is None else recover_retry
+        )
+
+    @property
+    def book_state_name(self) -> str:
+        return f"Book{self.name.title()}"
+
+    @property
+    def recover_state_name(self) -> str:
+        return f"Rebook{self.name.title()}"
+
+    @property
+    def cancel_state_name(self) -> str:
+        return f"Cancel{self.name.title()}"
+
+    @property
+    def result_path(self) -> str:
+        """Path of the booking result in the input of ``CancelTrip``."""
+        return f"$.results.book_trip.book_{self.name}"
+
+    def _task(self, function_name: str, payload: dict, retry: list) -> dict:
+        return {
+            "Type": "Task",
+            "Resource": LAMBDA_INVOKE,
+            "Parameters": {"FunctionName": function_name, "Payload": payload},
+            "ResultSelector": {"result.$": "$.Payload"},
+            "ResultPath": "$",
+            "Retry": retry,
+            "End": True,
+        }
+
+    def _book_failed(self, status: str) -> dict:
+        # The cause of the error with the stack trace is left in the
+        # execution history only.
+        return {
+            "Type": "Pass",
+            "Parameters": {
+                "result": {
+                    "status": status,
+                    "error": select_fields(ERROR_FIELDS, "$.error"),
+                }
+            },
+            "End": True,
+        }
+
+    def _book_task(self) -> dict:
+        payload = select_fields(["trip_id", *self.payload_fields])
+        return self._task(self.book, payload, self.book_retry)
+
+    def _cancel_task(self) -> dict:
+        payload = {"trip_id.$": "$.trip_id"}
+        return self._task(self.cancel, payload, self.cancel_retry)
+
+    def book_branch(self) -> dict:
+        """Return branch of the ``BookTrip`` state.
+
+        Errors are caught within the branch and recorded in the result, so
+        that the other branches finish and it's known which bookings have to
+        be compensated. Only the errors in :data:`BOOK_FAILED_ERRORS` are
+        known to leave nothing written, after any other error (e.g. a
+        timeout) the booking may or may not have been created and its status
+        is unknown.
+        """
+        name = self.book_state_name
+        task = self._book_task()
+        task["Catch"] = task.get("Catch", []) + [
+            {
+                "ErrorEquals": BOOK_FAILED_ERRORS,
+                "ResultPath": "$.error",
+                "Next": f"{name}Failed",
+            },
+            {
+                "ErrorEquals": ["States.ALL"],
+                "ResultPath": "$.error",
+                "Next": f"{name}Unconfirmed",
+            },
+        ]
+        return {
+            "StartAt": name,
+            "States": {
+                name: task,
+                f"{name}Unconfirmed": self._book_failed("unknown"),
+                f"{name}Failed": self._book_failed("failed"),
+            },
+        }
+
+    def recover_branch(self) -> dict:
+        """Return branch of the ``RecoverTrip`` state.
+
+        The booking is kept if it has been booked, otherwise the states of
+        the ``BookTrip`` branch are repeated under different names with
+        ``recover_retry``. The book handlers are idempotent, so that a
+        booking which has been created despite failing is confirmed.
+        """
+        book_name = self.book_state_name
+        name = self.recover_state_name
+        branch = _renamed(self.book_branch(), book_name, name)
+        branch["States"][name]["Retry"] = self.recover_retry
+        check = f"Check{self.name.title()}Recovery"
+        branch["States"][check] = {
+            "Type": "Choice",
+            "Choices": [
+                {
+                    "Variable": f"{self.result_path}.status",
+                    "StringEquals": "booked",
+                    "Next": f"{name}Skipped",
+                }
+            ],
+            "Default": branch["StartAt"],
+        }
+        branch["States"][f"{name}Skipped"] = {
+            "Type": "Pass",
+            "Parameters": {"result.$": self.result_path},
+            "End": True,
+        }
+        branch["StartAt"] = check
+        return branch
+
+    def cancel_branch(self) -> dict:
+        """Return branch of the ``CancelTrip`` state.
+
+        The booking is cancelled unless it's known to have failed. If the
+        booking result is missing as ``BookTrip`` failed as a whole, it's
+        cancelled too.
+        """
+        name = self.cancel_state_name
+        status = f"{self.result_path}.status"
+        return {
+            "StartAt": f"Check{self.name.title()}Booking",
+            "States": {
+                f"Check{self.name.title()}Booking": {
+                    "Type": "Choice",
+                    "Choices": [
+                        {"Variable": status, "IsPresent": False, "Next": name},
+                        {
+                            "Variable": status,
+                            "StringEquals": "failed",
+                            "Next": f"{name}Skipped",
+                        },
+                    ],
+                    "Default": name,
+                },
+                name: self._cancel_task(),
+                f"{name}Skipped": {
+                    "Type": "Pass",
+                    "Result": {"result": {"status": "skipped"}},
+                    "End": True,
+                },
+            },
+        }
+
+
+def saga_step(
+    name: str,
+    book: str,
+    cancel: str,
+    payload_fields: Sequence[str],
+    book_retry: Optional[List[dict]] = None,
+    cancel_retry: Optional[List[dict]] = None,
+    recover_retry: Optional[List[dict]] = None,
+) -> SagaStep:
+    """Return step of the saga, see :class:`SagaStep`."""
+    return SagaStep(
+        name,
+        book,
+        cancel,
+        payload_fields,
+        book_retry,
+        cancel_retry,
+        recover_retry,
+    )
+
+
+class DynamoDBSagaStep(SagaStep):
+    """Step of the saga writing the bookings to DynamoDB directly.
+
+    The tasks use DynamoDB service integrations with the same conditions as
+    the Lambda functions, so that no function is invoked. Failures of the
+    functions are simulated by optional fault injection states in front of
+    the tasks. In the single-table design, the bookings are keyed by trip ID
+    and the step name as the service.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table: str,
+        payload_fields: Sequence[str],
+        book_fail_rate: float = 0.0,
+        cancel_fail_rate: float = 0.0,
+        book_retry: Optional[List[dict]] = None,
+        cancel_retry: Optional[List[dict]] = None,
+        single_table: bool = False,
+        recover_retry: Optional[List[dict]] = None,
+    ):
+        super().__init__(
+            name,
+            table,
+            table,
+            payload_fields,
+            DYNAMODB_BOOK_RETRY if book_retry is None else book_retry,
+            cancel_retry,
+            recover_retry,
+        )
+        self.table = table
+        self.book_fail_rate = book_fail_rate
+        self.cancel_fail_rate = cancel_fail_rate
+        self.single_table = single_table
+        # Failed conditions are handled by the following states, the first
+        # matching retrier makes sure they aren't retried.
+        self.cancel_retry = [
+            retry([CONDITIONAL_CHECK_FAILED], max_attempts=0),
+            *self.cancel_retry,
+        ]
+        self.recover_retry = [
+            retry([CONDITIONAL_CHECK_FAILED], max_attempts=0),
+            *self.recover_retry,
+        ]
+
+    @property
+    def _key(self) -> dict:
+        if self.single_table:
+            return {
+                "trip_id": {"S.$": "$.trip_id"},
+                "service": {"S": self.name},
+            }
+        return {"trip_id": {"S.$": "$.trip_id"}}
+
+    def _dynamodb_task(
+        self, action: str, parameters: dict, retry: list, **fields
+    ) -> dict:
+        return {
+            "Type": "Task",
+            "Resource": f"{DYNAMODB}:{action}",
+            "Parameters": {"TableName": self.table, **parameters},
+            "Retry": retry,
+            **fields,
+        }
+
+    def _lookup(self, retry: list, **fields) -> dict:
+        """Return task reading the booking to the ``existing`` field."""
+        return self._dynamodb_task(
+            "getItem",
+            {"Key": self._key, "ConsistentRead": True},
+            retry,
+            ResultPath="$.existing",
+            **fields,
+        )
+
+    def _book_task(self) -> dict:
+        item = dict(self._key)
+        item.update({f: {"S.$": f"$.{f}"} for f in self.payload_fields})
+        item["status"] = {"S": "booked"}
+        item["date_booked"] = {"S.$": "$$.State.EnteredTime"}
+        return self._dynamodb_task(
+            "putItem",
+            {
+                "Item": item,
+                "ConditionExpression": "attribute_not_exists(trip_id)",
+            },
+            self.book_retry,
+            ResultSelector={
+                "result": {
+                    "status": "booked",
+                    "date_booked.$": "$$.State.EnteredTime",
+                }
+            },
+            ResultPath="$",
+            End=True,
+            Catch=[
+                {
+                    "ErrorEquals": [CONDITIONAL_CHECK_FAILED],
+                    "ResultPath": "$.error",
+                    "Next": f"{self.book_state_name}Lookup",
+                }
+            ],
+        )
+
+    def _cancel_task(self) -> dict:
+        return self._dynamodb_task(
+            "updateItem",
+            {
+                "Key": self._key,
+                "ConditionExpression": (
+                    "attribute_exists(trip_id) AND #status = :booked"
+                ),
+                "UpdateExpression": (
+                    "SET #status = :status, date_cancelled = :date"
+                ),
+                "ExpressionAttributeNames": {"#status": "status"},
+                "ExpressionAttributeValues": {
+                    ":status": {"S": "cancelled"},
+                    ":booked": {"S": "booked"},
+                    ":date": {"S.$": "$$.State.EnteredTime"},
+                },
+                "ReturnValues": "ALL_NEW",
+            },
+            self.cancel_retry,
+            ResultSelector={
+                "result": {
+                    "status.$": "$.Attributes.status.S",
+                    "date_cancelled.$": "$.Attributes.date_cancelled.S",
+                }
+            },
+            ResultPath="$",
+            End=True,
+            Catch=[
+                {
+                    "ErrorEquals": [CONDITIONAL_CHECK_FAILED],
+                    "ResultPath": "$.error",
+                    "Next": f"{self.cancel_state_name}Lookup",
+                }
+            ],
+        )
+
+    def _fault_injection(
+        self, name: str, fail_rate: float, faulted: dict
+    ) -> Dict[str, dict]:
+        """Return states failing with the given rate before the task.
+
+        A random number is picked by the first state and if it falls below
+        the rate, the ``faulted`` state is entered instead of the task.
+        """
+        return {
+            f"{name}FaultInjection": {
+                "Type": "Pass",
+                "Parameters": {"roll.$": "States.MathRandom(0, 10000)"},
+                "ResultPath": "$.fault",
+                "Next": f"{name}FaultCheck",
+            },
+            f"{name}FaultCheck": {
+                "Type": "Choice",
+                "Choices": [
+                    {
+                        "Variable": "$.fault.roll",
+                        "NumericLessThan": round(fail_rate * 10000),
+                        "Next": f"{name}Faulted",
+                    }
+                ],
+                "Default": name,
+            },
+            f"{name}Faulted": faulted,
+        }
+
+    def book_branch(self) -> dict:
+        """Return branch of the ``BookTrip`` state.
+
+        If the booking already exists, it's read to find out whether it has
+        been cancelled in the meantime, the same as the Lambda function does.
+        If it can't be read, its status is unknown. Injected faults fail the
+        booking before it's written.
+        """
+        branch = super().book_branch()
+        name = self.book_state_name
+        states = branch["States"]
+        states[f"{name}Lookup"] = self._lookup(
+            self.book_retry,
+            Next=f"{name}Existing",
+            Catch=[
+                {
+                    "ErrorEquals": ["States.ALL"],
+                    "ResultPath": "$.error",
+                    "Next": f"{name}Unconfirmed",
+                }
+            ],
+        )
+        states[f"{name}Existing"] = {
+            "Type": "Choice",
+            "Choices": [
+                {
+                    "Variable": "$.existing.Item.status.S",
+                    "StringEquals": "booked",
+                    "Next": f"{name}Confirmed",
+                }
+            ],
+            "Default": f"{name}Cancelled",
+        }
+        states[f"{name}Confirmed"] = {
+            "Type": "Pass",
+            "Parameters": {
+                "result": {
+                    "status": "booked",
+                    "date_booked.$": "$.existing.Item.date_booked.S",
+                }
+            },
+            "End": True,
+        }
+        states[f"{name}Cancelled"] = {
+            "Type": "Pass",
+            "Result": {
+                "result": {
+                    "status": "failed",
+                    "error": {
+                        "Error": "BookingCancelledError",
+                        "Cause": "Booking has already been cancelled",
+                    },
+                }
+            },
+            "End": True,
+        }
+        if self.book_fail_rate:
+            states.update(
+                self._fault_injection(
+                    name,
+                    self.book_fail_rate,
+                    {
+                        "Type": "Pass",
+                        "Result": {
+                            "Error": "InjectedFaultError",
+                            "Cause": "Failed to create booking",
+                        },
+                        "ResultPath": "$.error",
+                        "Next": f"{name}Failed",
+                    },
+                )
+            )
+            branch["StartAt"] = f"{name}FaultInjection"
+        return branch
+
+    def cancel_branch(self) -> dict:
+        """Return branch of the ``CancelTrip`` state.
+
+        If the booking can't be cancelled, it's read and either its current
+        state is the result or, if it doesn't exist, a tombstone is written
+        the same way as the Lambda function does. A booking created after
+        the cancellation failed is cancelled again. Injected faults are retried
+        after a second as many times as ``cancel_retry`` retries errors of the
+        function, then the cancellation fails.
+        """
+        branch = super().cancel_branch()
+        name = self.cancel_state_name
+        states = branch["States"]
+        states[f"{name}Lookup"] = self._lookup(
+            self.cancel_retry, Next=f"{name}Existing"
+        )
+        # A booking created in the meantime is cancelled by another attempt.
+        states[f"{name}Existing"] = {
+            "Type": "Choice",
+            "Choices": [
+                {
+                    "Variable": "$.existing.Item",
+                    "IsPresent": False,
+                    "Next": f"{name}Tombstone",
+                },
+                {
+                    "Variable": "$.existing.Item.status.S",
+                    "StringEquals": "booked",
+                    "Next": name,
+                },
+            ],
+            "Default": f"{name}Confirmed",
+        }
+        states[f"{name}Confirmed"] = {
+            "Type": "Pass",
+            "Parameters": {
+                "result": {
+                    "status.$": "$.existing.Item.status.S",
+                    "date_cancelled.$": "$.existing.Item.date_cancelled.S",
+                }
+            },
+            "End": True,
+        }
+        # A booking created in the meantime fails the condition and is
+        # cancelled by another attempt.
+        states[f"{name}Tombstone"] = self._dynamodb_task(
+            "putItem",
+            {
+                "Item": {
+                    **self._key,
+                    "status": {"S": "not_booked"},
+                    "date_cancelled": {"S.$": "$$.State.EnteredTime"},
+                },
+                "ConditionExpression": "attribute_not_exists(trip_id)",
+            },
+            self.cancel_retry,
+            ResultSelector={
+                "result": {
+                    "status": "not_booked",
+                    "date_cancelled.$": "$$.State.EnteredTime",
+                }
+            },
+            ResultPath="$",
+            End=True,
+            Catch=[
+                {
+                    "ErrorEquals": [CONDITIONAL_CHECK_FAILED],
+                    "ResultPath": "$.error",
+                    "Next": name,
+                }
+            ],
+        )
+        if self.cancel_fail_rate:
+            states.update(
+                self._fault_injection(
+                    name,
+                    self.cancel_fail_rate,
+                    {
+                        "Type": "Pass",
+                        "Parameters": {
+                            "attempts.$": (
+                                "States.MathAdd($.faults.attempts, 1)"
+                            )
+                        },
+                        "ResultPath": "$.faults",
+                        "Next": f"{name}FaultRetry",
+                    },
+                )
+            )
+            states[f"{name}FaultStart"] = {
+                "Type": "Pass",
+                "Result": {"attempts": 0},
+                "ResultPath": "$.faults",
+                "Next": f"{name}FaultInjection",
+            }
+            states[f"{name}FaultRetry"] = {
+                "Type": "Choice",
+                "Choices": [
+                    {
+                        "Variable": "$.faults.attempts",
+                        "NumericGreaterThan": _max_attempts(
+                            self.cancel_retry, "InjectedFaultError"
+                        ),
+                        "Next": f"{name}FaultsExhausted",
+                    }
+                ],
+                "Default": f"{name}FaultWait",
+            }
+            states[f"{name}FaultWait"] = {
+                "Type": "Wait",
+                "Seconds": 1,
+                "Next": f"{name}FaultInjection",
+            }
+            states[f"{name}FaultsExhausted"] = {
+                "Type": "Fail",
+                "Error": "InjectedFaultError",
+                "Cause": "Failed to cancel booking",
+            }
+            check = states[f"Check{self.name.title()}Booking"]
+            for rule in check["Choices"]:
+                if rule["Next"] == name:
+                    rule["Next"] = f"{name}FaultStart"
+            check["Default"] = f"{name}FaultStart"
+        return branch
+
+
+def dynamodb_saga_step(
+    name: str,
+    table: str,
+    payload_fields: Sequence[str],
+    book_fail_rate: float = 0.0,
+    cancel_fail_rate: float = 0.0,
+    book_retry: Optional[List[dict]] = None,
+    cancel_retry: Optional[List[dict]] = None,
+    single_table: bool = False,
+    recover_retry: Optional[List[dict]] = None,
+) -> DynamoDBSagaStep:
+    """Return step of the saga, see :class:`DynamoDBSagaStep`."""
+    return DynamoDBSagaStep(
+        name,
+        table,
+        payload_fields,
+        book_fail_rate,
+        cancel_fail_rate,
+        book_retry,
+        cancel_retry,
+        single_table,
+        recover_retry,
+    )
+
+
+def _renamed(branch: dict, old: str, new: str) -> dict:
+    """Return branch with the prefix of the state names replaced."""
+
+    def rename(state_name):
+        if state_name.startswith(old):
+            return new + state_name[len(old) :]
+        return state_name
+
+    def transitions(value):
+        if isinstance(value, dict):
+            return {
+                key: (
+                    rename(item)
+                    if key in ("Next", "Default")
+                    else transitions(item)
+                )
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [transitions(item) for item in value]
+        return value
+
+    return {
+        "StartAt": rename(branch["StartAt"]),
+        "States": {
+            rename(state_name): transitions(state)
+            for state_name, state in branch["States"].items()
+        },
+    }
+
+
+def _parallel(
+    branches: List[dict], result_selector: Dict[str, str], **fields
+) -> dict:
+    return {
+        "Type": "Parallel",
+        "Branches": branches,
+        "ResultSelector": result_selector,
+        **fields,
+    }
+
+
+def _check_bookings(steps: Sequence[SagaStep], default: str) -> dict:
+    """Return choice of ``TripBooked`` if all the steps have been booked."""
+    return {
+        "Type": "Choice",
+        "Choices": [
+            {
+                "And": [
+                    {
+                        "Variable": f"{step.result_path}.status",
+                        "StringEquals": "booked",
+                    }
+                    for step in steps
+                ],
+                "Next": "TripBooked",
+            }
+        ],
+        "Default": default,
+    }
+
+
+def _book_trip_task(
+    function_name: str,
+    steps: Sequence[SagaStep],
+    retry: list,
+    catch: List[dict],
+) -> dict:
+    """Return task booking all the steps by a single function."""
+    fields = [field for step in steps for field in step.payload_fields]
+    return {
+        "Type": "Task",
+        "Resource": LAMBDA_INVOKE,
+        "Parameters": {
+            "FunctionName": function_name,
+            "Payload": select_fields(["trip_id", *fields]),
+        },
+        "ResultSelector": {
+            f"book_{step.name}.$": f"$.Payload.{step.name}" for step in steps
+        },
+        "ResultPath": "$.results.book_trip",
+        "Retry": retry,
+        "Next": "TripBooked",
+        "Catch": [
+            {**catcher, "ResultPath": "$.errors.book_trip"}
+            for catcher in catch
+        ],
+    }
+
+
+def saga_definition(
+    steps: Sequence[SagaStep],
+    comment: str = "Saga pattern demo using AWS Step Functions",
+    recovery: str = "backward",
+    trim_payloads: bool = True,
+    book_trip: Optional[str] = None,
+) -> dict:
+    """Return validated definition of the saga state machine.
+
+    The trip is booked by running the booking tasks of all the steps in
+    parallel. If any of them fails, the bookings which may have been created
+    are compensated by running the cancelling tasks in parallel.
+
+    With ``forward`` recovery, the bookings which failed are retried first
+    while the others are kept, see :meth:`SagaStep.recover_branch`, and the
+    trip is compensated only if some of them fail again.
+
+    With ``trim_payloads`` set, the branches of ``CancelTrip`` get only the
+    trip ID and the booking results instead of the whole trip, and only the
+    name of the error is kept if ``BookTrip`` fails as a whole.
+
+    With ``book_trip`` given, the trip is booked by the single function of
+    that name writing all the bookings in one transaction instead, retried
+    as the booking of the first step. The transaction leaves nothing written
+    if it fails with one of :data:`BOOK_FAILED_ERRORS`, so that nothing is
+    compensated, after any other error all the bookings are cancelled. With
+    ``forward`` recovery, the function is retried once more with the
+    ``recover_retry`` of the first step unless a booking has been cancelled.
+    """
+    if recovery not in RECOVERY_MODES:
+        raise ValueError(f"Unknown recovery mode {recovery!r}")
+    forward = recovery == "forward"
+    cancel_fields = {}
+    if trim_payloads:
+        cancel_fields["Parameters"] = {
+            "trip_id.$": "$.trip_id",
+            "results": select_fields(["book_trip"], "$.results"),
+        }
+    definition = {
+        "Comment": comment,
+        "StartAt": "BookTrip",
+        "States": {
+            "BookTrip": _parallel(
+                [step.book_branch() for step in steps],
+                {
+                    f"book_{step.name}.$": f"$[{i}].result"
+                    for i, step in enumerate(steps)
+                },
+                ResultPath="$.results.book_trip",
+                Next="CheckBookings",
+                Catch=[
+                    {
+                        "ErrorEquals": ["States.ALL"],
+                        "ResultPath": "$.errors.book_trip",
+                        "Next": (
+                            "BookTripFailed" if trim_payloads else "CancelTrip"
+                        ),
+                    }
+                ],
+            ),
+            "CheckBookings": _check_bookings(
+                steps, "RecoverTrip" if forward else "CancelTrip"
+            ),
+            "CancelTrip": _parallel(
+                [step.cancel_branch() for step in steps],
+                {
+                    f"cancel_{step.name}.$": f"$[{i}].result"
+                    for i, step in enumerate(steps)
+                },
+                ResultPath="$.results.cancel_trip",
+                Next="TripCancelled",
+                **cancel_fields,
+                Catch=[
+                    {
+                        "ErrorEquals": ["States.ALL"],
+                        "ResultPath": "$.errors.cancel_trip",
+                        "Next": "TripCancelFailed",
+                    }
+                ],
+            ),
+            "TripBooked": {"Type": "Succeed"},
+            "TripCancelled": {
+                "Type": "Fail",
+                "Error": "TripCancelledError",
+                "Cause": "Trip cancelled due to error",
+            },
+            "TripCancelFailed": {
+                "Type": "Fail",
+                "Error": "TripCancelFailedError",
+                "Cause": "Trip cancellation failed due to error",
+            },
+        },
+    }
+    if trim_payloads:
+        # None of the bookings is known to have failed.
+        definition["States"]["BookTripFailed"] = {
+            "Type": "Pass",
+            "Parameters": {
+                "trip_id.$": "$.trip_id",
+                "results": {"book_trip": {}},
+                "errors": {
+                    "book_trip": select_fields(
+                        ERROR_FIELDS, "$.errors.book_trip"
+                    )
+                },
+            },
+            "Next": "CancelTrip",
+        }
+    if forward:
+        definition["States"]["RecoverTrip"] = _parallel(
+            [step.recover_branch() for step in steps],
+            {
+                f"book_{step.name}.$": f"$[{i}].result"
+                for i, step in enumerate(steps)
+            },
+            ResultPath="$.results.book_trip",
+            Next="CheckRecovery",
+            Catch=[
+                {
+                    "ErrorEquals": ["States.ALL"],
+                    "ResultPath": "$.errors.recover_trip",
+                    "Next": "CancelTrip",
+                }
+            ],
+        )
+        definition["States"]["CheckRecovery"] = _check_bookings(
+            steps, "CancelTrip"
+        )
+    if book_trip:
+        states = definition["States"]
+        failed = "BookTripFailed" if trim_payloads else "CancelTrip"
+        catch = [
+            {"ErrorEquals": BOOK_FAILED_ERRORS, "Next": "BookTripRejected"},
+            {"ErrorEquals": ["States.ALL"], "Next": failed},
+        ]
+        del states["CheckBookings"]
+        if forward:
+            del states["CheckRecovery"]
+            states["RecoverTrip"] = _book_trip_task(
+                book_trip, steps, steps[0].recover_retry, catch
+            )
+            catch = [
+                {
+                    "ErrorEquals": ["BookingCancelledError"],
+                    "Next": "BookTripRejected",
+                },
+                {"ErrorEquals": ["States.ALL"], "Next": "RecoverTrip"},
+            ]
+        states["BookTrip"] = _book_trip_task(
+            book_trip, steps, steps[0].book_retry, catch
+        )
+        states["BookTripRejected"] = {
+            "Type": "Pass",
+            "Result": {
+                f"book_{step.name}": {"status": "failed"} for step in steps
+            },
+            "ResultPath": "$.results.book_trip",
+            "Next": "CancelTrip",
+        }
+    validate_definition(definition)
+    return definition
+
+
+def bulk_definition(
+    state_machine: str,
+    count_trips: str,
+    max_concurrency: int = 100,
+    tolerated_failure_percentage: float = 5.0,
+    comment: str = "Bulk booking of trips using the saga",
+) -> dict:
+    """Return validated definition of the state machine booking trips in bulk.
+
+    Trips are read from a JSON array in the S3 object given by ``bucket`` and
+    ``key`` fields of the input by a Distributed Map state. Each trip is
+    booked by a child execution of the saga state machine named by the trip
+    ID, so that running the same manifest again doesn't book any trip twice.
+    Once an execution has closed, starting it again fails, so the existing
+    execution is described instead and its outcome is taken for the trip.
+    Trips which can't be booked and end up cancelled are not failures, the
+    map run fails only if more than ``tolerated_failure_percentage`` of the
+    child executions fail otherwise.
+
+    Results of the child executions are written to the bucket under the
+    ``results`` prefix instead of the state payload, so that the number of
+    trips isn't limited by its size. The output contains the numbers of
+    ``booked``, ``cancelled``, ``cancel_failed`` and ``failed`` trips
+    counted from the results by the ``count_trips`` function.
+    """
+
+    def outcome(status):
+        return {"Type": "Pass", "Result": {"status": status}, "End": True}
+
+    execution_prefix = state_machine.replace(":stateMachine:", ":execution:")
+    outcomes = {
+        "booked": "TripBooked",
+        "cancelled": "TripCancelled",
+        "cancel_failed": "TripCancelFailed",
+    }
+    item_processor = {
+        "ProcessorConfig": {
+            "Mode": "DISTRIBUTED",
+            "ExecutionType": "STANDARD",
+        },
+        "StartAt": "BookTrip",
+        "States": {
+            "BookTrip": {
+                "Type": "Task",
+                "Resource": START_EXECUTION_SYNC,
+                "Parameters": {
+                    "StateMachineArn": state_machine,
+                    "Name.$": "$.trip_id",
+                    "Input.$": "$",
+                },
+                "ResultPath": None,
+                "Retry": START_EXECUTION_RETRY,
+                "Next": "TripBooked",
+                "Catch": [
+                    {
+                        "ErrorEquals": [
+                            "StepFunctions.ExecutionAlreadyExistsException"
+                        ],
+                        "ResultPath": "$.error",
+                        "Next": "DescribeTrip",
+                    },
+                    {
+                        "ErrorEquals": ["States.TaskFailed"],
+                        "ResultPath": "$.error",
+                        "Next": "ParseError",
+                    },
+                ],
+            },
+            "DescribeTrip": {
+                "Type": "Task",
+                "Resource": DESCRIBE_EXECUTION,
+                "Parameters": {
+                    "ExecutionArn.$": (
+                        f"States.Format('{execution_prefix}:{{}}', $.trip_id)"
+                    )
+                },
+                "ResultPath": "$.execution",
+                "Retry": DESCRIBE_EXECUTION_RETRY,
+                "Next": "CheckExecution",
+            },
+            "CheckExecution": {
+                "Type": "Choice",
+                "Choices": [
+                    {
+                        "Variable": "$.execution.Status",
+                        "StringEquals": "SUCCEEDED",
+                        "Next": "TripBooked",
+                    },
+                    {
+                        "Variable": "$.execution.Status",
+                        "StringEquals": "RUNNING",
+                        "Next": "WaitForTrip",
+                    },
+                ],
+                "Default": "CheckError",
+            },
+            # An execution with a different input may still be running.
+            "WaitForTrip": {
+                "Type": "Wait",
+                "Seconds": 10,
+                "Next": "DescribeTrip",
+            },
+            # The cause of a failed child execution is its description.
+            "ParseError": {
+                "Type": "Pass",
+                "Parameters": {
+                    "execution.$": "States.StringToJson($.error.Cause)"
+                },
+                "Next": "CheckError",
+            },
+            "CheckError": {
+                "Type": "Choice",
+                "Choices": [
+                    {
+                        "Variable": "$.execution.Error",
+                        "IsPresent": False,
+                        "Next": "TripFailed",
+                    },
+                    {
+                        "Variable": "$.execution.Error",
+                        "StringEquals": "TripCancelledError",
+                        "Next": "TripCancelled",
+                    },
+                    {
+                        "Variable": "$.execution.Error",
+                        "StringEquals": "TripCancelFailedError",
+                        "Next": "TripCancelFailed",
+                    },
+                ],
+                "Default": "TripFailed",
+            },
+            **{name: outcome(status) for status, name in outcomes.items()},
+            "TripFailed": {
+                "Type": "Fail",
+                "Error": "TripFailedError",
+                "Cause": "Saga execution failed",
+            },
+        },
+    }
+    definition = {
+        "Comment": comment,
+        "StartAt": "BookTrips",
+        "States": {
+            "BookTrips": {
+                "Type": "Map",
+                "ItemReader": {
+                    "Resource": S3_GET_OBJECT,
+                    "ReaderConfig": {"InputType": "JSON"},
+                    "Parameters": {"Bucket.$": "$.bucket", "Key.$": "$.key"},
+                },
+                "ItemProcessor": item_processor,
+                "MaxConcurrency": max_concurrency,
+                "ToleratedFailurePercentage": tolerated_failure_percentage,
+                "Label": "BookTrips",
+                "ResultWriter": {
+                    "Resource": S3_PUT_OBJECT,
+                    "Parameters": {
+                        "Bucket.$": "$.bucket",
+                        "Prefix": "results",
+                    },
+                },
+                "ResultPath": "$.results",
+                "Next": "CountTrips",
+            },
+            "CountTrips": {
+                "Type": "Task",
+                "Resource": LAMBDA_INVOKE,
+                "Parameters": {
+                    "FunctionName": count_trips,
+                    "Payload": {
+                        "bucket.$": "$.results.ResultWriterDetails.Bucket",
+                        "key.$": "$.results.ResultWriterDetails.Key",
+                    },
+                },
+                "ResultSelector": {
+                    f"{outcome}.$": f"$.Payload.{outcome}"
+                    for outcome in [*outcomes, "failed"]
+                },
+                "Retry": COUNT_TRIPS_RETRY,
+                "End": True,
+            },
+        },
+    }
+    validate_definition(definition)
+    return definition
+
+
+# Fields required by state types.
+REQUIRED_FIELDS = {
+    "Pass": (),
+    "Task": ("Resource",),
+    "Parallel": ("Branches",),
+    "Map": ("ItemProcessor",),
+    "Choice": ("Choices",),
+    "Wait": (),
+    "Succeed": (),
+    "Fail": (),
+}
+
+# State types ending the execution by themselves.
+TERMINAL_TYPES = ("Succeed", "Fail")
+
+
+def _validate_path(problems: List[str], where: str, path) -> None:
+    if path is not None and not (
+        isinstance(path, str) and path.startswith("$")
+    ):
+        problems.append(f"{where}: invalid path {path!r}")
+
+
+def _validate_template(problems: List[str], where: str, template) -> None:
+    if isinstance(template, dict):
+        for key, value in template.items():
+            if key.endswith(".$") and not str(value).startswith("States."):
+                _validate_path(problems, f"{where}.{key}", value)
+            else:
+                _validate_template(problems, f"{where}.{key}", value)
+    elif isinstance(template, list):
+        for i, value in enumerate(template):
+            _validate_template(problems, f"{where}[{i}]", value)
+
+
+def _validate_rule(problems: List[str], where: str, rule: dict) -> None:
+    for operator in ("And", "Or"):
+        for i, nested in enumerate(rule.get(operator, ())):
+            _validate_rule(problems, f"{where}.{operator}[{i}]", nested)
+    if "Not" in rule:
+        _validate_rule(problems, f"{where}.Not", rule["Not"])
+    elif not any(operator in rule for operator in ("And", "Or")):
+        _validate_path(problems, f"{where}.Variable", rule.get("Variable", ""))
+
+
+def _validate_retry(problems: List[str], where: str, retriers) -> None:
+    for i, retrier in enumerate(retriers):
+        prefix = f"{where}.Retry[{i}]"
+        if not retrier.get("ErrorEquals"):
+            problems.append(f"{prefix}: missing ErrorEquals")
+        if retrier.get("IntervalSeconds", 1) < 1:
+            problems.append(f"{prefix}: IntervalSeconds must be at least 1")
+        if retrier.get("MaxAttempts", 3) < 0:
+            problems.append(f"{prefix}: MaxAttempts must not be negative")
+        if retrier.get("BackoffRate", 2.0) < 1:
+            problems.append(f"{prefix}: BackoffRate must be at least 1")
+        if retrier.get("MaxDelaySeconds", 1) < 1:
+            problems.append(f"{prefix}: MaxDelaySeconds must be at least 1")
+        if retrier.get("JitterStrategy", "NONE") not in JITTER_STRATEGIES:
+            problems.append(f"{prefix}: unknown JitterStrategy")
+
+
+def _validate_map(problems: List[str], where: str, state: dict) -> None:
+    reader = state.get("ItemReader", {})
+    _validate_template(
+        problems, f"{where}.ItemReader.Parameters", reader.get("Parameters")
+    )
+    writer = state.get("ResultWriter", {})
+    _validate_template(
+        problems, f"{where}.ResultWriter.Parameters", writer.get("Parameters")
+    )
+    _validate_template(
+        problems, f"{where}.ItemSelector", state.get("ItemSelector")
+    )
+    _validate_path(problems, f"{where}.ItemsPath", state.get("ItemsPath"))
+    if state.get("MaxConcurrency", 0) < 0:
+        problems.append(f"{where}: MaxConcurrency must not be negative")
+    if not 0 <= state.get("ToleratedFailurePercentage", 0) <= 100:
+        problems.append(
+            f"{where}: ToleratedFailurePercentage must be between 0 and 100"
+        )
+
+
+def _validate_machine(problems: List[str], where: str, machine: dict):
+    states = machine.get("States") or {}
+    if not states:
+        problems.append(f"{where}: no states")
+        return
+    start_at = machine.get("StartAt")
+    if start_at not in states:
+        problems.append(f"{where}: StartAt {start_at!r} is not a state")
+
+    referenced = {start_at}
+    for name, state in states.items():
+        prefix = f"{where}.{name}"
+        state_type = state.get("Type")
+        if state_type not in REQUIRED_FIELDS:
+            problems.append(f"{prefix}: unknown type {state_type!r}")
+            continue
+        for field in REQUIRED_FIELDS[state_type]:
+            if field not in state:
+                problems.append(f"{prefix}: missing {field}")
+
+        targets = []
+        if state_type == "Choice":
+            for i, rule in enumerate(state["Choices"]):
+                _validate_rule(problems, f"{prefix}.Choices[{i}]", rule)
+                targets.append(rule.get("Next"))
+            if "Default" in state:
+                targets.append(state["Default"])
+        elif state_type not in TERMINAL_TYPES:
+            if state.get("End") and "Next" in state:
+                problems.append(f"{prefix}: both End and Next set")
+            elif not state.get("End"):
+                targets.append(state.get("Next"))
+        targets.extend(c.get("Next") for c in state.get("Catch", ()))
+        for target in targets:
+            if target not in states:
+                problems.append(f"{prefix}: Next {target!r} is not a state")
+        referenced.update(targets)
+
+        for field in ("InputPath", "OutputPath", "ResultPath"):
+            _validate_path(problems, f"{prefix}.{field}", state.get(field))
+        for field in ("Parameters", "ResultSelector"):
+            _validate_template(problems, f"{prefix}.{field}", state.get(field))
+        _validate_retry(problems, prefix, state.get("Retry", ()))
+        for i, branch in enumerate(state.get("Branches", ())):
+            _validate_machine(problems, f"{prefix}.Branches[{i}]", branch)
+        if "ItemProcessor" in state:
+            _validate_machine(
+                problems, f"{prefix}.ItemProcessor", state["ItemProcessor"]
+            )
+            _validate_map(problems, prefix, state)
+
+    for name in states.keys() - referenced:
+        problems.append(f"{where}.{name}: unreachable state")
+
+
+def validate_definition(definition: dict) -> None:
+    """Raise :class:`DefinitionError` listing problems of the definition."""
+    problems: List[str] = []
+    _validate_machine(problems, "$", definition)
+    if problems:
+        raise DefinitionError(problems)
+
+
+if __name__ == "__main__":
+    print(
+        json.dumps(
+            saga_definition(
+                [
+                    saga_step(
+                        name,
+                        book=f"book-{name}",
+                        cancel=f"cancel-{name}",
+                        payload_fields=fields,
+                    )
+                    for name, fields in SERVICES.items()
+                ]
+            ),
+            indent=2,
+        )
+    )
@@ -0,0 +1,92 @@
+import json
+from typing import Optional
+
+import pulumi
+import pulumi_aws as aws
+
+
+__all__ = ["batch_queue", "check_concurrency", "function_alias"]
+
+
+def check_concurrency(
+    name: str, reserved: Optional[int], provisioned: Optional[int]
+) -> None:
+    """Check the provisioned concurrency of the function fits the reserved."""
+    if reserved is not None and provisioned and provisioned > reserved:
+        raise ValueError(
+            f"Provisioned concurrency of {name} ({provisioned}) exceeds its "
+            f"reserved concurrency ({reserved})"
+        )
+
+
+def function_alias(
+    name: str,
+    function: aws.lambda_.Function,
+    alias: str,
+    provisioned_concurrency: Optional[int] = None,
+    opts: Optional[pulumi.ResourceOptions] = None,
+) -> aws.lambda_.Alias:
+    """Point the alias to the published version of the function.
+
+    Instances of the version are kept initialized by the provisioned
+    concurrency if given.
+    """
+    function_alias = aws.lambda_.Alias(
+        name,
+        name=alias,
+        function_name=function.name,
+        function_version=function.version,
+        opts=opts,
+    )
+    if provisioned_concurrency:
+        aws.lambda_.ProvisionedConcurrencyConfig(
+            name,
+            function_name=function.name,
+            qualifier=function_alias.name,
+            provisioned_concurrent_executions=provisioned_concurrency,
+            opts=opts,
+        )
+    return function_alias
+
+
+def batch_queue(
+    name: str,
+    function: aws.lambda_.Alias,
+    timeout: int,
+    batch_size: int,
+    max_receive_count: int = 5,
+    opts: Optional[pulumi.ResourceOptions] = None,
+) -> aws.sqs.Queue:
+    """Create queue of messages received by the function in batches.
+
+    The function with ``timeout`` in seconds reports the messages that
+    failed, which are received again until moved to the dead-letter queue
+    after ``max_receive_count`` times.
+    """
+    dead_letter_queue = aws.sqs.Queue(
+        f"{name}-dlq", message_retention_seconds=14 * 24 * 3600, opts=opts
+    )
+    queue = aws.sqs.Queue(
+        name,
+        # Messages stay hidden while the poller retries throttled
+        # invocations, as recommended for Lambda event sources.
+        visibility_timeout_seconds=6 * timeout,
+        redrive_policy=dead_letter_queue.arn.apply(
+            lambda arn: json.dumps(
+                {
+                    "deadLetterTargetArn": arn,
+                    "maxReceiveCount": max_receive_count,
+                }
+            )
+        ),
+        opts=opts,
+    )
+    aws.lambda_.EventSourceMapping(
+        name,
+        event_source_arn=queue.arn,
+        function_name=function.arn,
+        batch_size=batch_size,
+        function_response_types=["ReportBatchItemFailures"],
+        opts=opts,
+    )
+    return queue
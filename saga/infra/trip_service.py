@@ -0,0 +1,160 @@
+import json
+from typing import Any, Mapping, Optional, Sequence
+
+import pulumi
+import pulumi_aws as aws
+
+
+__all__ = ["TripServiceArgs", "TripService"]
+
+
+class TripServiceArgs:
+    def __init__(
+        self,
+        bookings_table: aws.dynamodb.Table,
+        book_trip_fail_rate: float = 0.0,
+        book_trip_chaos: Optional[Mapping[str, Any]] = None,
+        layers: Optional[Sequence[pulumi.Input[str]]] = None,
+        alias: str = "live",
+        metrics_namespace: Optional[str] = None,
+        client_config: Optional[Mapping[str, Any]] = None,
+        tracing: bool = False,
+    ):
+        self.bookings_table = bookings_table
+        self.book_trip_fail_rate = book_trip_fail_rate
+        self.book_trip_chaos = book_trip_chaos
+        self.layers = layers
+        self.alias = alias
+        self.metrics_namespace = metrics_namespace
+        self.client_config = client_config
+        self.tracing = tracing
+
+
+class TripService(pulumi.ComponentResource):
+    def __init__(
+        self,
+        name: str,
+        args: TripServiceArgs,
+        opts: Optional[pulumi.ResourceOptions] = None,
+    ):
+        super().__init__("sfn-demo-saga:TripService", name, {}, opts)
+
+        # Functions emit metrics in Embedded Metric Format to the namespace.
+        metrics_environment = {}
+        if args.metrics_namespace:
+            metrics_environment["METRICS_NAMESPACE"] = args.metrics_namespace
+
+        # Functions create AWS clients with the timeouts and retries.
+        client_environment = {}
+        if args.client_config:
+            client_environment["CLIENT_CONFIG"] = json.dumps(
+                args.client_config
+            )
+
+        lambda_role = aws.iam.Role(
+            f"{name}-lambda-role",
+            assume_role_policy=json.dumps(
+                {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Action": "sts:AssumeRole",
+                            "Principal": {"Service": "lambda.amazonaws.com"},
+                            "Effect": "Allow",
+                            "Sid": "",
+                        }
+                    ],
+                }
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        lambda_role_policy = aws.iam.RolePolicy(
+            f"{name}-lambda-role-policy",
+            role=lambda_role.id,
+            policy=args.bookings_table.arn.apply(
+                lambda bookings_table: json.dumps(
+                    {
+                        "Version": "2012-10-17",
+                        "Statement": [
+                            {
+                                "Effect": "Allow",
+                                "Action": [
+                                    "logs:CreateLogGroup",
+                                    "logs:CreateLogStream",
+                                    "logs:PutLogEvents",
+                                ],
+                                "Resource": "arn:aws:logs:*:*:*",
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Action": ["dynamodb:PutItem"],
+                                "Resource": bookings_table,
+                            },
+                        ],
+                    }
+                )
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        # Allow the functions to send traces to X-Ray.
+        role_policies = [lambda_role_policy]
+        if args.tracing:
+            role_policies.append(
+                aws.iam.RolePolicyAttachment(
+                    f"{name}-lambda-role-xray",
+                    role=lambda_role.name,
+                    policy_arn=(
+                        "arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess"
+                    ),
+                    opts=pulumi.ResourceOptions(parent=self),
+                )
+            )
+
+        self.book_trip_lambda = aws.lambda_.Function(
+            f"{name}-book-trip",
+            runtime="python3.8",
+            code=pulumi.AssetArchive(
+                {".": pulumi.FileArchive("../lambdas/book-trip")}
+            ),
+            handler="lambda_function.lambda_handler",
+            layers=args.layers,
+            timeout=1,
+            role=lambda_role.arn,
+            publish=True,
+            tracing_config=aws.lambda_.FunctionTracingConfigArgs(
+                mode="Active" if args.tracing else "PassThrough"
+            ),
+            environment=aws.lambda_.FunctionEnvironmentArgs(
+                variables={
+                    "BOOKINGS_TABLE": args.bookings_table.id,
+                    "FAIL_RATE": str(args.book_trip_fail_rate),
+                    "CHAOS": json.dumps(args.book_trip_chaos or {}),
+                    **metrics_environment,
+                    **client_environment,
+                }
+            ),
+            opts=pulumi.ResourceOptions(parent=self, depends_on=role_policies),
+        )
+
+        aws.cloudwatch.LogGroup(
+            f"{name}-book-trip",
+            name=self.book_trip_lambda.name.apply(
+                lambda name: f"/aws/lambda/{name}"
+            ),
+            retention_in_days=7,
+            opts=pulumi.ResourceOptions(
+                parent=self, depends_on=[self.book_trip_lambda]
+            ),
+        )
+
+        self.book_trip_alias = aws.lambda_.Alias(
+            f"{name}-book-trip",
+            name=args.alias,
+            function_name=self.book_trip_lambda.name,
+            function_version=self.book_trip_lambda.version,
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        self.register_outputs({})
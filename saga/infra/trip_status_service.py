@@ -0,0 +1,176 @@
+import json
+from typing import Any, Mapping, Optional, Sequence
+
+import pulumi
+import pulumi_aws as aws
+
+
+__all__ = ["TripStatusServiceArgs", "TripStatusService"]
+
+
+class TripStatusServiceArgs:
+    def __init__(
+        self,
+        bookings_tables: Mapping[str, aws.dynamodb.Table],
+        table_design: str = "multi",
+        layers: Optional[Sequence[pulumi.Input[str]]] = None,
+        alias: str = "live",
+        memory_size: int = 128,
+        cache_ttl: float = 5.0,
+        cache_size: int = 1024,
+        metrics_namespace: Optional[str] = None,
+        client_config: Optional[Mapping[str, Any]] = None,
+        tracing: bool = False,
+    ):
+        self.bookings_tables = bookings_tables
+        self.table_design = table_design
+        self.layers = layers
+        self.alias = alias
+        self.memory_size = memory_size
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.metrics_namespace = metrics_namespace
+        self.client_config = client_config
+        self.tracing = tracing
+
+
+class TripStatusService(pulumi.ComponentResource):
+    def __init__(
+        self,
+        name: str,
+        args: TripStatusServiceArgs,
+        opts: Optional[pulumi.ResourceOptions] = None,
+    ):
+        super().__init__("sfn-demo-saga:TripStatusService", name, {}, opts)
+
+        services = list(args.bookings_tables)
+        tables = list(args.bookings_tables.values())
+
+        # Functions emit metrics in Embedded Metric Format to the namespace.
+        metrics_environment = {}
+        if args.metrics_namespace:
+            metrics_environment["METRICS_NAMESPACE"] = args.metrics_namespace
+
+        # Functions create AWS clients with the timeouts and retries.
+        client_environment = {}
+        if args.client_config:
+            client_environment["CLIENT_CONFIG"] = json.dumps(
+                args.client_config
+            )
+
+        lambda_role = aws.iam.Role(
+            f"{name}-lambda-role",
+            assume_role_policy=json.dumps(
+                {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Action": "sts:AssumeRole",
+                            "Principal": {"Service": "lambda.amazonaws.com"},
+                            "Effect": "Allow",
+                            "Sid": "",
+                        }
+                    ],
+                }
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        lambda_role_policy = aws.iam.RolePolicy(
+            f"{name}-lambda-role-policy",
+            role=lambda_role.id,
+            policy=pulumi.Output.all(*[table.arn for table in tables]).apply(
+                lambda bookings_tables: json.dumps(
+                    {
+                        "Version": "2012-10-17",
+                        "Statement": [
+                            {
+                                "Effect": "Allow",
+                                "Action": [
+                                    "logs:CreateLogGroup",
+                                    "logs:CreateLogStream",
+                                    "logs:PutLogEvents",
+                                ],
+                                "Resource": "arn:aws:logs:*:*:*",
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Action": [
+                                    "dynamodb:BatchGetItem",
+                                    "dynamodb:Query",
+                                ],
+                                "Resource": sorted(set(bookings_tables)),
+                            },
+                        ],
+                    }
+                )
+            ),
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        # Allow the functions to send traces to X-Ray.
+        role_policies = [lambda_role_policy]
+        if args.tracing:
+            role_policies.append(
+                aws.iam.RolePolicyAttachment(
+                    f"{name}-lambda-role-xray",
+                    role=lambda_role.name,
+                    policy_arn=(
+                        "arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess"
+                    ),
+                    opts=pulumi.ResourceOptions(parent=self),
+                )
+            )
+
+        self.get_trip_lambda = aws.lambda_.Function(
+            f"{name}-get-trip",
+            runtime="python3.8",
+            code=pulumi.AssetArchive(
+                {".": pulumi.FileArchive("../lambdas/get-trip")}
+            ),
+            handler="lambda_function.lambda_handler",
+            layers=args.layers,
+            timeout=1,
+            memory_size=args.memory_size,
+            role=lambda_role.arn,
+            publish=True,
+            tracing_config=aws.lambda_.FunctionTracingConfigArgs(
+                mode="Active" if args.tracing else "PassThrough"
+            ),
+            environment=aws.lambda_.FunctionEnvironmentArgs(
+                variables={
+                    "BOOKINGS_TABLES": pulumi.Output.all(
+                        *[table.name for table in tables]
+                    ).apply(
+                        lambda names: json.dumps(dict(zip(services, names)))
+                    ),
+                    "TABLE_DESIGN": args.table_design,
+                    "TRIP_CACHE_TTL": str(args.cache_ttl),
+                    "TRIP_CACHE_SIZE": str(args.cache_size),
+                    **metrics_environment,
+                    **client_environment,
+                }
+            ),
+            opts=pulumi.ResourceOptions(parent=self, depends_on=role_policies),
+        )
+
+        aws.cloudwatch.LogGroup(
+            f"{name}-get-trip",
+            name=self.get_trip_lambda.name.apply(
+                lambda name: f"/aws/lambda/{name}"
+            ),
+            retention_in_days=7,
+            opts=pulumi.ResourceOptions(
+                parent=self, depends_on=[self.get_trip_lambda]
+            ),
+        )
+
+        self.get_trip_alias = aws.lambda_.Alias(
+            f"{name}-get-trip",
+            name=args.alias,
+            function_name=self.get_trip_lambda.name,
+            function_version=self.get_trip_lambda.version,
+            opts=pulumi.ResourceOptions(parent=self),
+        )
+
+        self.register_outputs({})
@@ -0,0 +1,29 @@
+from booking import Schema, TripService, log_metrics
+
+
+# Trip service storing all the bookings of the trip in a single table.
+service = TripService(
+    {
+        "hotel": Schema(
+            hotel="S",
+            check_in="S",
+            check_out="S",
+        ),
+        "flight": Schema(
+            depart="S",
+            depart_at="S",
+            arrive="S",
+            arrive_at="S",
+        ),
+        "car": Schema(
+            rental="S",
+            rental_from="S",
+            rental_to="S",
+        ),
+    }
+)
+
+
+@log_metrics
+def lambda_handler(event, context):
+    return service.book(event)
@@ -0,0 +1,10 @@
+from booking import BulkResultsService, log_metrics
+
+
+# Service counting the trips booked by the bulk state machine.
+service = BulkResultsService()
+
+
+@log_metrics
+def lambda_handler(event, context):
+    return service.count(event["bucket"], event["key"])
@@ -0,0 +1,10 @@
+from booking import TripStatusService, log_metrics
+
+
+# Service reading trip statuses through the cache of the warm container.
+service = TripStatusService()
+
+
+@log_metrics
+def lambda_handler(event, context):
+    return service.get(event["trip_id"])
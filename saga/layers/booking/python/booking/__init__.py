@@ -0,0 +1,36 @@
+from .cache import TTLCache, trip_cache
+from .chaos import BookingUnconfirmedError, Chaos, InjectedFaultError
+from .clients import client, client_config
+from .formatting import LazyFormat, pformat
+from .metrics import log_metrics, metrics
+from .results import BulkResultsService
+from .schema import Schema
+from .serialization import Marshaller
+from .service import BookingCancelledError, BookingService
+from .status import TripStatusService
+from .tracing import InMemoryExporter, tracer
+from .trip import TripService
+
+
+__all__ = [
+    "BookingCancelledError",
+    "BookingService",
+    "BookingUnconfirmedError",
+    "BulkResultsService",
+    "Chaos",
+    "InMemoryExporter",
+    "InjectedFaultError",
+    "LazyFormat",
+    "Marshaller",
+    "Schema",
+    "TTLCache",
+    "TripService",
+    "TripStatusService",
+    "client",
+    "client_config",
+    "log_metrics",
+    "metrics",
+    "pformat",
+    "tracer",
+    "trip_cache",
+]
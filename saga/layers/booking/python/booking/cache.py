@@ -0,0 +1,59 @@
+import collections
+import os
+import time
+
+
+__all__ = ["TTLCache", "trip_cache"]
+
+
+class TTLCache:
+    """Least recently used cache with entries expiring after time to live.
+
+    Once the cache holds ``maxsize`` entries, the least recently used one is
+    evicted to make room for a new one. Cached values are returned as they
+    were stored, so they must not be modified.
+    """
+
+    def __init__(self, maxsize=1024, ttl=5.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return value cached under the key unless it has expired."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Cache the value under the key."""
+        self._entries[key] = (value, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all the cached values."""
+        self._entries.clear()
+
+
+# Cache of trip statuses living as long as the Lambda container. Bookings are
+# written by other functions which can't invalidate it, so a cached status is
+# stale for at most the time to live.
+trip_cache = TTLCache(
+    int(os.getenv("TRIP_CACHE_SIZE", 1024)),
+    float(os.getenv("TRIP_CACHE_TTL", 5.0)),
+)
@@ -0,0 +1,217 @@
+import json
+import os
+import random
+import time
+
+from botocore.exceptions import ClientError
+
+from .metrics import metrics
+
+
+__all__ = [
+    "BookingUnconfirmedError",
+    "Chaos",
+    "ErrorFault",
+    "Fault",
+    "FAULTS",
+    "InjectedFaultError",
+    "LatencyFault",
+    "PostWriteFault",
+    "ProvisionedThroughputExceededException",
+    "ThrottleFault",
+]
+
+
+class BookingUnconfirmedError(Exception):
+    """Booking may or may not have been written."""
+
+
+class InjectedFaultError(Exception):
+    """Operation failed by an injected fault before writing anything."""
+
+
+class Fault:
+    """Fault injected around the write of a booking.
+
+    :meth:`before` is called before the write and :meth:`after` once it
+    succeeded, either of them may raise an exception to fail the operation.
+    Both get the injection with the operation and the failure message.
+    """
+
+    type = None
+
+    def __init__(self, rate=0.0):
+        self.rate = rate
+
+    def before(self, injection):
+        pass
+
+    def after(self, injection):
+        pass
+
+
+class ErrorFault(Fault):
+    """Fail the operation before writing anything."""
+
+    type = "error"
+
+    def before(self, injection):
+        metrics.put("InjectedFailure", 1)
+        raise InjectedFaultError(injection.message)
+
+
+class PostWriteFault(Fault):
+    """Fail the operation after the write, as if the response got lost."""
+
+    type = "post_write"
+
+    def after(self, injection):
+        metrics.put("InjectedFailure", 1)
+        raise BookingUnconfirmedError(injection.message)
+
+
+class ProvisionedThroughputExceededException(ClientError):
+    """Throttling error named after its code like boto3 client does."""
+
+
+class ThrottleFault(Fault):
+    """Fail the operation with DynamoDB throttling error."""
+
+    type = "throttle"
+
+    def before(self, injection):
+        metrics.put("InjectedFailure", 1)
+        raise ProvisionedThroughputExceededException(
+            {
+                "Error": {
+                    "Code": "ProvisionedThroughputExceededException",
+                    "Message": "The level of configured provisioned "
+                    "throughput for the table was exceeded",
+                }
+            },
+            injection.operation,
+        )
+
+
+class LatencyFault(Fault):
+    """Delay the write by the given number of seconds."""
+
+    type = "latency"
+
+    def __init__(self, rate=0.0, seconds=1.0):
+        super().__init__(rate)
+        self.seconds = seconds
+
+    def before(self, injection):
+        metrics.put("InjectedLatency", self.seconds * 1e3, "Milliseconds")
+        injection.chaos.sleep(self.seconds)
+
+
+# Fault classes by type used in the configuration. New kinds of faults can be
+# registered here.
+FAULTS = {
+    fault.type: fault
+    for fault in (ErrorFault, PostWriteFault, ThrottleFault, LatencyFault)
+}
+
+
+class Chaos:
+    """Fault injection into the operation of a booking service.
+
+    At most one of the faults is injected on each call, picked by a random
+    number drawn from a generator with the given seed so that the sequence of
+    faults is reproducible. The probability of picking a fault is its rate.
+    Alternatively, ``schedule`` lists fault types (or ``None``) injected on
+    the consecutive calls, repeated once exhausted.
+    """
+
+    def __init__(
+        self,
+        faults=(),
+        seed=None,
+        schedule=None,
+        sleep=time.sleep,
+    ):
+        self.faults = list(faults)
+        self.random = random.Random(seed)
+        self.schedule = schedule
+        self.sleep = sleep
+        self.calls = 0
+        self._by_type = {fault.type: fault for fault in self.faults}
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """Create fault injection from configuration, e.g.::
+
+        {"seed": 1, "faults": [{"type": "throttle", "rate": 0.05},
+                               {"type": "latency", "rate": 0.1,
+                                "seconds": 0.5}]}
+        """
+        faults = []
+        for fault in config.get("faults", ()):
+            options = dict(fault)
+            faults.append(FAULTS[options.pop("type")](**options))
+        return cls(
+            faults, config.get("seed"), config.get("schedule"), **kwargs
+        )
+
+    @classmethod
+    def from_environ(cls, fail_rate=None, **kwargs):
+        """Create fault injection from environment variables.
+
+        The configuration is taken from ``CHAOS`` as JSON. Rate given by
+        ``FAIL_RATE`` (unless passed explicitly) adds error fault.
+        """
+        config = json.loads(os.getenv("CHAOS") or "{}")
+        if fail_rate is None:
+            fail_rate = float(os.getenv("FAIL_RATE") or 0.0)
+        if fail_rate:
+            faults = config.setdefault("faults", [])
+            faults.append({"type": "error", "rate": fail_rate})
+        return cls.from_config(config, **kwargs)
+
+    def next_fault(self):
+        """Return fault to inject on the next call or ``None``."""
+        self.calls += 1
+        if self.schedule is not None:
+            if not self.schedule:
+                return None
+            fault_type = self.schedule[(self.calls - 1) % len(self.schedule)]
+            if fault_type is None:
+                return None
+            return self._by_type.get(fault_type) or FAULTS[fault_type]()
+        if not self.faults:
+            return None
+        draw = self.random.random()
+        for fault in self.faults:
+            if draw < fault.rate:
+                return fault
+            draw -= fault.rate
+        return None
+
+    def inject(self, operation, message):
+        """Return context manager injecting the next fault around the write.
+
+        Failures of the DynamoDB operation raise exception with the message.
+        """
+        return _Injection(self, self.next_fault(), operation, message)
+
+
+class _Injection:
+    __slots__ = ("chaos", "fault", "operation", "message")
+
+    def __init__(self, chaos, fault, operation, message):
+        self.chaos = chaos
+        self.fault = fault
+        self.operation = operation
+        self.message = message
+
+    def __enter__(self):
+        if self.fault is not None:
+            self.fault.before(self)
+        return self.fault
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.fault is not None and exc_type is None:
+            self.fault.after(self)
+        return False
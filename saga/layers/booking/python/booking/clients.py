@@ -0,0 +1,61 @@
+import json
+import os
+
+import boto3
+from botocore.config import Config
+
+
+__all__ = ["DEFAULT_CLIENT_CONFIG", "client", "client_config"]
+
+# Every request must finish within the one second timeout of the functions.
+# The read timeout is still well above the latency of DynamoDB requests,
+# throttled ones included, so that slow writes aren't cut off, and a request
+# timing out after the write leaves the booking unconfirmed. Retries are left
+# to the state machine, which backs off with jitter across sagas, instead of
+# being stacked on top of its own.
+DEFAULT_CLIENT_CONFIG = {
+    "connect_timeout": 0.1,
+    "read_timeout": 0.75,
+    "retry_mode": "standard",
+    "max_attempts": 1,
+    "tcp_keepalive": True,
+    "max_pool_connections": 10,
+}
+
+
+def client_config(config=None):
+    """Return botocore configuration of the clients.
+
+    Options of :data:`DEFAULT_CLIENT_CONFIG` are overridden by ``config``,
+    taken from ``CLIENT_CONFIG`` environment variable as JSON by default.
+    ``max_attempts`` counts the first attempt too.
+    """
+    if config is None:
+        config = json.loads(os.getenv("CLIENT_CONFIG") or "{}")
+    options = {**DEFAULT_CLIENT_CONFIG, **config}
+    return Config(
+        connect_timeout=options["connect_timeout"],
+        read_timeout=options["read_timeout"],
+        retries={
+            "mode": options["retry_mode"],
+            "total_max_attempts": options["max_attempts"],
+        },
+        tcp_keepalive=options["tcp_keepalive"],
+        max_pool_connections=options["max_pool_connections"],
+    )
+
+
+def client(service, config=None, endpoint_url=None):
+    """Create boto3 client of the service configured for the functions.
+
+    The endpoint is taken from ``AWS_ENDPOINT_URL_<SERVICE>`` or
+    ``AWS_ENDPOINT_URL`` environment variables unless passed explicitly, so
+    that the functions may run against local stand-ins like DynamoDB Local.
+    """
+    if endpoint_url is None:
+        endpoint_url = os.getenv(
+            f"AWS_ENDPOINT_URL_{service.upper()}"
+        ) or os.getenv("AWS_ENDPOINT_URL")
+    return boto3.client(
+        service, config=client_config(config), endpoint_url=endpoint_url
+    )
@@ -0,0 +1,22 @@
+import functools
+import json
+
+
+__all__ = ["LazyFormat", "pformat"]
+
+# Data pretty formatter.
+pformat = functools.partial(
+    json.dumps, ensure_ascii=False, indent=2, default=str
+)
+
+
+class LazyFormat:
+    """Pretty format data only when the log record is actually emitted."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return pformat(self.data)
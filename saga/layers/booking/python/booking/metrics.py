@@ -0,0 +1,175 @@
+import collections
+import functools
+import json
+import os
+import sys
+import time
+
+
+__all__ = ["Metrics", "metrics", "log_metrics", "item_size", "instrument"]
+
+
+class Metrics:
+    """Metrics of an invocation emitted in CloudWatch Embedded Metric Format.
+
+    Values are buffered and written as a single log line by :meth:`flush`,
+    from which CloudWatch extracts the metrics with the given dimensions.
+    Nothing is written unless a namespace is set, taken from
+    ``METRICS_NAMESPACE`` environment variable by default.
+    """
+
+    def __init__(self, namespace=None, dimensions=None, stream=None):
+        self.namespace = namespace or os.getenv("METRICS_NAMESPACE")
+        self.dimensions = dimensions or {
+            "Function": os.getenv("AWS_LAMBDA_FUNCTION_NAME", "local")
+        }
+        self.stream = stream
+        self.cold_start = True
+        self._values = collections.defaultdict(list)
+        self._units = {}
+        self._properties = {}
+
+    def put(self, name, value, unit="Count"):
+        """Record value of the metric."""
+        self._values[name].append(value)
+        self._units[name] = unit
+
+    def set_property(self, name, value):
+        """Attach a property searchable in the logs but not a dimension."""
+        self._properties[name] = value
+
+    def timer(self, name):
+        """Return context manager recording its duration in milliseconds."""
+        return _Timer(self, name)
+
+    def flush(self):
+        """Write the buffered metrics and clear the buffer."""
+        self.put("ColdStart", int(self.cold_start))
+        self.cold_start = False
+        if self.namespace:
+            document = {
+                "_aws": {
+                    "Timestamp": int(time.time() * 1000),
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": self.namespace,
+                            "Dimensions": [list(self.dimensions)],
+                            "Metrics": [
+                                {"Name": name, "Unit": unit}
+                                for name, unit in self._units.items()
+                            ],
+                        }
+                    ],
+                },
+                **self.dimensions,
+                **self._properties,
+                **{
+                    name: values[0] if len(values) == 1 else values
+                    for name, values in self._values.items()
+                },
+            }
+            stream = self.stream or sys.stdout
+            stream.write(json.dumps(document) + "\n")
+            stream.flush()
+        self._values.clear()
+        self._units.clear()
+        self._properties.clear()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = (time.perf_counter() - self.start) * 1e3
+        self.metrics.put(self.name, elapsed, "Milliseconds")
+
+
+# Metrics of the current invocation shared by everything in the container.
+metrics = Metrics()
+
+
+def log_metrics(handler):
+    """Decorate Lambda handler to flush the metrics once per invocation."""
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if context is not None:
+            metrics.set_property("request_id", context.aws_request_id)
+        try:
+            return handler(event, context)
+        finally:
+            metrics.flush()
+
+    return wrapper
+
+
+def item_size(item):
+    """Return approximate size of the DynamoDB item in bytes.
+
+    Sizes of attribute names and string values are counted as DynamoDB does,
+    other values by their string representation.
+    """
+    return sum(
+        len(name.encode()) + len(str(value).encode())
+        for name, value in item.items()
+    )
+
+
+def _before_call(model, context, **kwargs):
+    context["metrics_start"] = time.perf_counter(), model.name
+
+
+def _put_latency(context):
+    start = context.pop("metrics_start", None)
+    if start is not None:
+        start, operation = start
+        metrics.put(
+            f"{operation}Latency",
+            (time.perf_counter() - start) * 1e3,
+            "Milliseconds",
+        )
+
+
+def _after_call(parsed, context, **kwargs):
+    _put_latency(context)
+    code = parsed.get("Error", {}).get("Code")
+    if code == "ConditionalCheckFailedException":
+        metrics.put("ConditionalCheckFailed", 1)
+    elif code == "TransactionCanceledException":
+        reasons = parsed.get("CancellationReasons", [])
+        conflicts = sum(
+            reason.get("Code") == "ConditionalCheckFailed"
+            for reason in reasons
+        )
+        metrics.put("ConditionalCheckFailed", conflicts)
+    elif code in (
+        "ProvisionedThroughputExceededException",
+        "ThrottlingException",
+        "RequestLimitExceeded",
+    ):
+        metrics.put("Throttled", 1)
+
+
+def _after_call_error(context, **kwargs):
+    # Requests failing without a response, e.g. timing out, are the slowest.
+    _put_latency(context)
+    metrics.put("RequestFailed", 1)
+
+
+def instrument(client):
+    """Record latency and conflicts of the requests made by the client.
+
+    Requests failing without a response are counted as ``RequestFailed``.
+    """
+    # Timing starts before any other handler may answer the request.
+    client.meta.events.register_first("before-call.*.*", _before_call)
+    client.meta.events.register("after-call.*.*", _after_call)
+    client.meta.events.register("after-call-error.*.*", _after_call_error)
@@ -0,0 +1,45 @@
+import collections
+import json
+import logging
+
+from .clients import client as create_client
+from .metrics import metrics
+
+
+__all__ = ["BulkResultsService"]
+
+logger = logging.getLogger()
+
+# Outcomes of the trips booked in bulk.
+OUTCOMES = ("booked", "cancelled", "cancel_failed", "failed")
+
+
+class BulkResultsService:
+    """Service counting the outcomes of the trips booked in bulk.
+
+    Results of the child executions of a map run are written to S3 by the
+    Distributed Map state, so that they don't have to fit the state payload.
+    The manifest lists the result files by status. Succeeded executions
+    output the status of the trip, failed ones are counted as ``failed``.
+    """
+
+    def __init__(self, client=None):
+        self.s3 = client or create_client("s3")
+
+    def _read(self, bucket, key):
+        response = self.s3.get_object(Bucket=bucket, Key=key)
+        return json.loads(response["Body"].read())
+
+    def count(self, bucket, key):
+        """Return numbers of trips by outcome from the manifest."""
+        manifest = self._read(bucket, key)
+        counts = collections.Counter({outcome: 0 for outcome in OUTCOMES})
+        files = manifest["ResultFiles"]
+        for file in files.get("SUCCEEDED", ()):
+            for result in self._read(bucket, file["Key"]):
+                counts[json.loads(result["Output"])["status"]] += 1
+        for file in files.get("FAILED", ()):
+            counts["failed"] += len(self._read(bucket, file["Key"]))
+        metrics.put("Trips", sum(counts.values()))
+        logger.info("Counted trips of map run %s", manifest.get("MapRunArn"))
+        return dict(counts)
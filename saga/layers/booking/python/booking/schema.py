@@ -0,0 +1,23 @@
+__all__ = ["Schema"]
+
+
+class Schema:
+    """Declarative schema of a booking item.
+
+    Keyword arguments map names of the fields copied from the input event to
+    their DynamoDB types. Attributes maintained by the booking service itself
+    are always part of the schema.
+    """
+
+    # Attributes common to all booking items.
+    common = {
+        "trip_id": "S",
+        "service": "S",
+        "status": "S",
+        "date_booked": "S",
+        "date_cancelled": "S",
+    }
+
+    def __init__(self, **fields):
+        self.fields = tuple(fields)
+        self.attributes = {**self.common, **fields}
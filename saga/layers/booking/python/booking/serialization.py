@@ -0,0 +1,50 @@
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+
+__all__ = ["Marshaller", "serialize", "deserialize"]
+
+# Serializer and deserializer for DynamoDB types.
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+
+def serialize(data):
+    """Serialize Python types to DynamoDB types."""
+    return {k: serializer.serialize(v) for k, v in data.items()}
+
+
+def deserialize(data):
+    """Deserialize DynamoDB types to Python types."""
+    return {k: deserializer.deserialize(v) for k, v in data.items()}
+
+
+class Marshaller:
+    """Schema aware converter between Python and DynamoDB types.
+
+    Values of attributes declared as strings are converted directly. Other
+    attributes and values not matching the declared type fall back to the
+    generic serializer and deserializer.
+    """
+
+    def __init__(self, attributes):
+        self.strings = frozenset(k for k, t in attributes.items() if t == "S")
+
+    def serialize(self, data):
+        """Serialize Python types to DynamoDB types."""
+        strings = self.strings
+        return {
+            k: {"S": v}
+            if k in strings and type(v) is str
+            else serializer.serialize(v)
+            for k, v in data.items()
+        }
+
+    def deserialize(self, data):
+        """Deserialize DynamoDB types to Python types."""
+        strings = self.strings
+        return {
+            k: v["S"]
+            if k in strings and "S" in v
+            else deserializer.deserialize(v)
+            for k, v in data.items()
+        }
@@ -0,0 +1,398 @@
+from datetime import datetime
+import json
+import logging
+import os
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ReadTimeoutError,
+)
+
+from .chaos import BookingUnconfirmedError, Chaos
+from .clients import client
+from .formatting import LazyFormat
+from .metrics import instrument as instrument_metrics, item_size, metrics
+from .serialization import Marshaller
+from .tracing import instrument as instrument_tracing
+
+
+__all__ = ["BookingCancelledError", "BookingService"]
+
+# Setup logging.
+logger = logging.getLogger()
+logger.setLevel(os.getenv("LOG_LEVEL", logging.INFO))
+
+# Initialize DynamoDB client shared by all the services, with timeouts and
+# retries fitting the timeout of the functions. Loading models of the used
+# operations up front moves the work to the initialization phase.
+dynamodb = client("dynamodb")
+for operation in ("GetItem", "PutItem", "UpdateItem"):
+    dynamodb.meta.service_model.operation_model(operation)
+instrument_metrics(dynamodb)
+instrument_tracing(dynamodb)
+
+
+# Errors of requests which may have been processed although no response
+# arrived.
+UNCONFIRMED_ERRORS = (ReadTimeoutError, ConnectionClosedError)
+
+# Marshaller for values of the expressions used in requests.
+values = Marshaller({":status": "S", ":booked": "S", ":date": "S"})
+
+
+class BookingCancelledError(Exception):
+    """Booking has already been cancelled."""
+
+
+def now():
+    """Return current UTC time formatted as ISO 8601 string."""
+    return datetime.utcnow().isoformat(timespec="milliseconds")
+
+
+def trips_from_event(event):
+    """Extract list of trips from a batch event.
+
+    Supported are a plain list of trips and a batch of items produced by
+    Distributed Map state with item batching.
+    """
+    if isinstance(event, list):
+        return event
+    if "Items" in event:
+        return event["Items"]
+    raise ValueError("Unsupported batch event")
+
+
+class BookingService:
+    """Service booking and cancelling a part of the trip.
+
+    Bookings are stored in a DynamoDB table keyed by trip ID. The table name
+    is taken from ``BOOKINGS_TABLE`` environment variable unless passed
+    explicitly. Faults are injected into the operations by ``chaos``, which
+    is configured by ``CHAOS`` and ``FAIL_RATE`` environment variables by
+    default, see :class:`Chaos`. An explicit ``fail_rate`` overrides the
+    latter.
+
+    In the single-table design, bookings of all the services share a table
+    keyed by trip ID and service name. The service name is taken from
+    ``BOOKINGS_SERVICE`` environment variable unless passed explicitly, the
+    table has a single key otherwise.
+    """
+
+    # Maximum number of items in a single DynamoDB transaction.
+    batch_size = 100
+
+    def __init__(
+        self,
+        schema,
+        table_name=None,
+        fail_rate=None,
+        client=None,
+        service_name=None,
+        chaos=None,
+    ):
+        self.schema = schema
+        self.table_name = table_name or os.environ["BOOKINGS_TABLE"]
+        self.chaos = chaos or Chaos.from_environ(fail_rate)
+        self.service_name = service_name or os.getenv("BOOKINGS_SERVICE")
+        self.dynamodb = client or dynamodb
+        self.marshaller = Marshaller(schema.attributes)
+
+        # Precompute static parts of the requests.
+        self._put_params = {
+            "TableName": self.table_name,
+            "ConditionExpression": "attribute_not_exists(trip_id)",
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+        self._update_params = {
+            "TableName": self.table_name,
+            "ConditionExpression": (
+                "attribute_exists(trip_id) AND #status = :booked"
+            ),
+            "UpdateExpression": (
+                "SET #status = :status, date_cancelled = :date"
+            ),
+            "ExpressionAttributeNames": {"#status": "status"},
+            "ReturnValues": "ALL_NEW",
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+
+    def _key(self, trip_id):
+        """Return primary key of the booking item for the trip."""
+        if self.service_name:
+            return {"trip_id": trip_id, "service": self.service_name}
+        return {"trip_id": trip_id}
+
+    def _new_item(self, event):
+        """Build booking item for the trip from the input event."""
+        item = self._key(event["trip_id"])
+        for field in self.schema.fields:
+            item[field] = event[field]
+        item["status"] = "booked"
+        item["date_booked"] = now()
+        return item
+
+    def _existing_item(self, error):
+        """Return item that failed the condition check of the request."""
+        item = self.marshaller.deserialize(error.response["Item"])
+        logger.debug("Item data:\n%s", LazyFormat(item))
+        return item
+
+    def book(self, event):
+        """Create booking for the trip unless it already exists."""
+        logger.debug("Input data:\n%s", LazyFormat(event))
+
+        metrics.set_property("trip_id", event["trip_id"])
+        item = self._new_item(event)
+        metrics.put("ItemSize", item_size(item), "Bytes")
+        with self.chaos.inject("PutItem", "Failed to create booking"):
+            item = self._put_item(item)
+
+        result = {"status": item["status"], "date_booked": item["date_booked"]}
+        logger.debug("Result:\n%s", LazyFormat(result))
+        return result
+
+    def _put_item(self, item):
+        """Write the booking unless it exists and return the stored item."""
+        try:
+            self.dynamodb.put_item(
+                Item=self.marshaller.serialize(item), **self._put_params
+            )
+        except UNCONFIRMED_ERRORS as e:
+            raise BookingUnconfirmedError(
+                f"Booking may have been created: {e}"
+            ) from e
+        except ClientError as e:
+            if (
+                e.response["Error"]["Code"]
+                != "ConditionalCheckFailedException"
+            ):
+                raise
+            logger.warning(
+                "Booking already exists for trip ID %s", item["trip_id"]
+            )
+            item = self._existing_item(e)
+            if item["status"] != "booked":
+                raise BookingCancelledError(
+                    "Booking has already been cancelled"
+                ) from None
+        else:
+            logger.info("Created booking for trip ID %s", item["trip_id"])
+        return item
+
+    def book_batch(self, event):
+        """Create bookings for a batch of trips.
+
+        Trips are written in chunked transactions with the same condition as
+        in :meth:`book` so the whole batch can be safely retried. Result for
+        each trip is returned in the order of the input, trips with booking
+        already cancelled get an error result instead of failing the batch.
+
+        A batch of SQS messages with trips in their bodies gets a partial
+        batch response instead, listing the messages which couldn't be parsed
+        or whose booking has been cancelled, so that only those are received
+        again.
+        """
+        logger.debug("Input data:\n%s", LazyFormat(event))
+
+        if isinstance(event, dict) and "Records" in event:
+            return self._book_records(event["Records"])
+        results = {"results": self._book_trips(trips_from_event(event))}
+        logger.debug("Result:\n%s", LazyFormat(results))
+        return results
+
+    def _book_records(self, records):
+        """Book trips of the SQS messages and return the failed ones."""
+        failures = []
+        trips = {}
+        for record in records:
+            try:
+                trip = json.loads(record["body"])
+                trip["trip_id"]
+            except (ValueError, TypeError, KeyError):
+                logger.exception("Invalid message %s", record["messageId"])
+                failures.append(record["messageId"])
+            else:
+                trips[record["messageId"]] = trip
+        results = self._book_trips(list(trips.values()))
+        for message_id, result in zip(trips, results):
+            if "error" in result:
+                failures.append(message_id)
+        response = {
+            "batchItemFailures": [
+                {"itemIdentifier": message_id} for message_id in failures
+            ]
+        }
+        logger.debug("Result:\n%s", LazyFormat(response))
+        return response
+
+    def _book_trips(self, trips):
+        """Book the trips and return their results in the same order."""
+        # The same item can't be written twice within a transaction, so trips
+        # with duplicate IDs share the result.
+        pending = list({trip["trip_id"]: trip for trip in trips}.values())
+        results = {}
+        with self.chaos.inject(
+            "TransactWriteItems", "Failed to create bookings"
+        ):
+            while pending:
+                chunk = pending[: self.batch_size]
+                pending = pending[self.batch_size :]
+                pending.extend(self._transact_book(chunk, results))
+        return [results[trip["trip_id"]] for trip in trips]
+
+    def _transact_book(self, trips, results):
+        """Write bookings for the trips in a single transaction.
+
+        Results are stored to ``results`` by trip ID. Trips that were not
+        written only because the transaction got cancelled due to conflict of
+        another trip are returned to be written again.
+        """
+        items = [self._new_item(trip) for trip in trips]
+        for item in items:
+            metrics.put("ItemSize", item_size(item), "Bytes")
+        try:
+            self.dynamodb.transact_write_items(
+                TransactItems=[
+                    {
+                        "Put": {
+                            "Item": self.marshaller.serialize(item),
+                            **self._put_params,
+                        }
+                    }
+                    for item in items
+                ]
+            )
+        except UNCONFIRMED_ERRORS as e:
+            raise BookingUnconfirmedError(
+                f"Bookings may have been created: {e}"
+            ) from e
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = e.response["CancellationReasons"]
+            if any(
+                reason["Code"] not in ("None", "ConditionalCheckFailed")
+                for reason in reasons
+            ):
+                raise
+            cancelled = True
+        else:
+            logger.info("Created bookings for %d trips", len(items))
+            reasons = [{"Code": "None"}] * len(items)
+            cancelled = False
+
+        retry = []
+        for trip, item, reason in zip(trips, items, reasons):
+            if reason["Code"] == "ConditionalCheckFailed":
+                logger.warning(
+                    "Booking already exists for trip ID %s", item["trip_id"]
+                )
+                item = self.marshaller.deserialize(reason["Item"])
+            elif cancelled:
+                retry.append(trip)
+                continue
+            results[item["trip_id"]] = self._batch_result(item)
+        return retry
+
+    @staticmethod
+    def _batch_result(item):
+        """Build result of booking the trip within a batch."""
+        if item["status"] != "booked":
+            return {
+                "trip_id": item["trip_id"],
+                "error": BookingCancelledError.__name__,
+                "cause": "Booking has already been cancelled",
+            }
+        return {
+            "trip_id": item["trip_id"],
+            "status": item["status"],
+            "date_booked": item["date_booked"],
+        }
+
+    def cancel(self, event):
+        """Cancel booking for the trip unless already cancelled.
+
+        If the trip has never been booked, a tombstone item is written
+        instead, so that the cancellation succeeds immediately and a booking
+        arriving late is rejected.
+        """
+        logger.debug("Input data:\n%s", LazyFormat(event))
+
+        trip_id = event["trip_id"]
+        metrics.set_property("trip_id", trip_id)
+        with self.chaos.inject("UpdateItem", "Failed to cancel booking"):
+            item = self._cancel_item(trip_id)
+
+        result = {
+            "status": item["status"],
+            "date_cancelled": item["date_cancelled"],
+        }
+        logger.debug("Result:\n%s", LazyFormat(result))
+        return result
+
+    def _cancel_item(self, trip_id):
+        """Cancel the booking item of the trip and return it."""
+        item = None
+        while item is None:
+            try:
+                response = self.dynamodb.update_item(
+                    Key=self.marshaller.serialize(self._key(trip_id)),
+                    ExpressionAttributeValues=values.serialize(
+                        {
+                            ":status": "cancelled",
+                            ":booked": "booked",
+                            ":date": now(),
+                        }
+                    ),
+                    **self._update_params,
+                )
+            except ClientError as e:
+                if (
+                    e.response["Error"]["Code"]
+                    != "ConditionalCheckFailedException"
+                ):
+                    raise
+                if "Item" in e.response:
+                    logger.warning(
+                        "Booking has already been cancelled for trip ID %s",
+                        trip_id,
+                    )
+                    item = self._existing_item(e)
+                else:
+                    item = self._tombstone(trip_id)
+            else:
+                logger.info("Cancelled booking for trip ID %s", trip_id)
+                item = self.marshaller.deserialize(response["Attributes"])
+                logger.debug("Item data:\n%s", LazyFormat(item))
+        return item
+
+    def _tombstone(self, trip_id):
+        """Record that the trip has never been booked.
+
+        Return the tombstone item or ``None`` if the booking has been created
+        in the meantime and still needs to be cancelled.
+        """
+        item = {
+            **self._key(trip_id),
+            "status": "not_booked",
+            "date_cancelled": now(),
+        }
+        try:
+            self.dynamodb.put_item(
+                Item=self.marshaller.serialize(item), **self._put_params
+            )
+        except UNCONFIRMED_ERRORS as e:
+            raise BookingUnconfirmedError(
+                f"Tombstone may have been written: {e}"
+            ) from e
+        except ClientError as e:
+            if (
+                e.response["Error"]["Code"]
+                != "ConditionalCheckFailedException"
+            ):
+                raise
+            existing = self._existing_item(e)
+            return None if existing["status"] == "booked" else existing
+        logger.info("Booking does not exist for trip ID %s", trip_id)
+        return item
@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import time
+
+from .cache import trip_cache
+from .formatting import LazyFormat
+from .metrics import metrics
+from .serialization import deserialize
+from .service import dynamodb
+
+
+__all__ = ["TripStatusService"]
+
+logger = logging.getLogger()
+
+# Load models of the used operations up front, see the service module.
+for operation in ("BatchGetItem", "Query"):
+    dynamodb.meta.service_model.operation_model(operation)
+
+# Statuses of the bookings after cancellation.
+CANCELLED = ("cancelled", "not_booked")
+
+
+class TripStatusService:
+    """Service reading the status of a trip aggregated from its bookings.
+
+    Tables of the bookings are given by service name, taken from
+    ``BOOKINGS_TABLES`` environment variable as JSON unless passed
+    explicitly. Bookings of all the services are read in a single request,
+    batched over the tables or queried from the single table when
+    ``table_design`` (``TABLE_DESIGN`` environment variable) is ``single``.
+
+    Statuses are cached in the warm container, see :data:`trip_cache`.
+    """
+
+    def __init__(
+        self,
+        tables=None,
+        table_design=None,
+        consistent_read=False,
+        client=None,
+        cache=None,
+    ):
+        self.tables = tables or json.loads(os.environ["BOOKINGS_TABLES"])
+        table_design = table_design or os.getenv("TABLE_DESIGN", "multi")
+        self.single_table = table_design == "single"
+        self.consistent_read = consistent_read
+        self.dynamodb = client or dynamodb
+        self.cache = trip_cache if cache is None else cache
+
+    def get(self, trip_id):
+        """Return status of the trip and its bookings."""
+        metrics.set_property("trip_id", trip_id)
+        status = self.cache.get(trip_id)
+        metrics.put("CacheHit", int(status is not None))
+        if status is None:
+            bookings = self._read(trip_id)
+            status = {
+                "trip_id": trip_id,
+                "status": self._trip_status(bookings),
+                "bookings": bookings,
+            }
+            self.cache.put(trip_id, status)
+        else:
+            logger.info("Trip status of trip ID %s served from cache", trip_id)
+        logger.debug("Result:\n%s", LazyFormat(status))
+        return status
+
+    def _trip_status(self, bookings):
+        """Aggregate statuses of the bookings to the status of the trip.
+
+        The saga cancels only the bookings it has attempted, so a cancelled
+        trip may miss some of them.
+        """
+        statuses = [
+            bookings.get(service, {}).get("status") for service in self.tables
+        ]
+        if all(status == "booked" for status in statuses):
+            return "booked"
+        if all(status is None for status in statuses):
+            return "unknown"
+        if all(status in (None, *CANCELLED) for status in statuses):
+            return "cancelled"
+        return "pending"
+
+    def _read(self, trip_id):
+        """Read bookings of the trip by service name."""
+        if self.single_table:
+            table = next(iter(self.tables.values()))
+            response = self.dynamodb.query(
+                TableName=table,
+                KeyConditionExpression="trip_id = :trip_id",
+                ExpressionAttributeValues={":trip_id": {"S": trip_id}},
+                ConsistentRead=self.consistent_read,
+            )
+            bookings = {}
+            for item in response["Items"]:
+                item = deserialize(item)
+                del item["trip_id"]
+                bookings[item.pop("service")] = item
+            return bookings
+
+        services = {table: service for service, table in self.tables.items()}
+        request = {
+            table: {
+                "Keys": [{"trip_id": {"S": trip_id}}],
+                "ConsistentRead": self.consistent_read,
+            }
+            for table in services
+        }
+        bookings = {}
+        attempt = 0
+        while request:
+            if attempt:
+                # Back off before reading keys left unprocessed.
+                time.sleep(min(0.05 * 2**attempt, 1.0))
+            attempt += 1
+            response = self.dynamodb.batch_get_item(RequestItems=request)
+            for table, items in response["Responses"].items():
+                for item in items:
+                    bookings[services[table]] = deserialize(item)
+            request = response.get("UnprocessedKeys")
+        for item in bookings.values():
+            del item["trip_id"]
+        return bookings
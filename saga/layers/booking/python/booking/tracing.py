@@ -0,0 +1,166 @@
+import binascii
+import json
+import os
+import socket
+import time
+
+
+__all__ = [
+    "InMemoryExporter",
+    "Tracer",
+    "XRayDaemonExporter",
+    "instrument",
+    "tracer",
+]
+
+# Error codes of throttled requests.
+THROTTLING_ERRORS = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+
+
+def trace_header():
+    """Return fields of the X-Ray trace header of the current invocation.
+
+    Lambda sets the header in ``_X_AMZN_TRACE_ID`` environment variable for
+    every invocation.
+    """
+    header = os.getenv("_X_AMZN_TRACE_ID", "")
+    return dict(
+        part.split("=", 1) for part in header.split(";") if "=" in part
+    )
+
+
+class XRayDaemonExporter:
+    """Exporter sending segment documents to the X-Ray daemon over UDP.
+
+    The daemon address is taken from ``AWS_XRAY_DAEMON_ADDRESS`` environment
+    variable unless passed explicitly.
+    """
+
+    header = b'{"format": "json", "version": 1}\n'
+
+    def __init__(self, address=None):
+        address = address or os.environ["AWS_XRAY_DAEMON_ADDRESS"]
+        # The address may be given for both protocols as "tcp:... udp:...".
+        for part in address.split():
+            if part.startswith("udp:"):
+                address = part[4:]
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def export(self, document):
+        self.socket.sendto(
+            self.header + json.dumps(document).encode(), self.address
+        )
+
+
+class InMemoryExporter:
+    """Exporter keeping segment documents in memory to check them locally."""
+
+    def __init__(self):
+        self.documents = []
+
+    def export(self, document):
+        self.documents.append(document)
+
+
+class Tracer:
+    """Tracer recording X-Ray subsegments of the current invocation.
+
+    Subsegments are only recorded when the invocation is sampled and an
+    exporter is set.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    def begin(self, name, **fields):
+        """Begin subsegment and return its document or ``None``."""
+        if self.exporter is None:
+            return None
+        header = trace_header()
+        if header.get("Sampled") != "1" or "Root" not in header:
+            return None
+        return {
+            "name": name,
+            "id": binascii.hexlify(os.urandom(8)).decode(),
+            "trace_id": header["Root"],
+            "parent_id": header.get("Parent"),
+            "type": "subsegment",
+            "start_time": time.time(),
+            **fields,
+        }
+
+    def end(self, document, **fields):
+        """End the subsegment and export it."""
+        document.update(fields, end_time=time.time())
+        self.exporter.export(document)
+
+
+# Tracer of the container, exporting to the X-Ray daemon when running in
+# Lambda.
+tracer = Tracer(
+    XRayDaemonExporter() if os.getenv("AWS_XRAY_DAEMON_ADDRESS") else None
+)
+
+
+def _before_call(params, model, context, **kwargs):
+    context["trace_subsegment"] = tracer.begin(
+        model.service_model.service_id,
+        namespace="aws",
+        aws={"operation": model.name, "table_name": params.get("TableName")},
+    )
+
+
+def _after_call(http_response, parsed, context, **kwargs):
+    document = context.pop("trace_subsegment", None)
+    if document is None:
+        return
+    status = http_response.status_code
+    metadata = parsed.get("ResponseMetadata", {})
+    document["aws"].update(
+        request_id=metadata.get("RequestId"),
+        retries=metadata.get("RetryAttempts", 0),
+    )
+    fields = {"http": {"response": {"status": status}}}
+    if status >= 500:
+        fields["fault"] = True
+    elif status >= 400:
+        fields["error"] = True
+        if parsed.get("Error", {}).get("Code") in THROTTLING_ERRORS:
+            fields["throttle"] = True
+    tracer.end(document, **fields)
+
+
+def _after_call_error(exception, context, **kwargs):
+    document = context.pop("trace_subsegment", None)
+    if document is None:
+        return
+    # No response arrived, e.g. the request timed out.
+    tracer.end(
+        document,
+        fault=True,
+        cause={
+            "exceptions": [
+                {
+                    "id": binascii.hexlify(os.urandom(8)).decode(),
+                    "type": type(exception).__name__,
+                    "message": str(exception),
+                }
+            ]
+        },
+    )
+
+
+def instrument(client):
+    """Trace the requests made by the client as X-Ray subsegments.
+
+    Requests failing without a response are recorded as faults.
+    """
+    client.meta.events.register("before-parameter-build.*.*", _before_call)
+    client.meta.events.register("after-call.*.*", _after_call)
+    client.meta.events.register("after-call-error.*.*", _after_call_error)
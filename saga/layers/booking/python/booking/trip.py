@@ -0,0 +1,145 @@
+import logging
+import os
+
+from botocore.exceptions import ClientError
+
+from .chaos import BookingUnconfirmedError, Chaos
+from .formatting import LazyFormat
+from .metrics import item_size, metrics
+from .serialization import Marshaller
+from .service import (
+    UNCONFIRMED_ERRORS,
+    BookingCancelledError,
+    dynamodb,
+    now,
+)
+
+
+__all__ = ["TripService"]
+
+logger = logging.getLogger()
+
+
+class TripService:
+    """Service booking whole trips in the single-table design.
+
+    Bookings of all the services are items of a table keyed by trip ID and
+    service name, so that the trip is written in a single transaction and
+    read by a single query of :class:`TripStatusService`. Schemas of the
+    bookings are given by service name. The table name is taken from
+    ``BOOKINGS_TABLE`` environment variable unless passed explicitly. Faults
+    are injected the same way as in :class:`BookingService`.
+    """
+
+    def __init__(
+        self, schemas, table_name=None, client=None, fail_rate=None, chaos=None
+    ):
+        self.schemas = schemas
+        self.table_name = table_name or os.environ["BOOKINGS_TABLE"]
+        self.dynamodb = client or dynamodb
+        self.chaos = chaos or Chaos.from_environ(fail_rate)
+        attributes = {}
+        for schema in schemas.values():
+            attributes.update(schema.attributes)
+        self.marshaller = Marshaller(attributes)
+
+        # Precompute static parts of the requests.
+        self._put_params = {
+            "TableName": self.table_name,
+            "ConditionExpression": "attribute_not_exists(trip_id)",
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+
+    def _new_items(self, event):
+        """Build booking items of all the services from the input event."""
+        date_booked = now()
+        return [
+            {
+                "trip_id": event["trip_id"],
+                "service": name,
+                **{field: event[field] for field in schema.fields},
+                "status": "booked",
+                "date_booked": date_booked,
+            }
+            for name, schema in self.schemas.items()
+        ]
+
+    def book(self, event):
+        """Create bookings of all the services for the trip at once.
+
+        Bookings which already exist are kept if they're booked, bookings
+        still missing are then written in another transaction. If any of
+        them has been cancelled, the trip is not booked at all.
+        """
+        logger.debug("Input data:\n%s", LazyFormat(event))
+
+        trip_id = event["trip_id"]
+        metrics.set_property("trip_id", trip_id)
+        pending = self._new_items(event)
+        for item in pending:
+            metrics.put("ItemSize", item_size(item), "Bytes")
+        bookings = {}
+        with self.chaos.inject(
+            "TransactWriteItems", "Failed to create bookings"
+        ):
+            while pending:
+                pending = self._transact_book(trip_id, pending, bookings)
+
+        result = {
+            name: {
+                "status": item["status"],
+                "date_booked": item["date_booked"],
+            }
+            for name, item in bookings.items()
+        }
+        logger.debug("Result:\n%s", LazyFormat(result))
+        return result
+
+    def _transact_book(self, trip_id, items, bookings):
+        """Write the bookings in a single transaction.
+
+        Written and already booked items are stored to ``bookings`` by
+        service name, items not written only because the transaction got
+        cancelled by the existing ones are returned to be written again.
+        """
+        try:
+            self.dynamodb.transact_write_items(
+                TransactItems=[
+                    {
+                        "Put": {
+                            "Item": self.marshaller.serialize(item),
+                            **self._put_params,
+                        }
+                    }
+                    for item in items
+                ]
+            )
+        except UNCONFIRMED_ERRORS as e:
+            raise BookingUnconfirmedError(
+                f"Bookings may have been created: {e}"
+            ) from e
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = e.response["CancellationReasons"]
+            if any(
+                reason["Code"] not in ("None", "ConditionalCheckFailed")
+                for reason in reasons
+            ):
+                raise
+            logger.warning("Bookings already exist for trip ID %s", trip_id)
+            retry = []
+            for item, reason in zip(items, reasons):
+                if reason["Code"] == "None":
+                    retry.append(item)
+                    continue
+                item = self.marshaller.deserialize(reason["Item"])
+                if item["status"] != "booked":
+                    raise BookingCancelledError(
+                        "Booking has already been cancelled"
+                    ) from None
+                bookings[item["service"]] = item
+            return retry
+        logger.info("Created bookings for trip ID %s", trip_id)
+        bookings.update((item["service"], item) for item in items)
+        return []
@@ -0,0 +1,31 @@
+import os
+import pathlib
+import sys
+
+
+SAGA_DIR = pathlib.Path(__file__).resolve().parent.parent
+
+# Make the shared booking core importable the same way as from Lambda layer
+# and the state machine definition without the rest of the Pulumi program.
+for path in (SAGA_DIR / "layers" / "booking" / "python", SAGA_DIR / "infra"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# Region is needed to create AWS clients even though no request is sent.
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+
+from .asl import Execution, StateMachine, StatesError  # noqa: E402
+from .dynamodb import InMemoryDynamoDB  # noqa: E402
+from .lambdas import load_handler  # noqa: E402
+from .saga import SagaSimulator  # noqa: E402
+
+
+__all__ = [
+    "SAGA_DIR",
+    "Execution",
+    "InMemoryDynamoDB",
+    "SagaSimulator",
+    "StateMachine",
+    "StatesError",
+    "load_handler",
+]
@@ -0,0 +1,67 @@
+"""Run sagas locally and print summary of their outcomes.
+
+Run from the ``saga`` directory::
+
+   python -m simulator --sagas 10000 --fail-rate 0.1
+"""
+import argparse
+import collections
+import json
+import logging
+import time
+import uuid
+
+from definition import RECOVERY_MODES
+
+from . import SAGA_DIR
+from .saga import (
+    SagaSimulator,
+    add_fail_rate_arguments,
+    chaos_from_args,
+    fail_rates_from_args,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sagas", type=int, default=1000)
+    add_fail_rate_arguments(parser)
+    parser.add_argument("--task-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--recovery", choices=RECOVERY_MODES, default="backward"
+    )
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args()
+
+    simulator = SagaSimulator(
+        fail_rates_from_args(args),
+        args.task_latency,
+        args.seed,
+        chaos=chaos_from_args(args),
+        definition_options={"recovery": args.recovery},
+    )
+    logging.getLogger().setLevel(args.log_level)
+
+    trip = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    outcomes = collections.Counter()
+    duration = 0.0
+    start = time.perf_counter()
+    for _ in range(args.sagas):
+        execution = simulator.run(dict(trip, trip_id=str(uuid.uuid4())))
+        outcomes[execution.final_state] += 1
+        duration += execution.duration
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "sagas": args.sagas,
+        "sagas_per_second": round(args.sagas / elapsed),
+        "mean_duration_seconds": duration / args.sagas,
+        "outcomes": dict(outcomes),
+        "dynamodb_calls": dict(simulator.dynamodb.calls),
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
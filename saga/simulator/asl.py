@@ -0,0 +1,813 @@
+from datetime import datetime, timedelta
+import functools
+import heapq
+import json
+import random
+import re
+import time
+import uuid
+
+
+__all__ = [
+    "MAX_PAYLOAD_SIZE",
+    "StatesError",
+    "Span",
+    "Execution",
+    "StateMachine",
+]
+
+
+class StatesError(Exception):
+    """Error raised while executing a state.
+
+    Carries the error name and cause the same way as Step Functions does, so
+    that it can be matched by ``Retry`` and ``Catch`` fields.
+    """
+
+    def __init__(self, error, cause=""):
+        super().__init__(error, cause)
+        self.error = error
+        self.cause = cause
+
+    def to_output(self):
+        """Return error output as passed to a ``Catch`` field's target."""
+        return {"Error": self.error, "Cause": self.cause}
+
+
+_PATH_TOKEN = re.compile(
+    r"\.([^.\[]+)|\[(\d+)\]|\[\?\(@\.(\w+) == '([^']*)'\)\]"
+)
+
+
+class Filter:
+    """Filter expression of a path keeping objects with a field value."""
+
+    __slots__ = ("field", "value")
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+
+    def __call__(self, items):
+        return [
+            item
+            for item in items
+            if isinstance(item, dict) and item.get(self.field) == self.value
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def parse_path(path):
+    """Parse path such as ``$.results[0].status`` to tokens.
+
+    Besides reference paths, filter expressions comparing a field of the
+    objects in an array to a string such as ``$[?(@.status == 'booked')]``
+    are supported.
+    """
+    if not path.startswith("$"):
+        raise StatesError("States.Runtime", f"Invalid path {path!r}")
+    tokens = []
+    pos = 1
+    while pos < len(path):
+        match = _PATH_TOKEN.match(path, pos)
+        if not match:
+            raise StatesError("States.Runtime", f"Invalid path {path!r}")
+        key, index, field, value = match.groups()
+        if field is not None:
+            tokens.append(Filter(field, value))
+        else:
+            tokens.append(key if index is None else int(index))
+        pos = match.end()
+    return tuple(tokens)
+
+
+def get_path(data, path):
+    """Return value referenced by the path."""
+    for token in parse_path(path):
+        try:
+            if isinstance(token, Filter):
+                data = token(data)
+            else:
+                data = data[token]
+        except (KeyError, IndexError, TypeError):
+            raise StatesError(
+                "States.Runtime", f"Path {path!r} not found in input"
+            ) from None
+    return data
+
+
+def set_path(data, path, value):
+    """Return copy of the data with the value stored at the path.
+
+    Only the objects along the path are copied, the rest is shared.
+    """
+    tokens = parse_path(path)
+    if not tokens:
+        return value
+    if any(isinstance(token, Filter) for token in tokens):
+        raise StatesError("States.Runtime", f"Invalid reference {path!r}")
+    if not isinstance(data, dict):
+        raise StatesError("States.Runtime", "Input is not an object")
+    root = node = dict(data)
+    for token in tokens[:-1]:
+        child = node.get(token)
+        child = dict(child) if isinstance(child, dict) else {}
+        node[token] = node = child
+    node[tokens[-1]] = value
+    return root
+
+
+_INTRINSIC = re.compile(r"(States\.\w+)\((.*)\)$")
+
+
+def _format(template, *args):
+    """Replace ``{}`` placeholders of the template with the arguments."""
+    parts = template.split("{}")
+    if len(parts) != len(args) + 1:
+        raise ValueError("number of arguments doesn't match the template")
+    values = [arg if isinstance(arg, str) else json.dumps(arg) for arg in args]
+    return "".join(part + value for part, value in zip(parts, values + [""]))
+
+
+def _math_add(value, step):
+    """Return sum of the integers like ``States.MathAdd``."""
+    if not isinstance(value, int) or not isinstance(step, int):
+        raise ValueError("arguments must be integers")
+    return value + step
+
+
+# Intrinsic functions by name, called with evaluated arguments.
+INTRINSICS = {
+    "States.ArrayLength": len,
+    "States.Format": _format,
+    "States.MathAdd": _math_add,
+    "States.MathRandom": random.randrange,
+    "States.StringToJson": json.loads,
+}
+
+
+def intrinsic(expression, data, context):
+    """Evaluate intrinsic function call with literal or path arguments."""
+    match = _INTRINSIC.match(expression)
+    if not match or match.group(1) not in INTRINSICS:
+        raise StatesError(
+            "States.Runtime", f"Unsupported intrinsic {expression!r}"
+        )
+    args = []
+    for arg in filter(None, map(str.strip, match.group(2).split(","))):
+        if arg.startswith("$$"):
+            args.append(get_path(context, arg[1:]))
+        elif arg.startswith("$"):
+            args.append(get_path(data, arg))
+        elif arg.startswith("'"):
+            args.append(arg[1:-1])
+        else:
+            args.append(int(arg))
+    try:
+        return INTRINSICS[match.group(1)](*args)
+    except (TypeError, ValueError) as e:
+        raise StatesError(
+            "States.Runtime", f"Invalid arguments of {expression!r}: {e}"
+        ) from None
+
+
+def resolve(template, data, context):
+    """Evaluate payload template such as ``Parameters`` against the input.
+
+    Values of keys ending with ``.$`` are paths referencing either the input
+    or, when starting with ``$$``, the context object, or intrinsic function
+    calls.
+    """
+    if isinstance(template, dict):
+        result = {}
+        for key, value in template.items():
+            if key.endswith(".$"):
+                if value.startswith("States."):
+                    result[key[:-2]] = intrinsic(value, data, context)
+                elif value.startswith("$$"):
+                    result[key[:-2]] = get_path(context, value[1:])
+                else:
+                    result[key[:-2]] = get_path(data, value)
+            else:
+                result[key] = resolve(value, data, context)
+        return result
+    if isinstance(template, list):
+        return [resolve(value, data, context) for value in template]
+    return template
+
+
+# Errors which can't be caught or retried by ``States.ALL``.
+TERMINAL_ERRORS = ("States.Runtime", "States.DataLimitExceeded")
+
+# Maximum size of the input and output of a state in bytes.
+MAX_PAYLOAD_SIZE = 256 * 1024
+
+
+def payload_size(payload):
+    """Return size of the payload serialized to JSON in bytes."""
+    return len(json.dumps(payload, separators=(",", ":")).encode())
+
+
+def matches(error_equals, error):
+    """Return whether the error name is matched by ``ErrorEquals`` list."""
+    for name in error_equals:
+        if name == error:
+            return True
+        if name == "States.ALL" and error not in TERMINAL_ERRORS:
+            return True
+        if name == "States.TaskFailed" and not error.startswith("States."):
+            return True
+    return False
+
+
+def _typed(types, compare):
+    """Return comparator applicable only to values of the given types."""
+
+    def comparator(value, expected):
+        return (
+            isinstance(value, types)
+            and (bool in types or not isinstance(value, bool))
+            and compare(value, expected)
+        )
+
+    return comparator
+
+
+_STRING = (str,)
+_NUMBER = (int, float)
+
+# Comparison operators of ``Choice`` rules. The ``...Path`` variants compare
+# to a value referenced by path instead.
+COMPARATORS = {
+    "StringEquals": _typed(_STRING, lambda a, b: a == b),
+    "StringLessThan": _typed(_STRING, lambda a, b: a < b),
+    "StringGreaterThan": _typed(_STRING, lambda a, b: a > b),
+    "StringLessThanEquals": _typed(_STRING, lambda a, b: a <= b),
+    "StringGreaterThanEquals": _typed(_STRING, lambda a, b: a >= b),
+    "NumericEquals": _typed(_NUMBER, lambda a, b: a == b),
+    "NumericLessThan": _typed(_NUMBER, lambda a, b: a < b),
+    "NumericGreaterThan": _typed(_NUMBER, lambda a, b: a > b),
+    "NumericLessThanEquals": _typed(_NUMBER, lambda a, b: a <= b),
+    "NumericGreaterThanEquals": _typed(_NUMBER, lambda a, b: a >= b),
+    "BooleanEquals": _typed((bool,), lambda a, b: a == b),
+    "IsNull": lambda a, b: (a is None) == b,
+    "IsString": lambda a, b: isinstance(a, str) == b,
+    "IsBoolean": lambda a, b: isinstance(a, bool) == b,
+}
+
+
+def evaluate_rule(rule, data):
+    """Return whether the ``Choice`` rule matches the input."""
+    if "And" in rule:
+        return all(evaluate_rule(r, data) for r in rule["And"])
+    if "Or" in rule:
+        return any(evaluate_rule(r, data) for r in rule["Or"])
+    if "Not" in rule:
+        return not evaluate_rule(rule["Not"], data)
+    variable = rule["Variable"]
+    if "IsPresent" in rule:
+        try:
+            get_path(data, variable)
+        except StatesError:
+            return not rule["IsPresent"]
+        return rule["IsPresent"]
+    value = get_path(data, variable)
+    for operator, expected in rule.items():
+        if operator.endswith("Path"):
+            operator = operator[:-4]
+            expected = get_path(data, expected)
+        if operator in COMPARATORS:
+            return COMPARATORS[operator](value, expected)
+    raise StatesError("States.Runtime", f"Invalid choice rule {rule!r}")
+
+
+class Span:
+    """Task, ``Parallel`` or ``Wait`` state run in simulated time.
+
+    Branch is the name of the first state of the ``Parallel`` state branch
+    the state runs in and depth its nesting level. Error is set if the state
+    failed.
+    """
+
+    __slots__ = ("name", "type", "start", "end", "branch", "depth", "error")
+
+    def __init__(self, name, type, start, end, branch, depth, error=None):
+        self.name = name
+        self.type = type
+        self.start = start
+        self.end = end
+        self.branch = branch
+        self.depth = depth
+        self.error = error
+
+    def __repr__(self):
+        return f"<Span {self.name} {self.start:.3f}-{self.end:.3f}>"
+
+
+class Context:
+    """Progress of a (branch of) execution measured in simulated time."""
+
+    __slots__ = (
+        "start",
+        "time",
+        "transitions",
+        "history",
+        "state",
+        "spans",
+        "branch_name",
+        "depth",
+        "max_payload_size",
+        "payload_bytes",
+    )
+
+    def __init__(self, start, time=0.0, branch_name=None, depth=0):
+        self.start = start
+        self.time = time
+        self.transitions = 0
+        self.max_payload_size = 0
+        self.payload_bytes = 0
+        self.history = []
+        self.state = None
+        self.spans = []
+        self.branch_name = branch_name
+        self.depth = depth
+
+    def branch(self, name):
+        """Return context for a branch starting at the current time."""
+        return Context(self.start, self.time, name, self.depth + 1)
+
+    def span(self, name, type, start, error=None):
+        """Record span of the state ending at the current time."""
+        self.spans.append(
+            Span(
+                name,
+                type,
+                start,
+                self.time,
+                self.branch_name,
+                self.depth,
+                error,
+            )
+        )
+
+    def timestamp(self):
+        """Return current time formatted as in the context object."""
+        time = self.start + timedelta(seconds=self.time)
+        return time.isoformat(timespec="milliseconds") + "Z"
+
+
+class Execution:
+    """Result of a state machine execution."""
+
+    def __init__(self, name, input):
+        self.name = name
+        self.input = input
+        self.status = "RUNNING"
+        self.output = None
+        self.error = None
+        self.cause = None
+        self.final_state = None
+        self.duration = 0.0
+        self.transitions = 0
+        self.max_payload_size = 0
+        self.payload_bytes = 0
+        self.history = []
+        self.spans = []
+
+    def __repr__(self):
+        return (
+            f"<Execution {self.name} {self.status} "
+            f"final_state={self.final_state}>"
+        )
+
+
+class StateMachine:
+    """In-process interpreter of Amazon States Language.
+
+    Supports the subset of the language used by the demos: ``Pass``,
+    ``Task``, ``Parallel``, ``Map``, ``Choice``, ``Wait``, ``Succeed`` and
+    ``Fail`` states with input and output processing, ``Retry`` and ``Catch``
+    fields.
+
+    Tasks are executed by callables registered in ``resources`` under the
+    resource ARN. They get the effective parameters and return the task
+    result or raise :class:`StatesError`.
+
+    Waits (including those between retries) don't block, they advance a
+    simulated clock instead so that executions run as fast as the tasks
+    allow. Time spent in the tasks is measured and added to the clock together
+    with ``task_latency`` which models the overhead of invoking the task. Each
+    state transition adds ``transition_latency`` to the clock. Branches of
+    ``Parallel`` state run one after another but their time overlaps on the
+    simulated clock. Executions may start at a given simulated time, which
+    is available to the tasks as :attr:`now` while they run.
+
+    Inputs of the states and the output of the execution larger than
+    ``max_payload_size`` bytes fail the execution with
+    ``States.DataLimitExceeded`` (unless it's ``None``). The largest payload
+    and the total size of the state inputs are recorded in the execution.
+    """
+
+    def __init__(
+        self,
+        definition,
+        resources,
+        task_latency=0.0,
+        transition_latency=0.0,
+        clock=time.perf_counter,
+        max_payload_size=MAX_PAYLOAD_SIZE,
+    ):
+        self.definition = definition
+        self.resources = resources
+        self.task_latency = task_latency
+        self.transition_latency = transition_latency
+        self.clock = clock
+        self.max_payload_size = max_payload_size
+        # Simulated time of the running task.
+        self.now = 0.0
+
+    def execute(self, input, name="execution", start_time=0.0):
+        """Run execution of the state machine and return its result."""
+        execution = Execution(name, input)
+        context = Context(datetime.utcnow(), start_time)
+        context_object = {
+            "Execution": {
+                "Name": name,
+                "Input": input,
+                "StartTime": context.timestamp(),
+            },
+            "StateMachine": {"Name": self.definition.get("Comment", "")},
+        }
+        try:
+            execution.output = self._run(
+                self.definition, input, context, context_object
+            )
+            self._check_payload(execution.output, context)
+        except StatesError as e:
+            execution.status = "FAILED"
+            execution.error = e.error
+            execution.cause = e.cause
+        else:
+            execution.status = "SUCCEEDED"
+        execution.final_state = context.state
+        execution.duration = context.time - start_time
+        execution.transitions = context.transitions
+        execution.max_payload_size = context.max_payload_size
+        execution.payload_bytes = context.payload_bytes
+        execution.history = context.history
+        execution.spans = sorted(
+            context.spans, key=lambda span: (span.start, span.depth)
+        )
+        return execution
+
+    def _run(self, machine, data, context, context_object):
+        """Run states of the (sub) state machine and return the output."""
+        states = machine["States"]
+        name = machine["StartAt"]
+        while True:
+            state = states[name]
+            self._check_payload(data, context)
+            context.transitions += 1
+            context.time += self.transition_latency
+            context.history.append(name)
+            context.state = name
+            state_type = state["Type"]
+            if state_type == "Fail":
+                raise StatesError(
+                    state.get("Error", ""), state.get("Cause", "")
+                )
+            if state_type == "Succeed":
+                return self._output(state, self._input(state, data))
+            if state_type == "Choice":
+                name = self._choose(state, data)
+                data = self._output(state, self._input(state, data))
+                continue
+            if state_type == "Wait":
+                start = context.time
+                context.time += state["Seconds"]
+                context.span(name, state_type, start)
+                data = self._output(state, self._input(state, data))
+                name = state["Next"]
+                continue
+            state_context = dict(
+                context_object,
+                State={"Name": name, "EnteredTime": context.timestamp()},
+            )
+            start = context.time
+            try:
+                data = self._execute(state, data, context, state_context)
+            except StatesError as e:
+                context.span(name, state_type, start, e.error)
+                for catcher in state.get("Catch", ()):
+                    if matches(catcher["ErrorEquals"], e.error):
+                        data = set_path(
+                            data, catcher.get("ResultPath", "$"), e.to_output()
+                        )
+                        name = catcher["Next"]
+                        break
+                else:
+                    raise
+                continue
+            if state_type != "Pass":
+                context.span(name, state_type, start)
+            if state.get("End"):
+                return data
+            name = state["Next"]
+
+    def _check_payload(self, data, context):
+        """Record size of the payload and fail if it exceeds the limit."""
+        if self.max_payload_size is None:
+            return
+        size = payload_size(data)
+        context.max_payload_size = max(context.max_payload_size, size)
+        context.payload_bytes += size
+        if size > self.max_payload_size:
+            raise StatesError(
+                "States.DataLimitExceeded",
+                f"The state payload of {size} bytes exceeds the maximum "
+                f"size of {self.max_payload_size} bytes",
+            )
+
+    def _choose(self, state, data):
+        """Return name of the next state chosen by the ``Choice`` state."""
+        effective = self._input(state, data)
+        for rule in state["Choices"]:
+            if evaluate_rule(rule, effective):
+                return rule["Next"]
+        if "Default" not in state:
+            raise StatesError("States.NoChoiceMatched", "No choice matched")
+        return state["Default"]
+
+    def _input(self, state, data):
+        """Apply ``InputPath`` to the state input."""
+        path = state.get("InputPath", "$")
+        return {} if path is None else get_path(data, path)
+
+    def _output(self, state, data):
+        """Apply ``OutputPath`` to the state output."""
+        path = state.get("OutputPath", "$")
+        return {} if path is None else get_path(data, path)
+
+    def _execute(self, state, data, context, context_object):
+        """Execute state with retries and process its input and output."""
+        effective = self._input(state, data)
+        if "Parameters" in state:
+            effective = resolve(state["Parameters"], effective, context_object)
+
+        state_type = state["Type"]
+        if state_type == "Pass":
+            result = state.get("Result", effective)
+        elif state_type == "Task":
+            result = self._retry(
+                state, context, self._task, state, effective, context
+            )
+        elif state_type == "Parallel":
+            result = self._retry(
+                state,
+                context,
+                self._parallel,
+                state,
+                effective,
+                context,
+                context_object,
+            )
+        elif state_type == "Map":
+            result = self._retry(
+                state,
+                context,
+                self._map,
+                state,
+                effective,
+                context,
+                context_object,
+            )
+        else:
+            raise StatesError(
+                "States.Runtime", f"Unsupported state type {state_type!r}"
+            )
+
+        if "ResultSelector" in state:
+            result = resolve(state["ResultSelector"], result, context_object)
+        path = state.get("ResultPath", "$")
+        data = data if path is None else set_path(data, path, result)
+        return self._output(state, data)
+
+    def _retry(self, state, context, func, *args):
+        """Call the function retrying errors as per state's ``Retry``."""
+        retriers = state.get("Retry", ())
+        attempts = [0] * len(retriers)
+        while True:
+            try:
+                return func(*args)
+            except StatesError as e:
+                for i, retrier in enumerate(retriers):
+                    if matches(retrier["ErrorEquals"], e.error):
+                        break
+                else:
+                    raise
+                if attempts[i] >= retrier.get("MaxAttempts", 3):
+                    raise
+                context.time += self._delay(retrier, attempts[i])
+                context.transitions += 1
+                attempts[i] += 1
+
+    def _delay(self, retrier, attempt):
+        """Return delay in seconds before the given retry attempt.
+
+        The delay is capped by ``MaxDelaySeconds`` and with ``FULL`` jitter
+        strategy picked at random between zero and the capped delay.
+        """
+        interval = retrier.get("IntervalSeconds", 1)
+        delay = interval * retrier.get("BackoffRate", 2.0) ** attempt
+        if "MaxDelaySeconds" in retrier:
+            delay = min(delay, retrier["MaxDelaySeconds"])
+        if retrier.get("JitterStrategy") == "FULL":
+            delay = random.uniform(0, delay)
+        return delay
+
+    def _task(self, state, parameters, context):
+        """Invoke the task resource and return its result."""
+        resource = self.resources.get(state["Resource"])
+        if resource is None:
+            raise StatesError(
+                "States.Runtime", f"Unknown resource {state['Resource']!r}"
+            )
+        self.now = context.time
+        start = self.clock()
+        try:
+            return resource(parameters)
+        finally:
+            context.time += self.clock() - start + self.task_latency
+
+    def _parallel(self, state, data, context, context_object):
+        """Run all the branches and return list of their outputs.
+
+        All branches run to completion even if some of them fail, which
+        corresponds to tasks already in flight when Step Functions stops the
+        branches. The error of the branch failing first is raised.
+        """
+        outputs = []
+        failures = []
+        end = context.time
+        for branch in state["Branches"]:
+            branch_context = context.branch(branch["StartAt"])
+            try:
+                outputs.append(
+                    self._run(branch, data, branch_context, context_object)
+                )
+            except StatesError as e:
+                failures.append((branch_context.time, e))
+            context.transitions += branch_context.transitions
+            context.max_payload_size = max(
+                context.max_payload_size, branch_context.max_payload_size
+            )
+            context.payload_bytes += branch_context.payload_bytes
+            context.history.extend(branch_context.history)
+            context.spans.extend(branch_context.spans)
+            end = max(end, branch_context.time)
+        context.time = end
+        if failures:
+            raise min(failures, key=lambda failure: failure[0])[1]
+        return outputs
+
+    def _items(self, state, data, context, context_object):
+        """Return items of the ``Map`` state read by ``ItemReader``.
+
+        The reader resource gets the resolved parameters and returns the
+        object with its ``Body`` parsed as configured by ``InputType``.
+        Without the reader, the items are selected by ``ItemsPath``.
+        """
+        reader = state.get("ItemReader")
+        if reader is None:
+            return get_path(data, state.get("ItemsPath", "$"))
+        parameters = resolve(
+            reader.get("Parameters", {}), data, context_object
+        )
+        body = self._task(reader, parameters, context)["Body"]
+        input_type = reader.get("ReaderConfig", {}).get("InputType", "JSON")
+        if input_type != "JSON":
+            raise StatesError(
+                "States.Runtime", f"Unsupported input type {input_type!r}"
+            )
+        return json.loads(body)
+
+    def _map(self, state, data, context, context_object):
+        """Run the item processor for each item and return their outputs.
+
+        Items are processed by at most ``MaxConcurrency`` processors at a time
+        in simulated time (unlimited if zero). Failed items fail the state
+        unless their share is tolerated by ``ToleratedFailurePercentage`` or
+        ``ToleratedFailureCount``, outputs of the failed items are left out
+        of the result then. With ``ResultWriter``, the results of all the
+        items are written out and only their location is returned.
+        """
+        items = self._items(state, data, context, context_object)
+        processor = state["ItemProcessor"]
+        concurrency = state.get("MaxConcurrency", 0) or len(items) or 1
+        slots = [context.time] * concurrency
+        outputs = []
+        failures = []
+        results = []
+        end = context.time
+        for index, item in enumerate(items):
+            if "ItemSelector" in state:
+                map_context = {"Item": {"Index": index, "Value": item}}
+                item = resolve(
+                    state["ItemSelector"],
+                    data,
+                    dict(context_object, Map=map_context),
+                )
+            item_context = context.branch(processor["StartAt"])
+            item_context.time = heapq.heappop(slots)
+            result = {"Name": str(index), "Input": json.dumps(item)}
+            try:
+                output = self._run(
+                    processor, item, item_context, context_object
+                )
+            except StatesError as e:
+                failures.append((item_context.time, e))
+                result.update(Status="FAILED", Error=e.error, Cause=e.cause)
+            else:
+                outputs.append(output)
+                result.update(Status="SUCCEEDED", Output=json.dumps(output))
+            results.append(result)
+            heapq.heappush(slots, item_context.time)
+            context.transitions += item_context.transitions
+            context.max_payload_size = max(
+                context.max_payload_size, item_context.max_payload_size
+            )
+            context.payload_bytes += item_context.payload_bytes
+            context.history.extend(item_context.history)
+            context.spans.extend(item_context.spans)
+            end = max(end, item_context.time)
+        context.time = end
+        writer = state.get("ResultWriter")
+        if writer is not None:
+            details = self._write_results(
+                state, writer, data, results, context, context_object
+            )
+        if failures:
+            tolerated = "ToleratedFailurePercentage" in state or (
+                "ToleratedFailureCount" in state
+            )
+            if not tolerated:
+                raise min(failures, key=lambda failure: failure[0])[1]
+            percentage = len(failures) / len(items) * 100
+            if len(failures) > state.get(
+                "ToleratedFailureCount", len(items)
+            ) or percentage > state.get("ToleratedFailurePercentage", 100):
+                raise StatesError(
+                    "States.ExceedToleratedFailureThreshold",
+                    f"{len(failures)} of {len(items)} items failed",
+                )
+        if writer is not None:
+            return details
+        # The outputs of all the items make up the result of the state.
+        self._check_payload(outputs, context)
+        return outputs
+
+    def _write_results(
+        self, state, writer, data, results, context, context_object
+    ):
+        """Write results of the ``Map`` items and return their location.
+
+        The results are written by the ``ResultWriter`` resource the same way
+        as by the Distributed Map state: a file per status of the items
+        under ``Prefix`` and a manifest listing the files.
+        """
+        parameters = resolve(
+            writer.get("Parameters", {}), data, context_object
+        )
+        bucket = parameters["Bucket"]
+        run_id = str(uuid.uuid4())
+        map_run_arn = f"mapRun:{state.get('Label', 'Map')}:{run_id}"
+        prefix = "/".join(
+            filter(None, [parameters.get("Prefix", "").strip("/"), run_id])
+        )
+        files = {"FAILED": [], "PENDING": [], "SUCCEEDED": []}
+        for status in ("SUCCEEDED", "FAILED"):
+            selected = [r for r in results if r["Status"] == status]
+            if selected:
+                key = f"{prefix}/{status}_0.json"
+                body = json.dumps(selected)
+                self._task(
+                    writer,
+                    {"Bucket": bucket, "Key": key, "Body": body},
+                    context,
+                )
+                files[status].append({"Key": key, "Size": len(body.encode())})
+        key = f"{prefix}/manifest.json"
+        manifest = {
+            "DestinationBucket": bucket,
+            "MapRunArn": map_run_arn,
+            "ResultFiles": files,
+        }
+        self._task(
+            writer,
+            {"Bucket": bucket, "Key": key, "Body": json.dumps(manifest)},
+            context,
+        )
+        return {
+            "MapRunArn": map_run_arn,
+            "ResultWriterDetails": {"Bucket": bucket, "Key": key},
+        }
@@ -0,0 +1,251 @@
+"""Book trips in bulk by the Distributed Map state machine.
+
+Run from the ``saga`` directory::
+
+   python -m simulator.bulk --trips 5000 --max-concurrency 100 --fail-rate 0.1
+
+The numbers of booked and cancelled trips reported by the state machine are
+checked against the statuses of the trips read by the ``get-trip`` handler.
+"""
+import argparse
+import collections
+import json
+import logging
+import pathlib
+import sys
+import time
+
+from definition import (
+    DESCRIBE_EXECUTION,
+    START_EXECUTION_SYNC,
+    bulk_definition,
+)
+
+from . import SAGA_DIR
+from .asl import StateMachine, StatesError
+from .lambdas import LambdaInvoker, load_handler
+from .loadtest import generate_trips
+from .s3 import InMemoryS3
+from .saga import (
+    SagaSimulator,
+    add_fail_rate_arguments,
+    chaos_from_args,
+    fail_rates_from_args,
+)
+
+
+__all__ = ["StartExecutionIntegration", "BulkSimulator"]
+
+
+class StartExecutionIntegration:
+    """Resources of the ``states:startExecution.sync:2`` service integration
+    and the ``sfn:describeExecution`` SDK integration.
+
+    Runs child executions of the state machines registered by ARN in place,
+    starting at the simulated time of the parent task given by ``now``. The
+    task takes as long as the child execution in simulated time, the time
+    not measured by ``clock`` is passed to ``sleep``. Child executions are
+    closed once the task finishes, so starting one with the same name again
+    fails with ``ExecutionAlreadyExists`` the same way as in Standard
+    workflows, and it has to be described instead.
+    """
+
+    resource = START_EXECUTION_SYNC
+
+    def __init__(self, state_machines, now, clock, sleep):
+        self.state_machines = state_machines
+        self.now = now
+        self.clock = clock
+        self.sleep = sleep
+        self.executions = {}
+        self.calls = collections.Counter()
+
+    @property
+    def resources(self):
+        """Return resources of the integrations by ARN."""
+        return {
+            self.resource: self.start_execution,
+            DESCRIBE_EXECUTION: self.describe_execution,
+        }
+
+    def start_execution(self, parameters):
+        arn = parameters["StateMachineArn"]
+        name = parameters["Name"]
+        input = parameters.get("Input", {})
+        if isinstance(input, str):
+            input = json.loads(input)
+        self.calls[arn] += 1
+
+        execution_arn = _execution_arn(arn, name)
+        if execution_arn in self.executions:
+            raise StatesError(
+                "StepFunctions.ExecutionAlreadyExistsException",
+                f"Execution already exists: '{execution_arn}'",
+            )
+        start = self.clock()
+        execution = self.state_machines[arn].execute(input, name, self.now())
+        self.sleep(max(0.0, execution.duration - (self.clock() - start)))
+        self.executions[execution_arn] = execution
+
+        description = {
+            "ExecutionArn": execution_arn,
+            "Name": name,
+            "Input": input,
+            "Status": execution.status,
+        }
+        if execution.status == "FAILED":
+            description.update(Error=execution.error, Cause=execution.cause)
+            raise StatesError("States.TaskFailed", json.dumps(description))
+        description["Output"] = execution.output
+        return description
+
+    def describe_execution(self, parameters):
+        execution_arn = parameters["ExecutionArn"]
+        self.calls["DescribeExecution"] += 1
+        execution = self.executions.get(execution_arn)
+        if execution is None:
+            raise StatesError(
+                "Sfn.ExecutionDoesNotExistException",
+                f"Execution Does Not Exist: '{execution_arn}'",
+            )
+        description = {
+            "ExecutionArn": execution_arn,
+            "Name": execution.name,
+            "Input": json.dumps(execution.input),
+            "Status": execution.status,
+        }
+        if execution.status == "FAILED":
+            description.update(Error=execution.error, Cause=execution.cause)
+        else:
+            description["Output"] = json.dumps(execution.output)
+        return description
+
+
+def _execution_arn(state_machine_arn, name):
+    """Return ARN of the execution of the state machine with the name."""
+    arn = state_machine_arn.replace(":stateMachine:", ":execution:")
+    return f"{arn}:{name}"
+
+
+class BulkSimulator(SagaSimulator):
+    """Saga simulator booking trips in bulk, see :func:`bulk_definition`.
+
+    Trips are uploaded as a manifest to an in-memory S3 stand-in and booked
+    by child executions of the saga state machine. Their results are written
+    to the stand-in and counted by the ``count-trips`` handler. Other
+    arguments are passed to :class:`SagaSimulator`.
+    """
+
+    state_machine_arn = (
+        "arn:aws:states:eu-central-1:123456789012:stateMachine:sfn-demo-saga"
+    )
+    bucket = "sfn-demo-saga-trips"
+
+    def __init__(
+        self,
+        *args,
+        max_concurrency=100,
+        tolerated_failure_percentage=5.0,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.s3 = InMemoryS3()
+        module = load_handler("count-trips")
+        module.service.s3 = self.s3
+        self.modules["count-trips"] = module
+        self.bulk_lambdas = LambdaInvoker(
+            {"count-trips": module.lambda_handler}
+        )
+        self.executions = StartExecutionIntegration(
+            {self.state_machine_arn: self.state_machine},
+            lambda: self.bulk_state_machine.now,
+            self._clock,
+            self._sleep,
+        )
+        self.bulk_state_machine = StateMachine(
+            bulk_definition(
+                self.state_machine_arn,
+                "count-trips",
+                max_concurrency,
+                tolerated_failure_percentage,
+            ),
+            {
+                **self.s3.resources,
+                **self.executions.resources,
+                LambdaInvoker.resource: self.bulk_lambdas,
+            },
+            task_latency=self.state_machine.task_latency,
+            transition_latency=self.state_machine.transition_latency,
+            clock=self._clock,
+        )
+
+    def run_bulk(self, trips, key="trips.json", start_time=0.0):
+        """Upload the trips and execute the bulk state machine for them."""
+        self.s3.put_object(
+            Bucket=self.bucket, Key=key, Body=json.dumps(list(trips))
+        )
+        return self.bulk_state_machine.execute(
+            {"bucket": self.bucket, "key": key}, key, start_time
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trips", type=int, default=1000)
+    parser.add_argument("--max-concurrency", type=int, default=100)
+    parser.add_argument(
+        "--tolerated-failure-percentage", type=float, default=5.0
+    )
+    add_fail_rate_arguments(parser)
+    parser.add_argument("--task-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--input", default=SAGA_DIR / "sample-input.json")
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args()
+
+    simulator = BulkSimulator(
+        fail_rates_from_args(args),
+        args.task_latency,
+        args.seed,
+        chaos=chaos_from_args(args),
+        max_concurrency=args.max_concurrency,
+        tolerated_failure_percentage=args.tolerated_failure_percentage,
+    )
+    logging.getLogger().setLevel(args.log_level)
+
+    template = json.loads(pathlib.Path(args.input).read_text())
+    trips = list(generate_trips(template, args.trips))
+    start = time.perf_counter()
+    execution = simulator.run_bulk(trips)
+    elapsed = time.perf_counter() - start
+
+    statuses = collections.Counter(
+        simulator.trip_status(trip["trip_id"])["status"] for trip in trips
+    )
+    summary = {
+        "trips": args.trips,
+        "status": execution.status,
+        "error": execution.error,
+        "output": execution.output,
+        "duration_seconds": execution.duration,
+        "trips_per_second": args.trips / execution.duration,
+        "transitions": execution.transitions,
+        "child_executions": simulator.executions.calls[
+            simulator.state_machine_arn
+        ],
+        "trip_statuses": dict(statuses),
+        "wall_seconds": elapsed,
+    }
+    print(json.dumps(summary, indent=2))
+
+    # Trips whose bookings all failed are cancelled without any booking.
+    output = execution.output or {}
+    consistent = output.get("booked") == statuses["booked"] and output.get(
+        "cancelled"
+    ) == (statuses["cancelled"] + statuses["unknown"])
+    if execution.status != "SUCCEEDED" or not consistent:
+        sys.exit("Counts of the trips don't match their statuses")
+
+
+if __name__ == "__main__":
+    main()
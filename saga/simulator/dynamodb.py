@@ -0,0 +1,510 @@
+import collections
+from decimal import Decimal
+import functools
+import re
+import time
+
+from botocore.exceptions import ClientError
+
+from .asl import StatesError
+
+
+__all__ = ["InMemoryDynamoDB", "DynamoDBIntegration"]
+
+
+@functools.lru_cache(maxsize=None)
+def error_class(code):
+    """Return exception class for the error code like boto3 client does."""
+    return type(code, (ClientError,), {})
+
+
+def client_error(code, message, operation, **fields):
+    """Return client error with the error code and additional fields."""
+    response = {"Error": {"Code": code, "Message": message}, **fields}
+    return error_class(code)(response, operation)
+
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<op><>|<=|>=|=|<|>|\(|\)|,)|(?P<word>[#:]?[\w.]+))"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def tokenize(expression):
+    """Split expression to tokens."""
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match:
+            raise ValueError(f"Invalid expression {expression!r}")
+        tokens.append(match.group("op") or match.group("word"))
+        pos = match.end()
+    return tuple(tokens)
+
+
+def plain(value):
+    """Return comparable Python value of a DynamoDB typed value."""
+    ((type_, data),) = value.items()
+    if type_ == "N":
+        return Decimal(data)
+    return data
+
+
+class Expression:
+    """Evaluator of condition and update expressions.
+
+    Supports comparisons, ``AND``, ``OR``, ``NOT``, parentheses and
+    ``attribute_exists``, ``attribute_not_exists`` and ``begins_with``
+    functions in conditions and ``SET`` (including ``if_not_exists``) and
+    ``REMOVE`` clauses in updates, all on top level attributes.
+    """
+
+    def __init__(self, expression, names=None, values=None):
+        self.tokens = tokenize(expression)
+        self.names = names or {}
+        self.values = values or {}
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected and token.upper() != expected):
+            raise ValueError(f"Expected {expected!r}, got {token!r}")
+        self.pos += 1
+        return token
+
+    def name(self, token):
+        return self.names.get(token, token)
+
+    def operand(self, item):
+        """Parse operand and return its typed value or ``None``."""
+        token = self.take()
+        if token.startswith(":"):
+            return self.values[token]
+        if token == "if_not_exists":
+            self.take("(")
+            current = item.get(self.name(self.take()))
+            self.take(",")
+            default = self.operand(item)
+            self.take(")")
+            return default if current is None else current
+        return item.get(self.name(token))
+
+    def condition(self, item):
+        """Evaluate condition expression against the item."""
+        result = self._or(item)
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected token {self.peek()!r}")
+        return result
+
+    def _or(self, item):
+        result = self._and(item)
+        while (self.peek() or "").upper() == "OR":
+            self.take()
+            result = self._and(item) or result
+        return result
+
+    def _and(self, item):
+        result = self._not(item)
+        while (self.peek() or "").upper() == "AND":
+            self.take()
+            result = self._not(item) and result
+        return result
+
+    def _not(self, item):
+        if (self.peek() or "").upper() == "NOT":
+            self.take()
+            return not self._not(item)
+        return self._primary(item)
+
+    def _primary(self, item):
+        token = self.peek()
+        if token == "(":
+            self.take()
+            result = self._or(item)
+            self.take(")")
+            return result
+        if token in ("attribute_exists", "attribute_not_exists"):
+            self.take()
+            self.take("(")
+            exists = self.name(self.take()) in item
+            self.take(")")
+            return exists if token == "attribute_exists" else not exists
+        if token == "begins_with":
+            self.take()
+            self.take("(")
+            value = self.operand(item)
+            self.take(",")
+            prefix = self.operand(item)
+            self.take(")")
+            return value is not None and plain(value).startswith(plain(prefix))
+        left = self.operand(item)
+        operator = self.take()
+        right = self.operand(item)
+        if operator == "=":
+            return left == right
+        if operator == "<>":
+            return left != right
+        if left is None or right is None:
+            return False
+        left, right = plain(left), plain(right)
+        if operator == "<":
+            return left < right
+        if operator == "<=":
+            return left <= right
+        if operator == ">":
+            return left > right
+        if operator == ">=":
+            return left >= right
+        raise ValueError(f"Unknown operator {operator!r}")
+
+    def update(self, item):
+        """Apply update expression to a copy of the item and return it."""
+        item = dict(item)
+        while self.peek() is not None:
+            clause = self.take().upper()
+            while True:
+                if clause == "SET":
+                    name = self.name(self.take())
+                    self.take("=")
+                    item[name] = self.operand(item)
+                elif clause == "REMOVE":
+                    item.pop(self.name(self.take()), None)
+                else:
+                    raise ValueError(f"Unsupported clause {clause!r}")
+                if self.peek() != ",":
+                    break
+                self.take()
+        return item
+
+
+class Table:
+    """Items of a table indexed by their primary key.
+
+    Items are also grouped to partitions by their partition key to be
+    queried. Tables with provisioned throughput track capacity units
+    consumed in each second, on-demand tables have ``capacity`` set to
+    ``None``.
+    """
+
+    def __init__(self, key_schema, capacity=None):
+        self.key_names = tuple(
+            key["AttributeName"]
+            for key in sorted(key_schema, key=lambda key: key["KeyType"])
+        )
+        self.items = {}
+        self.partitions = collections.defaultdict(dict)
+        self.capacity = capacity
+        self.consumed = collections.Counter()
+
+    def key(self, item):
+        """Return hashable primary key of the item."""
+        return tuple(plain(item[name]) for name in self.key_names)
+
+    def put(self, key, item):
+        """Store the item under the primary key."""
+        self.items[key] = item
+        self.partitions[key[0]][key] = item
+
+    def delete(self, key):
+        """Remove item with the primary key if it exists."""
+        self.items.pop(key, None)
+        self.partitions[key[0]].pop(key, None)
+
+
+class InMemoryDynamoDB:
+    """In-memory stand-in for the boto3 DynamoDB client.
+
+    Implements the operations used by the booking services with the same
+    request and response shapes, including conditional writes and
+    transactions. Failed requests raise :class:`ClientError` subclasses named
+    after the error code just like the operations of a real client. Number of
+    calls of each operation is counted in :attr:`calls`.
+
+    Requests to tables created with provisioned throughput consume capacity
+    units in the second given by ``clock`` and are throttled once the units
+    of the second are used up. Burst capacity isn't modelled and throttled
+    requests are counted by operation in :attr:`throttled`.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.tables = {}
+        self.calls = collections.Counter()
+        self.throttled = collections.Counter()
+        self.clock = clock
+
+    def create_table(self, TableName, KeySchema, **kwargs):
+        capacity = None
+        if kwargs.get("BillingMode", "PROVISIONED") == "PROVISIONED":
+            throughput = kwargs.get("ProvisionedThroughput")
+            if throughput:
+                capacity = {
+                    "read": throughput["ReadCapacityUnits"],
+                    "write": throughput["WriteCapacityUnits"],
+                }
+        self.tables[TableName] = Table(KeySchema, capacity)
+        return {"TableDescription": {"TableName": TableName}}
+
+    def _consume(self, demand, kind, operation):
+        """Consume capacity units of the tables or throttle the request.
+
+        The demand is a list of tables and units consumed from each of them.
+        Items of the bookings are small, so that every read and write takes
+        a single unit (half for eventually consistent reads).
+        """
+        second = int(self.clock())
+        demand = [(t, units) for t, units in demand if t.capacity is not None]
+        for table, units in demand:
+            if table.consumed[kind, second] + units > table.capacity[kind]:
+                self.throttled[operation] += 1
+                raise client_error(
+                    "ProvisionedThroughputExceededException",
+                    "The level of configured provisioned throughput for the "
+                    "table was exceeded",
+                    operation,
+                )
+        for table, units in demand:
+            table.consumed[kind, second] += units
+
+    def _table(self, name, operation):
+        try:
+            return self.tables[name]
+        except KeyError:
+            raise client_error(
+                "ResourceNotFoundException",
+                "Requested resource not found",
+                operation,
+            ) from None
+
+    def _check(self, table, key, params, operation):
+        """Evaluate condition of the write and return the current item."""
+        current = table.items.get(key)
+        if "ConditionExpression" in params:
+            expression = Expression(
+                params["ConditionExpression"],
+                params.get("ExpressionAttributeNames"),
+                params.get("ExpressionAttributeValues"),
+            )
+            if not expression.condition(current or {}):
+                fields = {}
+                if (
+                    params.get("ReturnValuesOnConditionCheckFailure")
+                    == "ALL_OLD"
+                    and current is not None
+                ):
+                    fields["Item"] = dict(current)
+                raise client_error(
+                    "ConditionalCheckFailedException",
+                    "The conditional request failed",
+                    operation,
+                    **fields,
+                )
+        return current
+
+    def _updated(self, current, key_item, params):
+        """Return item resulting from the update request."""
+        return Expression(
+            params["UpdateExpression"],
+            params.get("ExpressionAttributeNames"),
+            params.get("ExpressionAttributeValues"),
+        ).update(current or key_item)
+
+    def get_item(self, TableName, Key, **kwargs):
+        self.calls["GetItem"] += 1
+        table = self._table(TableName, "GetItem")
+        units = 1 if kwargs.get("ConsistentRead") else 0.5
+        self._consume([(table, units)], "read", "GetItem")
+        item = table.items.get(table.key(Key))
+        return {} if item is None else {"Item": dict(item)}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        """Return items by key from the tables.
+
+        Throttling applies to the request as a whole, so that keys are never
+        left unprocessed.
+        """
+        self.calls["BatchGetItem"] += 1
+        demand = []
+        for name, request in RequestItems.items():
+            table = self._table(name, "BatchGetItem")
+            units = 1 if request.get("ConsistentRead") else 0.5
+            demand.append((table, units * len(request["Keys"])))
+        self._consume(demand, "read", "BatchGetItem")
+        responses = {}
+        for (table, _), (name, request) in zip(demand, RequestItems.items()):
+            items = (
+                table.items.get(table.key(key)) for key in request["Keys"]
+            )
+            responses[name] = [dict(item) for item in items if item]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def query(self, TableName, KeyConditionExpression, **kwargs):
+        """Return items of the partition matching the key condition.
+
+        The condition has to compare the partition key for equality.
+        """
+        self.calls["Query"] += 1
+        table = self._table(TableName, "Query")
+        units = 1 if kwargs.get("ConsistentRead") else 0.5
+        self._consume([(table, units)], "read", "Query")
+        expression = Expression(
+            KeyConditionExpression,
+            kwargs.get("ExpressionAttributeNames"),
+            kwargs.get("ExpressionAttributeValues"),
+        )
+        tokens = expression.tokens
+        for i, token in enumerate(tokens[:-2]):
+            if expression.name(token) == table.key_names[0] and (
+                tokens[i + 1] == "="
+            ):
+                partition = plain(expression.values[tokens[i + 2]])
+                break
+        else:
+            raise client_error(
+                "ValidationException",
+                "Query condition missed key schema element",
+                "Query",
+            )
+        items = []
+        for key in sorted(table.partitions.get(partition, ())):
+            item = table.partitions[partition][key]
+            expression.pos = 0
+            if expression.condition(item):
+                items.append(dict(item))
+        return {
+            "Items": items,
+            "Count": len(items),
+            "ScannedCount": len(items),
+        }
+
+    def put_item(self, TableName, Item, **kwargs):
+        self.calls["PutItem"] += 1
+        table = self._table(TableName, "PutItem")
+        self._consume([(table, 1)], "write", "PutItem")
+        key = table.key(Item)
+        current = self._check(table, key, kwargs, "PutItem")
+        table.put(key, dict(Item))
+        if kwargs.get("ReturnValues") == "ALL_OLD" and current is not None:
+            return {"Attributes": dict(current)}
+        return {}
+
+    def update_item(self, TableName, Key, **kwargs):
+        self.calls["UpdateItem"] += 1
+        table = self._table(TableName, "UpdateItem")
+        self._consume([(table, 1)], "write", "UpdateItem")
+        key = table.key(Key)
+        current = self._check(table, key, kwargs, "UpdateItem")
+        item = self._updated(current, Key, kwargs)
+        table.put(key, item)
+        return_values = kwargs.get("ReturnValues", "NONE")
+        if return_values == "ALL_NEW":
+            return {"Attributes": dict(item)}
+        if return_values == "ALL_OLD" and current is not None:
+            return {"Attributes": dict(current)}
+        return {}
+
+    def delete_item(self, TableName, Key, **kwargs):
+        self.calls["DeleteItem"] += 1
+        table = self._table(TableName, "DeleteItem")
+        self._consume([(table, 1)], "write", "DeleteItem")
+        key = table.key(Key)
+        current = self._check(table, key, kwargs, "DeleteItem")
+        table.delete(key)
+        if kwargs.get("ReturnValues") == "ALL_OLD" and current is not None:
+            return {"Attributes": dict(current)}
+        return {}
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        self.calls["TransactWriteItems"] += 1
+        requests = [
+            (
+                action,
+                params,
+                self._table(params["TableName"], "TransactWriteItems"),
+            )
+            for request in TransactItems
+            for action, params in request.items()
+        ]
+        # Transactional writes consume two units per item.
+        demand = collections.Counter()
+        for _, _, table in requests:
+            demand[table] += 2
+        self._consume(demand.items(), "write", "TransactWriteItems")
+        writes = []
+        reasons = []
+        for action, params, table in requests:
+            key_item = params["Item"] if action == "Put" else params["Key"]
+            key = table.key(key_item)
+            try:
+                current = self._check(table, key, params, "TransactWriteItems")
+            except ClientError as e:
+                reason = {"Code": "ConditionalCheckFailed"}
+                if "Item" in e.response:
+                    reason["Item"] = e.response["Item"]
+                reasons.append(reason)
+                continue
+            reasons.append({"Code": "None"})
+            if action == "Put":
+                writes.append((table, key, dict(params["Item"])))
+            elif action == "Update":
+                item = self._updated(current, key_item, params)
+                writes.append((table, key, item))
+            elif action == "Delete":
+                writes.append((table, key, None))
+        if any(reason["Code"] != "None" for reason in reasons):
+            raise client_error(
+                "TransactionCanceledException",
+                "Transaction cancelled",
+                "TransactWriteItems",
+                CancellationReasons=reasons,
+            )
+        for table, key, item in writes:
+            if item is None:
+                table.delete(key)
+            else:
+                table.put(key, item)
+        return {}
+
+
+class DynamoDBIntegration:
+    """Resources of the optimized DynamoDB service integrations.
+
+    The ``getItem``, ``putItem``, ``updateItem`` and ``deleteItem`` tasks call
+    the client operations with the task parameters. Client errors are
+    converted to task errors named ``DynamoDB.<code>``.
+    """
+
+    actions = {
+        "getItem": "get_item",
+        "putItem": "put_item",
+        "updateItem": "update_item",
+        "deleteItem": "delete_item",
+    }
+
+    def __init__(self, client):
+        self.client = client
+
+    @property
+    def resources(self):
+        """Return resources by ARN."""
+        return {
+            f"arn:aws:states:::dynamodb:{action}": functools.partial(
+                self._call, method
+            )
+            for action, method in self.actions.items()
+        }
+
+    def _call(self, method, parameters):
+        try:
+            return getattr(self.client, method)(**parameters)
+        except ClientError as e:
+            error = e.response["Error"]
+            raise StatesError(
+                f"DynamoDB.{error['Code']}", error["Message"]
+            ) from e
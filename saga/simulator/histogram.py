@@ -0,0 +1,93 @@
+import collections
+
+
+__all__ = ["Histogram"]
+
+
+class Histogram:
+    """Histogram of non-negative integer values in the style of HdrHistogram.
+
+    Values are counted in log-linear buckets keeping the given number of
+    significant digits, so that percentiles can be computed with bounded
+    relative error regardless of the number of recorded values.
+    """
+
+    def __init__(self, significant_digits=3):
+        self.sub_bucket_bits = (2 * 10**significant_digits).bit_length()
+        self.counts = collections.Counter()
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def _lowest_equivalent(self, value):
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return value >> shift << shift
+
+    def _highest_equivalent(self, value):
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return (value >> shift << shift) + (1 << shift) - 1
+
+    def record(self, value):
+        """Record the value."""
+        value = int(value)
+        self.counts[self._lowest_equivalent(value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0.0
+
+    def percentile(self, percentile):
+        """Return value at the given percentile (0-100)."""
+        if not self.total:
+            return 0
+        threshold = max(1, round(percentile / 100 * self.total))
+        count = 0
+        for value in sorted(self.counts):
+            count += self.counts[value]
+            if count >= threshold:
+                return min(self._highest_equivalent(value), self.max)
+        return self.max
+
+    def percentile_distribution(self, scale=1.0, ticks_per_half=5):
+        """Return percentile distribution in HdrHistogram text format.
+
+        The output can be plotted with the HdrHistogram plotter. Values are
+        divided by ``scale``, e.g. 1000 to output microseconds as milliseconds.
+        """
+        lines = [
+            f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} "
+            f"{'1/(1-Percentile)':>14}",
+            "",
+        ]
+        count = 0
+        level = 0.0
+        step = 0
+        for value in sorted(self.counts):
+            count += self.counts[value]
+            if count == self.total:
+                break
+            highest = min(self._highest_equivalent(value), self.max)
+            while level <= count / self.total:
+                lines.append(
+                    f"{highest / scale:12.3f} {level:14.12f} {count:10d} "
+                    f"{1 / (1 - level):14.2f}"
+                )
+                step += 1
+                level = 1 - 0.5 ** (step / ticks_per_half)
+        if self.total:
+            lines.append(
+                f"{self.max / scale:12.3f} {1.0:14.12f} {self.total:10d}"
+            )
+        lines.append(
+            f"#[Mean    = {self.mean() / scale:12.3f}, "
+            f"Max            = {self.max / scale:12.3f}]"
+        )
+        lines.append(
+            f"#[Total count    = {self.total:12d}, "
+            f"Buckets        = {len(self.counts):12d}]"
+        )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,73 @@
+import collections
+import importlib.util
+import json
+import os
+import pathlib
+import traceback
+
+from .asl import StatesError
+
+
+__all__ = ["LAMBDAS_DIR", "load_handler", "LambdaInvoker"]
+
+LAMBDAS_DIR = pathlib.Path(__file__).resolve().parent.parent / "lambdas"
+
+
+def load_handler(name, environ=None):
+    """Import Lambda function module from ``lambdas/<name>`` directory.
+
+    All the functions share the ``lambda_function`` module name so each one is
+    loaded under a unique name to be able to use several of them at once.
+    Environment variables are set before the module is executed as they are
+    read when the module initializes.
+    """
+    os.environ.update(
+        {
+            "BOOKINGS_TABLE": f"{name}-bookings",
+            "BOOKINGS_SERVICE": "",
+            "FAIL_RATE": "0.0",
+            "CHAOS": "",
+        }
+    )
+    os.environ.update(environ or {})
+    path = LAMBDAS_DIR / name / "lambda_function.py"
+    spec = importlib.util.spec_from_file_location(
+        f"{name.replace('-', '_')}_lambda_function", path
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LambdaInvoker:
+    """Resource of the ``lambda:invoke`` service integration.
+
+    Calls handlers registered by function name and converts unhandled
+    exceptions to task errors the same way as Lambda and Step Functions do.
+    Number of invocations of each function is counted in :attr:`calls`.
+    """
+
+    resource = "arn:aws:states:::lambda:invoke"
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.calls = collections.Counter()
+
+    def __call__(self, parameters):
+        self.calls[parameters["FunctionName"]] += 1
+        handler = self.handlers[parameters["FunctionName"]]
+        try:
+            payload = handler(parameters["Payload"], None)
+        except Exception as e:
+            error_type = type(e).__name__
+            cause = {
+                "errorMessage": str(e),
+                "errorType": error_type,
+                "stackTrace": traceback.format_tb(e.__traceback__),
+            }
+            raise StatesError(error_type, json.dumps(cause)) from e
+        return {
+            "ExecutedVersion": "$LATEST",
+            "Payload": payload,
+            "StatusCode": 200,
+        }
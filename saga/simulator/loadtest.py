@@ -0,0 +1,217 @@
+"""Load test the saga and report latency percentiles and outcomes.
+
+Run from the ``saga`` directory::
+
+   python -m simulator.loadtest --sagas 10000 --rate 200 --concurrency 50 \
+     --fail-rate 0.1 --hgrm-dir results
+"""
+import argparse
+import collections
+import heapq
+import json
+import logging
+import pathlib
+import random
+import time
+import uuid
+
+from definition import RECOVERY_MODES
+
+from . import SAGA_DIR
+from .histogram import Histogram
+from .saga import (
+    SagaSimulator,
+    add_fail_rate_arguments,
+    chaos_from_args,
+    fail_rates_from_args,
+)
+
+
+__all__ = ["SagaResult", "SimulatorBackend", "BACKENDS", "LoadTest"]
+
+OUTCOMES = ("TripBooked", "TripCancelled", "TripCancelFailed")
+
+
+class SagaResult:
+    """Outcome of a single saga reported by a backend."""
+
+    __slots__ = ("final_state", "duration", "dynamodb_calls")
+
+    def __init__(self, final_state, duration, dynamodb_calls):
+        self.final_state = final_state
+        self.duration = duration
+        self.dynamodb_calls = dynamodb_calls
+
+
+class SimulatorBackend:
+    """Backend running the sagas in the local simulator.
+
+    Additional options are passed to :class:`SagaSimulator`.
+    """
+
+    def __init__(self, fail_rates, task_latency=0.0, seed=None, **options):
+        self.simulator = SagaSimulator(
+            fail_rates, task_latency, seed, **options
+        )
+
+    def run(self, trip, start_time=0.0):
+        calls = self.simulator.dynamodb.calls
+        before = sum(calls.values())
+        execution = self.simulator.run(trip, start_time=start_time)
+        return SagaResult(
+            execution.final_state,
+            execution.duration,
+            sum(calls.values()) - before,
+        )
+
+
+# Backends by name. A backend is created with failure rates of the functions
+# and runs one saga at a time starting at the given simulated time, reporting
+# its outcome and duration.
+BACKENDS = {"simulator": SimulatorBackend}
+
+
+def generate_trips(template, count):
+    """Generate trips based on the template with unique trip IDs."""
+    for _ in range(count):
+        yield dict(template, trip_id=str(uuid.uuid4()))
+
+
+class LoadTest:
+    """Open-loop load test in simulated time.
+
+    Sagas arrive as a Poisson process with the given rate (per second) and
+    each of them occupies one of ``concurrency`` slots for the duration
+    reported by the backend. End-to-end latency includes the time spent
+    waiting for a free slot.
+    """
+
+    def __init__(self, backend, rate, concurrency, seed=None):
+        self.backend = backend
+        self.rate = rate
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self.latency = Histogram()
+        self.latency_by_outcome = collections.defaultdict(Histogram)
+        self.wait = Histogram()
+        self.dynamodb_calls = Histogram()
+        self.outcomes = collections.Counter()
+        self.makespan = 0.0
+
+    def run(self, trips):
+        """Run sagas for the trips and record the results."""
+        slots = [0.0] * self.concurrency
+        arrival = 0.0
+        for trip in trips:
+            arrival += self.random.expovariate(self.rate)
+            start = max(arrival, heapq.heappop(slots))
+            result = self.backend.run(trip, start)
+            end = start + result.duration
+            heapq.heappush(slots, end)
+            self.makespan = max(self.makespan, end)
+
+            # Latencies are recorded in microseconds.
+            self.latency.record((end - arrival) * 1e6)
+            self.latency_by_outcome[result.final_state].record(
+                (end - arrival) * 1e6
+            )
+            self.wait.record((start - arrival) * 1e6)
+            self.dynamodb_calls.record(result.dynamodb_calls)
+            self.outcomes[result.final_state] += 1
+
+    def report(self):
+        """Return summary of the results."""
+
+        def percentiles(histogram):
+            return {
+                "p50": histogram.percentile(50) / 1e3,
+                "p95": histogram.percentile(95) / 1e3,
+                "p99": histogram.percentile(99) / 1e3,
+                "max": histogram.max / 1e3,
+                "mean": histogram.mean() / 1e3,
+            }
+
+        total = self.latency.total
+        return {
+            "sagas": total,
+            "arrival_rate": self.rate,
+            "concurrency": self.concurrency,
+            "throughput": total / self.makespan if self.makespan else 0.0,
+            "latency_ms": percentiles(self.latency),
+            "wait_ms": percentiles(self.wait),
+            "outcomes": {
+                outcome: {
+                    "count": self.outcomes[outcome],
+                    "ratio": self.outcomes[outcome] / total if total else 0,
+                    "latency_ms": percentiles(
+                        self.latency_by_outcome[outcome]
+                    ),
+                }
+                for outcome in sorted(set(OUTCOMES) | set(self.outcomes))
+            },
+            "dynamodb_calls_per_saga": {
+                "mean": self.dynamodb_calls.mean(),
+                "p99": self.dynamodb_calls.percentile(99),
+                "max": self.dynamodb_calls.max,
+            },
+        }
+
+    def write_histograms(self, directory):
+        """Write latency histograms in HdrHistogram text format."""
+        directory = pathlib.Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        histograms = {"latency": self.latency}
+        for outcome, histogram in self.latency_by_outcome.items():
+            histograms[f"latency-{outcome}"] = histogram
+        for name, histogram in histograms.items():
+            (directory / f"{name}.hgrm").write_text(
+                histogram.percentile_distribution(scale=1e3)
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=BACKENDS, default="simulator")
+    parser.add_argument("--sagas", type=int, default=10000)
+    parser.add_argument(
+        "--rate", type=float, default=100.0, help="arrival rate per second"
+    )
+    parser.add_argument("--concurrency", type=int, default=100)
+    add_fail_rate_arguments(parser)
+    parser.add_argument("--task-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--recovery", choices=RECOVERY_MODES, default="backward"
+    )
+    parser.add_argument("--input", default=SAGA_DIR / "sample-input.json")
+    parser.add_argument(
+        "--hgrm-dir", help="directory to write latency histograms to"
+    )
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args()
+
+    backend = BACKENDS[args.backend](
+        fail_rates_from_args(args),
+        args.task_latency,
+        args.seed,
+        chaos=chaos_from_args(args),
+        definition_options={"recovery": args.recovery},
+    )
+    logging.getLogger().setLevel(args.log_level)
+
+    template = json.loads(pathlib.Path(args.input).read_text())
+    load_test = LoadTest(backend, args.rate, args.concurrency, args.seed)
+    start = time.perf_counter()
+    load_test.run(generate_trips(template, args.sagas))
+    elapsed = time.perf_counter() - start
+
+    report = load_test.report()
+    report["fail_rates"] = fail_rates_from_args(args)
+    report["wall_seconds"] = elapsed
+    print(json.dumps(report, indent=2))
+    if args.hgrm_dir:
+        load_test.write_histograms(args.hgrm_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import math
+
+
+__all__ = ["standard_cost", "express_cost", "COSTS"]
+
+# Prices in USD in us-east-1, they differ slightly in other regions.
+STANDARD_PRICE_PER_TRANSITION = 0.000025
+EXPRESS_PRICE_PER_REQUEST = 0.000001
+EXPRESS_PRICE_PER_GB_SECOND = 0.00001667
+
+
+def standard_cost(execution):
+    """Return cost of the execution as a Standard workflow.
+
+    Standard workflows are charged per state transition including retries.
+    """
+    return execution.transitions * STANDARD_PRICE_PER_TRANSITION
+
+
+def express_cost(execution, memory_mb=64):
+    """Return cost of the execution as an Express workflow.
+
+    Express workflows are charged per request and for duration rounded up to
+    100 ms with memory used in 64 MB increments.
+    """
+    duration = max(1, math.ceil(execution.duration * 10)) / 10
+    memory = math.ceil(memory_mb / 64) * 64 / 1024
+    return (
+        EXPRESS_PRICE_PER_REQUEST
+        + duration * memory * EXPRESS_PRICE_PER_GB_SECOND
+    )
+
+
+# Cost functions by workflow type.
+COSTS = {"STANDARD": standard_cost, "EXPRESS": express_cost}
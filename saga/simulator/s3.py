@@ -0,0 +1,77 @@
+import collections
+import io
+
+from botocore.exceptions import ClientError
+
+from .asl import StatesError
+
+
+__all__ = ["InMemoryS3"]
+
+
+class InMemoryS3:
+    """In-memory stand-in for the subset of S3 used by the bulk booking.
+
+    Objects are stored as bytes by bucket and key. The object operations
+    take the same arguments as the boto3 client, so that the stand-in can
+    replace the client of the Lambda handlers, and the state machine uses
+    them through :attr:`resources`. Number of calls of each operation is
+    counted in :attr:`calls`.
+    """
+
+    get_object_resource = "arn:aws:states:::s3:getObject"
+    put_object_resource = "arn:aws:states:::s3:putObject"
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = collections.Counter()
+
+    @property
+    def resources(self):
+        """Return resources of the S3 service integrations by ARN."""
+        return {
+            self.get_object_resource: self._get_object_task,
+            self.put_object_resource: self._put_object_task,
+        }
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls["PutObject"] += 1
+        if isinstance(Body, str):
+            Body = Body.encode()
+        self.objects[Bucket, Key] = Body
+        return {}
+
+    def get_object(self, Bucket, Key):
+        self.calls["GetObject"] += 1
+        try:
+            body = self.objects[Bucket, Key]
+        except KeyError:
+            raise ClientError(
+                {
+                    "Error": {
+                        "Code": "NoSuchKey",
+                        "Message": "The specified key does not exist.",
+                    }
+                },
+                "GetObject",
+            ) from None
+        return {"Body": io.BytesIO(body), "ContentLength": len(body)}
+
+    def _get_object_task(self, parameters):
+        try:
+            response = self.get_object(
+                Bucket=parameters["Bucket"], Key=parameters["Key"]
+            )
+        except ClientError as e:
+            raise StatesError(
+                "S3.NoSuchKeyException", e.response["Error"]["Message"]
+            ) from None
+        body = response["Body"].read().decode()
+        return {"Body": body, "ContentLength": response["ContentLength"]}
+
+    def _put_object_task(self, parameters):
+        return self.put_object(
+            Bucket=parameters["Bucket"],
+            Key=parameters["Key"],
+            Body=parameters["Body"],
+        )
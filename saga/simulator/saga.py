@@ -0,0 +1,267 @@
+import argparse
+import json
+import random
+import time
+
+from definition import (
+    SERVICES,
+    dynamodb_saga_step,
+    saga_definition,
+    saga_step,
+)
+
+from .asl import StateMachine
+from .dynamodb import DynamoDBIntegration, InMemoryDynamoDB
+from .lambdas import LambdaInvoker, load_handler
+
+
+__all__ = [
+    "SERVICES",
+    "FUNCTIONS",
+    "SagaSimulator",
+    "add_fail_rate_arguments",
+    "chaos_from_args",
+    "fail_rates_from_args",
+]
+
+# The ``book-trip`` function books all the services in the single-table
+# design.
+FUNCTIONS = (
+    *(
+        f"{action}-{service}"
+        for action in ("book", "cancel")
+        for service in SERVICES
+    ),
+    "book-trip",
+)
+
+
+class SagaSimulator:
+    """Saga state machine running in-process.
+
+    The Lambda handlers are driven directly by the state machine interpreter
+    and store bookings to an in-memory DynamoDB stand-in. Failure rates of
+    the functions are given by function name, e.g. ``{"book-hotel": 0.1}``.
+    The definition is built with ``step_options`` passed to each
+    :func:`saga_step` and ``definition_options`` to :func:`saga_definition`.
+
+    With ``integration`` set to ``dynamodb``, the steps write to the tables
+    via DynamoDB service integrations instead of invoking the functions, see
+    :func:`dynamodb_saga_step`. Failure rates are then injected by the state
+    machine.
+
+    Tables are created with ``provisioned_throughput`` if given, using the
+    simulated time to throttle the requests, or as on-demand otherwise. With
+    ``single_table`` set, all the services store bookings in a single table
+    named ``bookings`` keyed by trip ID and service name, and the trip is
+    booked by the ``book-trip`` function in a single transaction unless the
+    ``dynamodb`` integration is used.
+
+    Faults are injected into the functions as configured by ``chaos`` given
+    by function name, see :class:`booking.Chaos`. Injected latency advances
+    the simulated clock instead of blocking. Faults other than the fail rates
+    are not injected with the ``dynamodb`` integration. Runs with the same
+    ``seed`` inject the same faults, each function gets its own seed derived
+    from it unless the configuration sets one.
+
+    Statuses of the trips are read by the ``get-trip`` handler, see
+    :meth:`trip_status`.
+    """
+
+    def __init__(
+        self,
+        fail_rates=None,
+        task_latency=0.0,
+        seed=None,
+        transition_latency=0.0,
+        step_options=None,
+        definition_options=None,
+        integration="lambda",
+        provisioned_throughput=None,
+        single_table=False,
+        chaos=None,
+    ):
+        fail_rates = fail_rates or {}
+        chaos = chaos or {}
+        if seed is not None:
+            random.seed(seed)
+
+        self.dynamodb = InMemoryDynamoDB(lambda: self.state_machine.now)
+        # Time injected into the tasks on top of the time they take.
+        self.injected_time = 0.0
+        if provisioned_throughput:
+            capacity = {
+                "BillingMode": "PROVISIONED",
+                "ProvisionedThroughput": provisioned_throughput,
+            }
+        else:
+            capacity = {"BillingMode": "PAY_PER_REQUEST"}
+        key_schema = [{"AttributeName": "trip_id", "KeyType": "HASH"}]
+        if single_table:
+            key_schema.append({"AttributeName": "service", "KeyType": "RANGE"})
+            self.dynamodb.create_table(
+                TableName="bookings", KeySchema=key_schema, **capacity
+            )
+        self.tables = {}
+        self.modules = {}
+
+        def load_booking(name, environ):
+            # Every function draws its faults from a generator seeded by the
+            # simulator unless the configuration gives a seed.
+            config = dict(chaos.get(name, {}))
+            if seed is not None:
+                config.setdefault("seed", f"{seed}:{name}")
+            module = load_handler(
+                name,
+                {
+                    **environ,
+                    "FAIL_RATE": str(fail_rates.get(name, 0.0)),
+                    "CHAOS": json.dumps(config),
+                },
+            )
+            module.service.dynamodb = self.dynamodb
+            module.service.chaos.sleep = self._sleep
+            self.modules[name] = module
+
+        for service in SERVICES:
+            if single_table:
+                table = self.tables[service] = "bookings"
+            else:
+                table = self.tables[service] = f"{service}-bookings"
+                self.dynamodb.create_table(
+                    TableName=table, KeySchema=key_schema, **capacity
+                )
+            for action in ("book", "cancel"):
+                load_booking(
+                    f"{action}-{service}",
+                    {
+                        "BOOKINGS_TABLE": table,
+                        "BOOKINGS_SERVICE": service if single_table else "",
+                    },
+                )
+        definition_options = dict(definition_options or {})
+        if single_table and integration == "lambda":
+            load_booking("book-trip", {"BOOKINGS_TABLE": "bookings"})
+            definition_options.setdefault("book_trip", "book-trip")
+
+        module = load_handler(
+            "get-trip",
+            {
+                "BOOKINGS_TABLES": json.dumps(self.tables),
+                "TABLE_DESIGN": "single" if single_table else "multi",
+            },
+        )
+        module.service.dynamodb = self.dynamodb
+        # The cache is shared by the handlers loaded in the process.
+        module.service.cache.clear()
+        self.modules["get-trip"] = module
+
+        handlers = {
+            name: module.lambda_handler
+            for name, module in self.modules.items()
+        }
+        if integration == "dynamodb":
+            steps = [
+                dynamodb_saga_step(
+                    service,
+                    table=self.tables[service],
+                    payload_fields=fields,
+                    book_fail_rate=fail_rates.get(f"book-{service}", 0.0),
+                    cancel_fail_rate=fail_rates.get(f"cancel-{service}", 0.0),
+                    single_table=single_table,
+                    **(step_options or {}),
+                )
+                for service, fields in SERVICES.items()
+            ]
+        else:
+            steps = [
+                saga_step(
+                    service,
+                    book=f"book-{service}",
+                    cancel=f"cancel-{service}",
+                    payload_fields=fields,
+                    **(step_options or {}),
+                )
+                for service, fields in SERVICES.items()
+            ]
+        definition = saga_definition(steps, **definition_options)
+        self.lambdas = LambdaInvoker(handlers)
+        self.state_machine = StateMachine(
+            definition,
+            {
+                LambdaInvoker.resource: self.lambdas,
+                **DynamoDBIntegration(self.dynamodb).resources,
+            },
+            task_latency=task_latency,
+            transition_latency=transition_latency,
+            clock=self._clock,
+        )
+
+    def _clock(self):
+        return time.perf_counter() + self.injected_time
+
+    def _sleep(self, seconds):
+        self.injected_time += seconds
+
+    def run(self, trip, name=None, start_time=0.0):
+        """Execute the saga for the trip and return the execution."""
+        return self.state_machine.execute(
+            trip, name or trip["trip_id"], start_time
+        )
+
+    def trip_status(self, trip_id):
+        """Return status of the trip read by the ``get-trip`` handler."""
+        return self.modules["get-trip"].lambda_handler(
+            {"trip_id": trip_id}, None
+        )
+
+
+def _function_fail_rate(value):
+    """Parse ``FUNCTION=RATE`` argument."""
+    name, _, rate = value.partition("=")
+    if name not in FUNCTIONS:
+        raise argparse.ArgumentTypeError(f"unknown function {name!r}")
+    return name, float(rate)
+
+
+def add_fail_rate_arguments(parser, fail_rate=0.0):
+    """Add arguments configuring failure rates of the functions."""
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=fail_rate,
+        help="failure rate of all the functions",
+    )
+    parser.add_argument(
+        "--function-fail-rate",
+        type=_function_fail_rate,
+        action="append",
+        default=[],
+        metavar="FUNCTION=RATE",
+        help="failure rate of a single function, e.g. book-hotel=0.5",
+    )
+    parser.add_argument(
+        "--chaos",
+        metavar="FILE",
+        help="JSON file with fault injection configuration by function name",
+    )
+
+
+def fail_rates_from_args(args):
+    """Return failure rates by function name from parsed arguments."""
+    fail_rates = dict.fromkeys(FUNCTIONS, args.fail_rate)
+    fail_rates.update(args.function_fail_rate)
+    return fail_rates
+
+
+def chaos_from_args(args):
+    """Return fault injection configuration by function name from arguments.
+
+    Configuration under ``*`` applies to the functions not listed.
+    """
+    if not args.chaos:
+        return {}
+    with open(args.chaos) as f:
+        config = json.load(f)
+    default = config.pop("*", {})
+    return {name: config.get(name, default) for name in FUNCTIONS}
@@ -0,0 +1,118 @@
+"""Print waterfall of the states of sagas run in the simulator.
+
+Run from the ``saga`` directory::
+
+   python -m simulator.trace --sagas 1000 --fail-rate 0.2 --task-latency 0.05
+
+The waterfall of the slowest saga is printed together with how often each
+branch took longest to finish the ``Parallel`` states, i.e. dominated their
+latency.
+"""
+import argparse
+import collections
+import json
+import logging
+import uuid
+
+from . import SAGA_DIR
+from .saga import (
+    SagaSimulator,
+    add_fail_rate_arguments,
+    chaos_from_args,
+    fail_rates_from_args,
+)
+
+
+__all__ = ["dominant_branches", "waterfall"]
+
+
+def dominant_branches(execution):
+    """Return the branch finishing last by name of each ``Parallel`` state.
+
+    Branches finishing at the same time are reported as a tie.
+    """
+    dominant = {}
+    for parallel in execution.spans:
+        if parallel.type != "Parallel":
+            continue
+        children = [
+            span
+            for span in execution.spans
+            if span.depth == parallel.depth + 1
+            and parallel.start <= span.start
+            and span.end <= parallel.end
+        ]
+        if children:
+            end = max(span.end for span in children)
+            branches = {span.branch for span in children if span.end == end}
+            dominant[parallel.name] = (
+                branches.pop() if len(branches) == 1 else "(tie)"
+            )
+    return dominant
+
+
+def waterfall(execution, width=50):
+    """Return lines of the waterfall chart of the execution's spans."""
+    if not execution.spans:
+        return []
+    origin = min(span.start for span in execution.spans)
+    total = max(span.end for span in execution.spans) - origin or 1.0
+    lines = []
+    for span in execution.spans:
+        begin = round((span.start - origin) / total * width)
+        end = max(begin + 1, round((span.end - origin) / total * width))
+        bar = " " * begin + "#" * (end - begin) + " " * (width - end)
+        label = "  " * span.depth + span.name
+        lines.append(
+            f"{label:<32}|{bar}| {(span.start - origin) * 1e3:>8.1f} "
+            f"{(span.end - span.start) * 1e3:>8.1f} ms"
+            + (f"  {span.error}" if span.error else "")
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sagas", type=int, default=1)
+    add_fail_rate_arguments(parser)
+    parser.add_argument("--task-latency", type=float, default=0.0)
+    parser.add_argument(
+        "--integration", choices=("lambda", "dynamodb"), default="lambda"
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args()
+
+    simulator = SagaSimulator(
+        fail_rates_from_args(args),
+        args.task_latency,
+        args.seed,
+        integration=args.integration,
+        chaos=chaos_from_args(args),
+    )
+    logging.getLogger().setLevel(args.log_level)
+
+    trip = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    slowest = None
+    dominance = collections.defaultdict(collections.Counter)
+    for _ in range(args.sagas):
+        execution = simulator.run(dict(trip, trip_id=str(uuid.uuid4())))
+        for parallel, branch in dominant_branches(execution).items():
+            dominance[parallel][branch] += 1
+        if slowest is None or execution.duration > slowest.duration:
+            slowest = execution
+
+    print(
+        f"Slowest saga: {slowest.final_state} in "
+        f"{slowest.duration * 1e3:.1f} ms"
+    )
+    print("\n".join(waterfall(slowest)))
+    for parallel, counts in dominance.items():
+        total = sum(counts.values())
+        print(f"\n{parallel} dominated by")
+        for branch, count in counts.most_common():
+            print(f"  {branch:<30}{count:>8}{count / total:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import json
+import pathlib
+import socket
+import sys
+import uuid
+
+import pytest
+from botocore.exceptions import ConnectionClosedError, ReadTimeoutError
+
+# Make the packages of the saga importable the same way as when running them
+# from the ``saga`` directory.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from simulator import SAGA_DIR  # noqa: E402
+
+
+class LostResponse:
+    """DynamoDB client writing the bookings and failing with the error."""
+
+    def __init__(self, client, error):
+        self.client = client
+        self.error = error
+
+    def put_item(self, **kwargs):
+        self.client.put_item(**kwargs)
+        raise self.error
+
+
+@pytest.fixture
+def trip():
+    """Return the sample trip with a unique trip ID."""
+    trip = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    trip["trip_id"] = str(uuid.uuid4())
+    return trip
+
+
+@pytest.fixture
+def stalled_endpoint(monkeypatch):
+    """Return URL of an endpoint accepting connections but never responding.
+
+    Any credentials are accepted.
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "stub")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "stub")
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        yield f"http://127.0.0.1:{server.getsockname()[1]}"
+
+
+@pytest.fixture(params=[ReadTimeoutError, ConnectionClosedError])
+def lost_response(request):
+    """Return function wrapping DynamoDB client to lose responses of writes.
+
+    Bookings get written but the requests fail with each of the errors raised
+    when a response doesn't arrive.
+    """
+    error = request.param(endpoint_url="https://dynamodb")
+    return lambda client: LostResponse(client, error)
@@ -0,0 +1,119 @@
+import collections
+import json
+
+import pytest
+
+from booking import BulkResultsService
+from definition import bulk_definition
+from simulator.bulk import BulkSimulator
+from simulator.s3 import InMemoryS3
+from simulator.loadtest import generate_trips
+
+
+STATE_MACHINE_ARN = BulkSimulator.state_machine_arn
+
+
+@pytest.fixture
+def trips(trip):
+    return list(generate_trips(trip, 50))
+
+
+def statuses(simulator, trips):
+    return collections.Counter(
+        simulator.trip_status(trip["trip_id"])["status"] for trip in trips
+    )
+
+
+def test_definition_describes_existing_execution():
+    states = bulk_definition(STATE_MACHINE_ARN, "count-trips")["States"][
+        "BookTrips"
+    ]["ItemProcessor"]["States"]
+    catch = states["BookTrip"]["Catch"][0]
+    assert catch["ErrorEquals"] == [
+        "StepFunctions.ExecutionAlreadyExistsException"
+    ]
+    assert catch["Next"] == "DescribeTrip"
+    assert states["DescribeTrip"]["Parameters"]["ExecutionArn.$"] == (
+        "States.Format('arn:aws:states:eu-central-1:123456789012:execution:"
+        "sfn-demo-saga:{}', $.trip_id)"
+    )
+
+
+def test_definition_writes_results():
+    states = bulk_definition(STATE_MACHINE_ARN, "count-trips")["States"]
+    assert "ResultSelector" not in states["BookTrips"]
+    assert states["BookTrips"]["ResultWriter"]["Parameters"] == {
+        "Bucket.$": "$.bucket",
+        "Prefix": "results",
+    }
+    assert states["CountTrips"]["Parameters"]["FunctionName"] == "count-trips"
+
+
+def test_counts_match_statuses(trips):
+    simulator = BulkSimulator({"book-car": 0.2}, seed=1)
+    execution = simulator.run_bulk(trips)
+    assert execution.status == "SUCCEEDED"
+    counts = statuses(simulator, trips)
+    assert execution.output["booked"] == counts["booked"]
+    assert execution.output["cancelled"] == counts["cancelled"]
+    assert execution.output["cancel_failed"] == 0
+    assert execution.output["failed"] == 0
+
+
+def test_payload_independent_of_trips(trip):
+    sizes = []
+    for count in (10, 500):
+        simulator = BulkSimulator()
+        execution = simulator.run_bulk(generate_trips(trip, count))
+        assert execution.output["booked"] == count
+        sizes.append(execution.max_payload_size)
+    assert sizes[0] == sizes[1]
+
+
+def test_results_counted():
+    s3 = InMemoryS3()
+    results = [
+        {"Status": "SUCCEEDED", "Output": json.dumps({"status": status})}
+        for status in ("booked", "booked", "cancelled")
+    ]
+    s3.put_object(
+        Bucket="trips", Key="run/SUCCEEDED_0.json", Body=json.dumps(results)
+    )
+    s3.put_object(
+        Bucket="trips",
+        Key="run/FAILED_0.json",
+        Body=json.dumps([{"Status": "FAILED", "Error": "TripFailedError"}]),
+    )
+    manifest = {
+        "ResultFiles": {
+            "FAILED": [{"Key": "run/FAILED_0.json"}],
+            "PENDING": [],
+            "SUCCEEDED": [{"Key": "run/SUCCEEDED_0.json"}],
+        }
+    }
+    s3.put_object(
+        Bucket="trips", Key="run/manifest.json", Body=json.dumps(manifest)
+    )
+    service = BulkResultsService(client=s3)
+    assert service.count("trips", "run/manifest.json") == {
+        "booked": 2,
+        "cancelled": 1,
+        "cancel_failed": 0,
+        "failed": 1,
+    }
+
+
+def test_rerun_reports_existing_executions(trips):
+    simulator = BulkSimulator({"book-car": 0.2}, seed=1)
+    first = simulator.run_bulk(trips, key="first.json")
+    new_trips = list(generate_trips(trips[0], 10))
+    second = simulator.run_bulk(trips + new_trips, key="second.json")
+    assert second.status == "SUCCEEDED"
+    counts = statuses(simulator, trips + new_trips)
+    assert second.output["booked"] == counts["booked"]
+    assert second.output["booked"] >= first.output["booked"]
+    assert sum(second.output.values()) == len(trips) + len(new_trips)
+    assert simulator.executions.calls["DescribeExecution"] == len(trips)
+    assert simulator.executions.calls[STATE_MACHINE_ARN] == (
+        2 * len(trips) + len(new_trips)
+    )
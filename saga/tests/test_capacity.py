@@ -0,0 +1,65 @@
+import json
+import logging
+
+import pytest
+
+from simulator import SAGA_DIR
+from simulator.loadtest import LoadTest, SimulatorBackend, generate_trips
+
+
+CAPACITY = 2
+
+
+def run(capacity, sagas=150, rate=20.0):
+    """Run the load test of the booking tables with the capacity units."""
+    throughput = None
+    if capacity is not None:
+        throughput = {
+            "ReadCapacityUnits": capacity,
+            "WriteCapacityUnits": capacity,
+        }
+    backend = SimulatorBackend(
+        {}, 0.02, seed=1, provisioned_throughput=throughput
+    )
+    template = json.loads((SAGA_DIR / "sample-input.json").read_text())
+    trips = list(generate_trips(template, sagas))
+    load_test = LoadTest(backend, rate, 100, seed=1)
+    load_test.run(trips)
+    return load_test, backend.simulator, trips
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    logging.getLogger().setLevel(logging.ERROR)
+
+
+def test_throughput_capped_by_capacity():
+    load_test, simulator, _ = run(CAPACITY)
+    booked = load_test.outcomes["TripBooked"] / load_test.makespan
+    assert 0 < booked <= CAPACITY
+    for table in simulator.dynamodb.tables.values():
+        assert max(table.consumed.values()) <= CAPACITY
+    assert sum(simulator.dynamodb.throttled.values()) > 0
+
+    on_demand, _, _ = run(None)
+    assert on_demand.outcomes["TripBooked"] / on_demand.makespan > 2 * booked
+
+
+def test_throttled_writes_not_lost():
+    load_test, simulator, trips = run(CAPACITY)
+    assert simulator.dynamodb.throttled["UpdateItem"] > 0
+    # Every saga ends up with all the bookings either booked or cancelled.
+    assert set(load_test.outcomes) == {"TripBooked", "TripCancelled"}
+    statuses = {}
+    for table in simulator.dynamodb.tables.values():
+        for item in table.items.values():
+            trip_id = item["trip_id"]["S"]
+            statuses.setdefault(trip_id, set()).add(item["status"]["S"])
+    booked = {
+        trip_id for trip_id, found in statuses.items() if found == {"booked"}
+    }
+    assert len(booked) == load_test.outcomes["TripBooked"]
+    assert all(
+        found in ({"booked"}, {"cancelled"}) for found in statuses.values()
+    )
+    assert len(statuses) <= len(trips)
@@ -0,0 +1,30 @@
+import io
+import json
+
+import pytest
+
+from booking import BookingUnconfirmedError, client, metrics
+from booking.metrics import instrument
+from simulator import load_handler
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    """Return stream the metrics flushed by the handlers are written to."""
+    stream = io.StringIO()
+    monkeypatch.setattr(metrics, "namespace", "test")
+    monkeypatch.setattr(metrics, "stream", stream)
+    return stream
+
+
+def test_timed_out_request_recorded(stream, stalled_endpoint, trip):
+    module = load_handler("book-hotel")
+    module.service.dynamodb = client(
+        "dynamodb", {"read_timeout": 0.1}, endpoint_url=stalled_endpoint
+    )
+    instrument(module.service.dynamodb)
+    with pytest.raises(BookingUnconfirmedError):
+        module.lambda_handler(trip, None)
+    document = json.loads(stream.getvalue().splitlines()[-1])
+    assert document["RequestFailed"] == 1
+    assert document["PutItemLatency"] >= 100
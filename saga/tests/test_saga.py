@@ -0,0 +1,116 @@
+from botocore.exceptions import ClientError
+
+from simulator import SagaSimulator
+from simulator.dynamodb import DynamoDBIntegration
+
+
+def test_trip_booked(trip):
+    simulator = SagaSimulator()
+    execution = simulator.run(trip)
+    assert execution.status == "SUCCEEDED"
+    assert simulator.trip_status(trip["trip_id"])["status"] == "booked"
+
+
+def test_failed_booking_not_compensated(trip):
+    simulator = SagaSimulator({"book-car": 1.0})
+    execution = simulator.run(trip)
+    assert execution.error == "TripCancelledError"
+    assert simulator.lambdas.calls["cancel-car"] == 0
+    assert simulator.lambdas.calls["cancel-hotel"] == 1
+
+
+def test_booking_failed_after_write_compensated(trip, lost_response):
+    simulator = SagaSimulator({"book-car": 1.0})
+    service = simulator.modules["book-hotel"].service
+    service.dynamodb = lost_response(service.dynamodb)
+    execution = simulator.run(trip)
+    assert execution.error == "TripCancelledError"
+    assert simulator.lambdas.calls["cancel-hotel"] == 1
+    item = simulator.dynamodb.get_item(
+        TableName="hotel-bookings", Key={"trip_id": {"S": trip["trip_id"]}}
+    )["Item"]
+    assert item["status"]["S"] == "cancelled"
+
+
+def test_dynamodb_integration_failed_booking_not_compensated(trip):
+    simulator = SagaSimulator({"book-car": 1.0}, integration="dynamodb")
+    execution = simulator.run(trip)
+    assert execution.error == "TripCancelledError"
+    assert simulator.dynamodb.calls["UpdateItem"] == 2
+
+
+def test_dynamodb_integration_cancel_faults_bounded(trip):
+    simulator = SagaSimulator(
+        {"book-car": 1.0, "cancel-hotel": 1.0}, integration="dynamodb"
+    )
+    execution = simulator.run(trip)
+    assert execution.error == "TripCancelFailedError"
+    # The first attempt and the retries of CANCEL_RETRY, a second apart.
+    assert 100 <= execution.duration < 110
+    assert simulator.dynamodb.calls["UpdateItem"] == 1
+
+
+def test_seeded_runs_reproducible(trip):
+    def run():
+        simulator = SagaSimulator(
+            dict.fromkeys(["book-car", "book-hotel", "cancel-flight"], 0.3),
+            seed=7,
+        )
+        states = [
+            simulator.run(
+                dict(trip, trip_id=f"{trip['trip_id']}-{i}")
+            ).final_state
+            for i in range(50)
+        ]
+        return states, simulator.lambdas.calls
+
+    first, second = run(), run()
+    assert first == second
+    assert len(set(first[0])) > 1
+
+
+class LateBooking:
+    """DynamoDB client writing the hotel booking only after its cancellation
+    failed, as if the write got delayed."""
+
+    def __init__(self, client):
+        self.client = client
+        self.late = None
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def put_item(self, **kwargs):
+        item = kwargs["Item"]
+        if kwargs["TableName"] == "hotel-bookings" and item["status"] == {
+            "S": "booked"
+        }:
+            self.late = kwargs
+            raise ClientError(
+                {"Error": {"Code": "InternalServerError", "Message": ""}},
+                "PutItem",
+            )
+        return self.client.put_item(**kwargs)
+
+    def update_item(self, **kwargs):
+        try:
+            return self.client.update_item(**kwargs)
+        except Exception:
+            if self.late:
+                self.client.put_item(**self.late)
+                self.late = None
+            raise
+
+
+def test_dynamodb_integration_late_booking_cancelled(trip):
+    simulator = SagaSimulator({"book-car": 1.0}, integration="dynamodb")
+    client = LateBooking(simulator.dynamodb)
+    simulator.state_machine.resources.update(
+        DynamoDBIntegration(client).resources
+    )
+    execution = simulator.run(trip)
+    assert execution.error == "TripCancelledError"
+    item = simulator.dynamodb.get_item(
+        TableName="hotel-bookings", Key={"trip_id": {"S": trip["trip_id"]}}
+    )["Item"]
+    assert item["status"] == {"S": "cancelled"}
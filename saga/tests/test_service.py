@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from booking import BookingUnconfirmedError
+from simulator import SagaSimulator
+
+
+def test_book_unconfirmed(trip, lost_response):
+    simulator = SagaSimulator()
+    module = simulator.modules["book-hotel"]
+    module.service.dynamodb = lost_response(module.service.dynamodb)
+    with pytest.raises(BookingUnconfirmedError):
+        module.lambda_handler(trip, None)
+
+
+def test_book_batch_partial_response(trip):
+    simulator = SagaSimulator()
+    cancelled = dict(trip, trip_id=f"{trip['trip_id']}-cancelled")
+    simulator.modules["cancel-hotel"].lambda_handler(cancelled, None)
+    event = {
+        "Records": [
+            {"messageId": "booked", "body": json.dumps(trip)},
+            {"messageId": "cancelled", "body": json.dumps(cancelled)},
+            {"messageId": "invalid", "body": "{"},
+        ]
+    }
+    module = simulator.modules["book-hotel"]
+    assert module.batch_handler(event, None) == {
+        "batchItemFailures": [
+            {"itemIdentifier": "invalid"},
+            {"itemIdentifier": "cancelled"},
+        ]
+    }
+    item = simulator.dynamodb.get_item(
+        TableName="hotel-bookings", Key={"trip_id": {"S": trip["trip_id"]}}
+    )["Item"]
+    assert item["status"] == {"S": "booked"}
@@ -0,0 +1,134 @@
+import itertools
+import threading
+
+import boto3
+import pytest
+from botocore.config import Config
+from botocore.exceptions import EndpointConnectionError, ReadTimeoutError
+
+from client.executions import MAX_INPUT_SIZE, SagaClient
+from client.ratelimit import AdaptiveRateLimiter
+from client.stub import StubStepFunctions, create_server
+from client.submit import BulkSubmitter
+
+
+STATE_MACHINE_ARN = (
+    "arn:aws:states:eu-central-1:123456789012:stateMachine:sfn-demo-saga"
+)
+
+
+class FailingClient:
+    """Step Functions client failing the first requests with the error.
+
+    The error is raised before the request is sent, or after the response
+    is received when ``lost`` is set.
+    """
+
+    def __init__(self, client, error, failures=1, lost=False):
+        self.client = client
+        self.error = error
+        self.failures = failures
+        self.lost = lost
+
+    def start_execution(self, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            if self.lost:
+                self.client.start_execution(**kwargs)
+            raise self.error
+        return self.client.start_execution(**kwargs)
+
+
+@pytest.fixture
+def stub():
+    """Return the stub served on a free port with its endpoint URL."""
+    stub = StubStepFunctions()
+    server = create_server(stub, 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield stub, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sfn(stub):
+    _, endpoint_url = stub
+    return boto3.client(
+        "stepfunctions",
+        region_name="eu-central-1",
+        endpoint_url=endpoint_url,
+        aws_access_key_id="stub",
+        aws_secret_access_key="stub",
+        config=Config(retries={"mode": "standard", "total_max_attempts": 1}),
+    )
+
+
+def submitter(client, concurrency=1):
+    limiter = AdaptiveRateLimiter(1000.0, sleep=lambda seconds: None)
+    return BulkSubmitter(
+        SagaClient(STATE_MACHINE_ARN, client), concurrency, limiter
+    )
+
+
+def trips(trip, count):
+    return [dict(trip, trip_id=f"{trip['trip_id']}-{i}") for i in range(count)]
+
+
+def test_throttled_retried(stub, sfn, trip):
+    stub, _ = stub
+    # Every other half of the ten requests a second is throttled.
+    stub.rate = 5
+    stub.clock = itertools.count(step=0.1).__next__
+    bulk = submitter(sfn)
+    results = list(bulk.submit(trips(trip, 20)))
+    assert {result.status for result in results} == {"started"}
+    assert len(stub.executions) == 20
+    assert stub.throttled > 0
+    assert bulk.throttled == stub.throttled
+    assert bulk.limiter.rate < 1000.0
+
+
+def test_throttled_too_many_times(stub, sfn, trip):
+    stub, _ = stub
+    stub.rate = 0
+    [result] = submitter(sfn).submit([trip])
+    assert result.status == "failed"
+    assert result.error == "ThrottlingException"
+    assert result.attempts == 8
+
+
+def test_input_too_large(stub, sfn, trip):
+    stub, _ = stub
+    trip["notes"] = "x" * MAX_INPUT_SIZE
+    [result] = submitter(sfn).submit([trip])
+    assert result.status == "failed"
+    assert result.error == "InputTooLarge"
+    assert stub.requests == 0
+
+
+def test_duplicates(stub, sfn, trip):
+    stub, _ = stub
+    bulk = submitter(sfn)
+    list(bulk.submit([trip, trip]))
+    [result] = bulk.submit([dict(trip, notes="changed")])
+    # Starting the same trip again returns the existing execution.
+    assert bulk.statuses == {"started": 2, "duplicate": 1}
+    assert result.execution_arn is None
+    assert len(stub.executions) == 1
+
+
+@pytest.mark.parametrize(
+    "error, lost",
+    [
+        (EndpointConnectionError(endpoint_url="https://states"), False),
+        (ReadTimeoutError(endpoint_url="https://states"), True),
+    ],
+)
+def test_connection_errors_retried(stub, sfn, trip, error, lost):
+    stub, _ = stub
+    bulk = submitter(FailingClient(sfn, error, lost=lost))
+    [result] = bulk.submit([trip])
+    assert result.status == "started"
+    assert result.attempts == 2
+    assert bulk.errors == 1
+    assert len(stub.executions) == 1
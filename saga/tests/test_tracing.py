@@ -0,0 +1,82 @@
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from booking import BookingUnconfirmedError, InMemoryExporter, client, tracer
+from booking.tracing import instrument
+from simulator import load_handler
+
+
+TRACE_ID = "1-5759e988-bd862e3fe1be46a994272793"
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    """Return exporter of the subsegments of a sampled invocation."""
+    exporter = InMemoryExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setenv(
+        "_X_AMZN_TRACE_ID",
+        f"Root={TRACE_ID};Parent=53995c3f42cd8ad8;Sampled=1",
+    )
+    return exporter
+
+
+@pytest.fixture
+def book_hotel():
+    """Return the handler module with the DynamoDB client stubbed."""
+    module = load_handler("book-hotel")
+    with Stubber(module.service.dynamodb) as stubber:
+        yield module, stubber
+
+
+def test_dynamodb_subsegment(exporter, book_hotel, trip):
+    module, stubber = book_hotel
+    stubber.add_response("put_item", {})
+    module.lambda_handler(trip, None)
+    [document] = exporter.documents
+    assert document["name"] == "DynamoDB"
+    assert document["trace_id"] == TRACE_ID
+    assert document["aws"]["operation"] == "PutItem"
+    assert document["aws"]["table_name"] == "book-hotel-bookings"
+    assert document["http"]["response"]["status"] == 200
+    assert "error" not in document
+    assert document["end_time"] >= document["start_time"]
+
+
+def test_dynamodb_subsegment_throttled(exporter, book_hotel, trip):
+    module, stubber = book_hotel
+    stubber.add_client_error(
+        "put_item", "ProvisionedThroughputExceededException"
+    )
+    with pytest.raises(ClientError):
+        module.lambda_handler(trip, None)
+    [document] = exporter.documents
+    assert document["aws"]["table_name"] == "book-hotel-bookings"
+    assert document["error"] is True
+    assert document["throttle"] is True
+    assert "fault" not in document
+
+
+def test_not_sampled(exporter, book_hotel, trip, monkeypatch):
+    module, stubber = book_hotel
+    monkeypatch.setenv("_X_AMZN_TRACE_ID", f"Root={TRACE_ID};Sampled=0")
+    stubber.add_response("put_item", {})
+    module.lambda_handler(trip, None)
+    assert exporter.documents == []
+
+
+def test_dynamodb_subsegment_timed_out(exporter, stalled_endpoint, trip):
+    module = load_handler("book-hotel")
+    module.service.dynamodb = client(
+        "dynamodb", {"read_timeout": 0.1}, endpoint_url=stalled_endpoint
+    )
+    instrument(module.service.dynamodb)
+    with pytest.raises(BookingUnconfirmedError):
+        module.lambda_handler(trip, None)
+    [document] = exporter.documents
+    assert document["aws"]["table_name"] == "book-hotel-bookings"
+    assert document["fault"] is True
+    [exception] = document["cause"]["exceptions"]
+    assert exception["type"] == "ReadTimeoutError"
+    assert document["end_time"] >= document["start_time"] + 0.1
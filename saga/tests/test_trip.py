@@ -0,0 +1,70 @@
+import pytest
+
+from booking import BookingCancelledError
+from simulator import SagaSimulator
+
+
+def bookings(simulator, trip):
+    response = simulator.dynamodb.query(
+        TableName="bookings",
+        KeyConditionExpression="trip_id = :trip_id",
+        ExpressionAttributeValues={":trip_id": {"S": trip["trip_id"]}},
+    )
+    return {
+        item["service"]["S"]: item["status"]["S"] for item in response["Items"]
+    }
+
+
+def test_trip_booked_in_transaction(trip):
+    simulator = SagaSimulator(single_table=True)
+    execution = simulator.run(trip)
+    assert execution.status == "SUCCEEDED"
+    assert simulator.lambdas.calls["book-trip"] == 1
+    assert simulator.dynamodb.calls["TransactWriteItems"] == 1
+    assert simulator.dynamodb.calls["PutItem"] == 0
+    assert simulator.trip_status(trip["trip_id"])["status"] == "booked"
+
+
+def test_failed_transaction_not_compensated(trip):
+    simulator = SagaSimulator({"book-trip": 1.0}, single_table=True)
+    execution = simulator.run(trip)
+    assert execution.error == "TripCancelledError"
+    assert sum(simulator.lambdas.calls.values()) == 1
+    assert bookings(simulator, trip) == {}
+
+
+def test_unconfirmed_transaction_compensated(trip):
+    chaos = {"book-trip": {"faults": [{"type": "post_write", "rate": 1.0}]}}
+    simulator = SagaSimulator(chaos=chaos, single_table=True)
+    execution = simulator.run(trip)
+    assert execution.error == "TripCancelledError"
+    assert bookings(simulator, trip) == dict.fromkeys(
+        ["hotel", "flight", "car"], "cancelled"
+    )
+
+
+def test_forward_recovery(trip):
+    chaos = {"book-trip": {"schedule": ["error", None]}}
+    simulator = SagaSimulator(
+        chaos=chaos,
+        single_table=True,
+        definition_options={"recovery": "forward"},
+    )
+    execution = simulator.run(trip)
+    assert execution.status == "SUCCEEDED"
+    assert simulator.lambdas.calls["book-trip"] == 2
+
+
+def test_existing_bookings_kept(trip):
+    simulator = SagaSimulator(single_table=True)
+    service = simulator.modules["book-trip"].service
+    first = service.book(trip)
+    assert service.book(trip) == first
+
+
+def test_cancelled_booking_rejected(trip):
+    simulator = SagaSimulator(single_table=True)
+    simulator.modules["cancel-car"].lambda_handler(trip, None)
+    with pytest.raises(BookingCancelledError):
+        simulator.modules["book-trip"].lambda_handler(trip, None)
+    assert bookings(simulator, trip) == {"car": "not_booked"}